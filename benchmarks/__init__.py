@@ -0,0 +1,6 @@
+"""
+Benchmarks de rendimiento del pipeline de recolección
+
+Ejecutar desde la raíz del repositorio:
+    python -m benchmarks.run
+"""
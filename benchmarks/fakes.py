@@ -0,0 +1,206 @@
+"""
+Reloj ZK y base de datos simulados para los benchmarks
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Generator, List, Optional, Tuple
+
+
+class SyntheticAttendance:
+    """Marcaje con los atributos que lee AttendanceProcessor (como zk.Attendance)"""
+
+    __slots__ = ("user_id", "timestamp", "status", "punch", "uid")
+
+    def __init__(self, user_id: str, timestamp: datetime, uid: int):
+        self.user_id = user_id
+        self.timestamp = timestamp
+        self.status = 1
+        self.punch = 0
+        self.uid = uid
+
+    def __str__(self) -> str:
+        return f"Attendance {self.user_id} : {self.timestamp} ({self.status}, {self.punch})"
+
+
+def make_attendances(
+    count: int,
+    users: int = 500,
+    span: timedelta = timedelta(hours=20),
+    now: Optional[datetime] = None,
+) -> List[SyntheticAttendance]:
+    """
+    Genera count marcajes repartidos en span hacia atrás desde now.
+
+    Con el span por defecto todos caen en la ventana de days_back=1 del
+    procesador, que es el peor caso (todos se procesan y se guardan).
+    """
+    now = (now or datetime.now()).replace(microsecond=0)
+    step = span / max(count, 1)
+    start = now - span
+    return [
+        SyntheticAttendance(str(1000000 + i % users), start + step * i, i)
+        for i in range(count)
+    ]
+
+
+class FakeZKConnection:
+    """Conexión simulada (la que devuelve ZK.connect() en pyzk)"""
+
+    def __init__(self, ip: str, records: List[SyntheticAttendance], latency: float):
+        self.ip = ip
+        self._records = records
+        self.records = len(records)
+        self.latency = latency
+
+    def _wait(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_network_params(self) -> Dict[str, str]:
+        self._wait()
+        return {"ip": self.ip, "mask": "255.255.255.0", "gateway": ""}
+
+    def read_sizes(self) -> bool:
+        self._wait()
+        self.records = len(self._records)
+        return True
+
+    def get_attendance(self) -> List[SyntheticAttendance]:
+        # La descarga real crece con el tamaño del log (paquetes de ~16 KB)
+        pages = 1 + len(self._records) * 40 // 16384
+        if self.latency:
+            time.sleep(self.latency * pages)
+        return list(self._records)
+
+    def get_time(self) -> datetime:
+        self._wait()
+        return datetime.now()
+
+    def disconnect(self) -> bool:
+        return True
+
+
+def fake_zk_class(
+    records: int,
+    latency: float = 0.0,
+    failure_rate: float = 0.0,
+    seed: int = 0,
+) -> type:
+    """
+    Crea una clase compatible con zk.ZK para reemplazar ZK en
+    clockcontrol.core.device.
+
+    Args:
+        records: Marcajes en el log de cada reloj
+        latency: Segundos por ida y vuelta con el reloj
+        failure_rate: Probabilidad de que connect() falle
+        seed: Semilla de los fallos (resultados reproducibles)
+    """
+    log = make_attendances(records)
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    class FakeZK:
+        def __init__(self, ip: str, port: int = 4370, **kwargs: Any):
+            self.ip = ip
+
+        def connect(self) -> FakeZKConnection:
+            if latency:
+                time.sleep(latency)
+            with lock:
+                failed = rng.random() < failure_rate
+            if failed:
+                raise ConnectionError(f"can't reach device ({self.ip})")
+            return FakeZKConnection(self.ip, log, latency)
+
+    return FakeZK
+
+
+class _FakeConnectionInfo:
+    encoding = "UTF8"
+
+
+class FakeCursor:
+    """Cursor simulado: responde lo mínimo que usan los repositorios"""
+
+    def __init__(self, db: "MockDatabase"):
+        self.db = db
+        self.connection = _FakeConnectionInfo()
+        self.rowcount = 0
+        self._result: List[Tuple] = []
+
+    def _round_trip(self) -> None:
+        self.db.round_trips += 1
+        if self.db.latency:
+            time.sleep(self.db.latency)
+
+    def mogrify(self, template: bytes, args: Tuple) -> bytes:
+        return repr(args).encode()
+
+    def execute(self, query: Any, params: Any = None) -> None:
+        self._round_trip()
+        text = query.decode() if isinstance(query, bytes) else query
+        if "rrhh.reloj_biometrico" in text:
+            self._result = self.db.clock_rows
+        elif "information_schema" in text:
+            self._result = [("person_marks",), ("clock_conn",)]
+        elif "GROUP BY id_reloj_bio" in text:
+            self._result = sorted(self.db.staged.items())
+            self.db.staged.clear()
+        else:
+            self._result = []
+
+    def callproc(self, name: str, args: Tuple) -> None:
+        self._round_trip()
+        marks = args[1].count('"incarnet"')
+        self.db.marks_received += marks
+        self.db.bytes_received += len(args[1])
+        self._result = [(1, "ok", marks)]
+
+    def copy_expert(self, sql: str, buffer: Any) -> None:
+        self._round_trip()
+        data = buffer.read()
+        self.db.bytes_received += len(data)
+        for line in data.splitlines():
+            clock_id = int(line.rsplit(",", 1)[1])
+            self.db.staged[clock_id] = self.db.staged.get(clock_id, 0) + 1
+            self.db.marks_received += 1
+        self.rowcount = sum(self.db.staged.values())
+
+    def fetchone(self) -> Optional[Tuple]:
+        return self._result[0] if self._result else None
+
+    def fetchall(self) -> List[Tuple]:
+        return list(self._result)
+
+
+class MockDatabase:
+    """
+    Reemplazo de DatabaseConnection sin PostgreSQL.
+
+    Todos los marcajes recibidos se cuentan como nuevos; latency simula la
+    ida y vuelta con el servidor en cada sentencia.
+    """
+
+    def __init__(self, clocks: int = 0, latency: float = 0.0):
+        self.clock_rows = [(i + 1, f"10.{i // 65536}.{i // 256 % 256}.{i % 256}", "0", 4370) for i in range(clocks)]
+        self.latency = latency
+        self.round_trips = 0
+        self.marks_received = 0
+        self.bytes_received = 0
+        self.staged: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def get_cursor(self) -> Generator[FakeCursor, None, None]:
+        with self._lock:
+            yield FakeCursor(self)
+
+    def ensure_tables_exist(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,323 @@
+"""
+Benchmarks del pipeline de recolección con relojes y base de datos simulados
+
+Mide el arranque del CLI (-X importtime), el procesamiento de marcajes,
+la serialización JSON, el guardado (stored procedure y COPY) y el barrido
+completo process_all_clocks para distintos tamaños de flota, sin relojes
+ni PostgreSQL reales.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.run
+    python -m benchmarks.run --fleet 10,100,500 --records 2000 --latency 0.005
+    python -m benchmarks.run --json resultados.json
+    python -m benchmarks.run --baseline resultados.json --tolerance 0.2
+
+Con --baseline el proceso termina con código 1 si algún benchmark es más
+lento que la referencia por más de la tolerancia, o si el arranque del CLI
+vuelve a cargar módulos pesados (psycopg2, pyzk, asyncio).
+"""
+import argparse
+import json
+import logging
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.fakes import MockDatabase, fake_zk_class, make_attendances
+
+# Antes de importar clockcontrol: Settings no reconfigura un logging ya configurado
+logging.basicConfig(level=logging.WARNING)
+
+from clockcontrol import app as clockcontrol_app  # noqa: E402
+from clockcontrol.config.settings import Settings  # noqa: E402
+from clockcontrol.core import device  # noqa: E402
+from clockcontrol.core.attendance import AttendanceProcessor  # noqa: E402
+from clockcontrol.database.repositories import AttendanceRepository  # noqa: E402
+
+
+def measure(func: Callable[[], int], repeat: int) -> Dict[str, float]:
+    """
+    Ejecuta func repeat veces y devuelve la mejor corrida.
+
+    func devuelve la cantidad de elementos procesados (para el ritmo).
+    """
+    best = None
+    items = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {"seconds": best, "items": items, "rate": items / best if best else 0.0}
+
+
+# Módulos que el arranque del CLI no debe cargar: solo se importan al
+# ejecutar un comando
+HEAVY_MODULES = ("psycopg2", "zk", "asyncio", "sqlite3", "clockcontrol.app")
+
+
+def import_time(module: str) -> Tuple[float, List[str]]:
+    """
+    Importa module en un intérprete nuevo con -X importtime.
+
+    Devuelve los segundos acumulados de la importación y los módulos
+    pesados (HEAVY_MODULES) que se cargaron.
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    ).stderr
+    seconds = 0.0
+    loaded = set()
+    # Formato: "import time: self [us] | cumulative | imported package"
+    for line in output.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        loaded.add(name)
+        if name == module:
+            seconds = int(parts[1]) / 1_000_000
+    return seconds, [name for name in HEAVY_MODULES if name in loaded]
+
+
+def bench_import(repeat: int) -> List[dict]:
+    """Arranque de `import clockcontrol` y del CLI (clockcontrol --help)"""
+    results = []
+    for module in ("clockcontrol", "clockcontrol.cli"):
+        best = None
+        heavy: List[str] = []
+        for _ in range(repeat):
+            seconds, heavy = import_time(module)
+            best = seconds if best is None else min(best, seconds)
+        results.append({
+            "name": f"import[{module}]",
+            "unit": "arranques",
+            "seconds": best,
+            "items": 1,
+            "rate": 1 / best if best else 0.0,
+            "heavy_modules": heavy,
+        })
+    return results
+
+
+def bench_processing(records: int, repeat: int) -> List[dict]:
+    """AttendanceProcessor.process / process_batch y to_json"""
+    raw = make_attendances(records)
+    processor = AttendanceProcessor(days_back=1)
+    marks = processor.process(raw, "10.0.0.1", 1)
+    batch = processor.process_batch(raw, "10.0.0.1", 1)
+
+    def to_json() -> int:
+        AttendanceProcessor.to_json(marks)
+        return len(marks)
+
+    def to_json_batch() -> int:
+        batch.to_json()
+        return len(batch)
+
+    # Resincronización completa: años de historial, casi todo fuera de la
+    # ventana de days_back (el caso de las descargas más grandes)
+    history = make_attendances(records * 10, span=timedelta(days=730))
+
+    def process_resync() -> int:
+        processor.process_batch(history, "10.0.0.1", 1)
+        return len(history)
+
+    return [
+        {"name": "process", "unit": "marcajes",
+         **measure(lambda: len(processor.process(raw, "10.0.0.1", 1)), repeat)},
+        {"name": "process_batch", "unit": "marcajes",
+         **measure(lambda: len(processor.process_batch(raw, "10.0.0.1", 1)), repeat)},
+        {"name": "process_batch[resync]", "unit": "registros",
+         **measure(process_resync, repeat)},
+        {"name": "to_json", "unit": "marcajes", **measure(to_json, repeat)},
+        {"name": "to_json_batch", "unit": "marcajes", **measure(to_json_batch, repeat)},
+    ]
+
+
+def bench_saving(records: int, db_latency: float, repeat: int) -> List[dict]:
+    """AttendanceRepository.save_marks (JSON), save_marks_copy y save_marks_many"""
+    processor = AttendanceProcessor(days_back=1)
+    batch = processor.process_batch(make_attendances(records), "10.0.0.1", 1)
+    repo = AttendanceRepository(MockDatabase(latency=db_latency))
+
+    def save_json() -> int:
+        repo.save_marks(1, batch.to_json())
+        return len(batch)
+
+    def save_copy() -> int:
+        repo.save_marks_copy(batch)
+        return len(batch)
+
+    def save_many() -> int:
+        repo.save_marks_many([batch] * 10)
+        return len(batch) * 10
+
+    return [
+        {"name": "save_marks", "unit": "marcajes", **measure(save_json, repeat)},
+        {"name": "save_marks_copy", "unit": "marcajes", **measure(save_copy, repeat)},
+        {"name": "save_marks_many_x10", "unit": "marcajes", **measure(save_many, repeat)},
+    ]
+
+
+def bench_sweep(
+    fleet: int,
+    records: int,
+    latency: float,
+    failure_rate: float,
+    db_latency: float,
+    workers: int,
+    pipeline: bool,
+    repeat: int,
+) -> dict:
+    """process_all_clocks sobre una flota simulada"""
+    db = MockDatabase(clocks=fleet, latency=db_latency)
+    device.ZK = fake_zk_class(records, latency=latency, failure_rate=failure_rate)
+    clockcontrol_app.DatabaseConnection = lambda *args, **kwargs: db
+    clockcontrol_app.probe_many = lambda targets, **kwargs: {ip: True for ip, _ in targets}
+
+    with tempfile.TemporaryDirectory(prefix="clockcontrol-bench-") as tmp:
+        config = Path(tmp) / "database.ini"
+        config.write_text(
+            "[postgresql]\nhost=localhost\ndatabase=bench\nuser=bench\npassword=bench\n"
+            "[clockcontrol]\n"
+            f"state_dir={tmp}/state\n"
+            f"max_workers={workers}\n"
+            "incremental=false\n"
+            "circuit_breaker=false\n"
+            f"pipeline={str(pipeline).lower()}\n"
+        )
+        app = clockcontrol_app.ClockControlApp(Settings(str(config)))
+        saved = [0]
+
+        def sweep() -> int:
+            results = app.process_all_clocks()
+            saved[0] = sum(r.marks_saved for r in results)
+            return len(results)
+
+        try:
+            round_trips = db.round_trips
+            result = measure(sweep, repeat)
+            round_trips = (db.round_trips - round_trips) / repeat
+        finally:
+            app.close()
+
+    mode = "pipeline" if pipeline else "serial"
+    return {
+        "name": f"process_all_clocks[{mode},{fleet}]",
+        "unit": "relojes",
+        **result,
+        "marks_per_second": saved[0] / result["seconds"] if result["seconds"] else 0.0,
+        "db_round_trips": round_trips,
+    }
+
+
+def compare(results: List[dict], baseline: List[dict], tolerance: float) -> List[str]:
+    """
+    Benchmarks más lentos que la referencia por más de la tolerancia y
+    arranques que cargan módulos pesados
+    """
+    reference = {entry["name"]: entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        if entry.get("heavy_modules"):
+            regressions.append(f"{entry['name']}: carga {', '.join(entry['heavy_modules'])}")
+        base = reference.get(entry["name"])
+        if base and base["rate"] and entry["rate"] < base["rate"] * (1 - tolerance):
+            regressions.append(
+                f"{entry['name']}: {entry['rate']:.0f} {entry['unit']}/s "
+                f"(referencia {base['rate']:.0f}, {entry['rate'] / base['rate'] - 1:+.0%})"
+            )
+    return regressions
+
+
+def print_results(results: List[dict]) -> None:
+    """Tabla de resultados"""
+    print(f"  {'Benchmark':<38} {'Tiempo':>10} {'Ritmo':>22} {'Idas DB':>8}")
+    print("  " + "-" * 80)
+    for entry in results:
+        trips = entry.get("db_round_trips")
+        print(
+            f"  {entry['name']:<38} {entry['seconds'] * 1000:>8.1f}ms "
+            f"{entry['rate']:>12,.0f} {entry['unit'] + '/s':<10}"
+            f"{'' if trips is None else f'{trips:>8.0f}'}"
+        )
+
+
+def parse_fleet(value: str) -> List[int]:
+    try:
+        sizes = [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Lista de tamaños inválida: {value}")
+    if not sizes or any(size < 1 for size in sizes):
+        raise argparse.ArgumentTypeError(f"Lista de tamaños inválida: {value}")
+    return sizes
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Benchmarks de clockControl con relojes y base de datos simulados",
+    )
+    parser.add_argument("--records", type=int, default=5000,
+                        help="Marcajes por reloj (default: 5000)")
+    parser.add_argument("--fleet", type=parse_fleet, default=[10, 50, 200],
+                        help="Tamaños de flota separados por coma (default: 10,50,200)")
+    parser.add_argument("--latency", type=float, default=0.002,
+                        help="Segundos por ida y vuelta con el reloj (default: 0.002)")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="Probabilidad de fallo al conectar (default: 0)")
+    parser.add_argument("--db-latency", type=float, default=0.001,
+                        help="Segundos por sentencia en la base simulada (default: 0.001)")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Relojes en paralelo en el barrido (default: 8)")
+    parser.add_argument("--mode", choices=("serial", "pipeline", "both"), default="both",
+                        help="Barrido por reloj, por etapas o ambos (default: both)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Corridas por benchmark; se reporta la mejor (default: 3)")
+    parser.add_argument("--json", metavar="ARCHIVO",
+                        help="Guardar los resultados en JSON")
+    parser.add_argument("--baseline", metavar="ARCHIVO",
+                        help="Comparar contra resultados JSON previos")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Caída de ritmo tolerada frente a --baseline (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    modes = [False, True] if args.mode == "both" else [args.mode == "pipeline"]
+
+    print(f"\n  clockControl benchmarks - {args.records} marcajes por reloj\n")
+    results = bench_import(args.repeat)
+    results += bench_processing(args.records, args.repeat)
+    results += bench_saving(args.records, args.db_latency, args.repeat)
+    for fleet in args.fleet:
+        for pipeline in modes:
+            results.append(bench_sweep(
+                fleet, args.records, args.latency, args.failure_rate,
+                args.db_latency, args.workers, pipeline, args.repeat,
+            ))
+    print_results(results)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f"\n  Resultados guardados en {args.json}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\n  ✗ Regresiones de rendimiento:")
+            for line in regressions:
+                print(f"    {line}")
+            return 1
+        print(f"\n  ✓ Sin regresiones frente a {args.baseline}")
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,43 +4,52 @@ clockControl - Sistema de Control de Asistencia SEGIP
 Sistema para obtener marcajes de relojes biométricos ZKTeco y 
 almacenarlos en base de datos PostgreSQL.
 """
+from clockcontrol.utils.lazy import lazy_exports
 
 __version__ = "2.0.0"
 __author__ = "SEGIP"
 
-# API pública del paquete
-from clockcontrol.core.attendance import AttendanceProcessor, AttendanceMark
-from clockcontrol.core.device import ZKDeviceManager
-from clockcontrol.core.exceptions import (
-    ClockControlError,
-    DeviceConnectionError,
-    DatabaseError,
-    ConfigurationError,
-)
-from clockcontrol.database.connection import DatabaseConnection
-from clockcontrol.database.repositories import ClockRepository, AttendanceRepository
-from clockcontrol.config.settings import Settings, get_settings
-from clockcontrol.cli import ClockControlApp
-
-__all__ = [
-    # Version
-    "__version__",
+# API pública del paquete: cada nombre se importa recién al usarlo, así
+# `import clockcontrol` (y el CLI con --help) no carga pyzk ni psycopg2
+_LAZY_IMPORTS = {
     # Core
-    "AttendanceProcessor",
-    "AttendanceMark",
-    "ZKDeviceManager",
+    "AttendanceProcessor": "clockcontrol.core.attendance",
+    "AttendanceMark": "clockcontrol.core.attendance",
+    "MarkBatch": "clockcontrol.core.attendance",
+    "ZKDeviceManager": "clockcontrol.core.device",
     # Exceptions
-    "ClockControlError",
-    "DeviceConnectionError",
-    "DatabaseError",
-    "ConfigurationError",
+    "ClockControlError": "clockcontrol.core.exceptions",
+    "DeviceConnectionError": "clockcontrol.core.exceptions",
+    "DatabaseError": "clockcontrol.core.exceptions",
+    "ConfigurationError": "clockcontrol.core.exceptions",
     # Database
-    "DatabaseConnection",
-    "ClockRepository",
-    "AttendanceRepository",
+    "DatabaseConnection": "clockcontrol.database.connection",
+    "ClockRepository": "clockcontrol.database.repositories",
+    "AttendanceRepository": "clockcontrol.database.repositories",
     # Config
-    "Settings",
-    "get_settings",
+    "Settings": "clockcontrol.config.settings",
+    "get_settings": "clockcontrol.config.settings",
     # App
-    "ClockControlApp",
-]
+    "ClockControlApp": "clockcontrol.app",
+}
+
+__all__ = ["__version__", *_LAZY_IMPORTS]
+
+# Equivale a typing.TYPE_CHECKING sin importar typing (mypy lo reconoce)
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from clockcontrol.core.attendance import AttendanceProcessor, AttendanceMark, MarkBatch
+    from clockcontrol.core.device import ZKDeviceManager
+    from clockcontrol.core.exceptions import (
+        ClockControlError,
+        DeviceConnectionError,
+        DatabaseError,
+        ConfigurationError,
+    )
+    from clockcontrol.database.connection import DatabaseConnection
+    from clockcontrol.database.repositories import ClockRepository, AttendanceRepository
+    from clockcontrol.config.settings import Settings, get_settings
+    from clockcontrol.app import ClockControlApp
+
+
+__getattr__, __dir__ = lazy_exports(__name__, globals(), _LAZY_IMPORTS)
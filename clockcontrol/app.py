@@ -0,0 +1,1065 @@
+"""
+Aplicación principal: orquesta la obtención de marcajes de los relojes
+"""
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Generator, List, Optional, Tuple, Union
+
+from clockcontrol.config.settings import Settings, get_settings
+from clockcontrol.core.attendance import AttendanceProcessor, AttendanceMark, Marks
+from clockcontrol.core.circuit import HALF_OPEN, CircuitBreaker
+from clockcontrol.core.dedup import RecentMarksCache
+from clockcontrol.core.device import ZKDeviceManager
+from clockcontrol.core.probe import describe, probe_many
+from clockcontrol.core.watermark import Watermark, WatermarkStore
+from clockcontrol.core.exceptions import (
+    ClockControlError,
+    DeviceConnectionError,
+    TaskCancelledError,
+)
+from clockcontrol.database.connection import DatabaseConnection
+from clockcontrol.database.log_buffer import ConnectionLogBuffer
+from clockcontrol.database.repositories import ClockRepository, AttendanceRepository
+from clockcontrol.database.models import Clock
+from clockcontrol.database.registry import ClockRegistry
+from clockcontrol.utils import metrics
+from clockcontrol.utils.concurrency import CancelToken, run_bounded
+from clockcontrol.utils.metrics import CollectorMetrics, Spans, SweepReport
+from clockcontrol.utils.pipeline import StagedPipeline
+from clockcontrol.utils.state import open_state
+
+# Los módulos de cada modo u opción (serve, stream, spool, sesiones) se
+# importan al usarse: el cron de `all` no los carga
+if TYPE_CHECKING:
+    from clockcontrol.core.adaptive import AdaptivePollPolicy
+    from clockcontrol.core.scheduler import PollScheduler
+    from clockcontrol.core.sessions import DeviceSessionManager
+    from clockcontrol.core.stream import LiveCaptureWorker, MicroBatchWriter
+    from clockcontrol.database.sharding import ShardCoordinator
+    from clockcontrol.database.spool import SpoolDrainer
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre escrituras del textfile de métricas en modo serve
+_METRICS_INTERVAL = 15.0
+
+
+@dataclass
+class ProcessResult:
+    """Resultado del procesamiento de un reloj"""
+    clock_ip: str
+    success: bool
+    marks_processed: int = 0
+    marks_saved: int = 0
+    error: Optional[str] = None
+    elapsed_time: float = 0.0
+    spans: Spans = field(default_factory=Spans)
+
+
+@dataclass
+class FetchedLog:
+    """Log descargado de un reloj, pendiente de procesar y guardar"""
+    clock: Clock
+    device_ip: str
+    raw: list
+    previous: Optional[Watermark]
+    result: ProcessResult
+
+
+class ClockControlApp:
+    """
+    Aplicación principal de clockControl.
+    
+    Orquesta el flujo de obtención de marcajes desde relojes biométricos.
+    """
+    
+    def __init__(
+        self,
+        settings: Optional[Settings] = None,
+        full_resync: bool = False,
+    ):
+        """
+        Args:
+            settings: Configuración de la aplicación (usa default si no se provee)
+            full_resync: Ignora las marcas de agua y procesa el log completo
+        """
+        self.settings = settings or get_settings()
+        db_config = self.settings.database
+        self.db = DatabaseConnection(
+            db_config.to_dict(),
+            pool_min=db_config.pool_min,
+            pool_max=db_config.pool_max,
+            health_check_interval=db_config.pool_health_check,
+        )
+        self.clock_repo = ClockRepository(self.db)
+        self.attendance_repo = AttendanceRepository(self.db)
+        self.processor = AttendanceProcessor(days_back=1)
+        self.full_resync = full_resync
+        
+        collector = self.settings.collector
+        # Puede pasar a "procedure" en initialize() si falta el índice de COPY
+        self.ingest_mode = collector.ingest_mode
+        self.registry = ClockRegistry(self.clock_repo, ttl=collector.registry_ttl)
+        self.connection_log = self._create_connection_log()
+        self.watermarks = WatermarkStore(
+            open_state(collector.state_dir, "watermarks.json")
+            if collector.incremental else None
+        )
+        self.sessions = self._create_sessions()
+        self.poll_policy: Optional["AdaptivePollPolicy"] = None
+        self.spool: Optional["SpoolDrainer"] = self._create_spool()
+        self.circuits = (
+            CircuitBreaker(
+                open_state(collector.state_dir, "circuits.json"),
+                failure_threshold=collector.circuit_failure_threshold,
+                open_interval=collector.circuit_open_interval,
+                max_open_interval=collector.circuit_max_open_interval,
+            )
+            if collector.circuit_breaker else None
+        )
+        # En una resincronización completa todo se reenvía a la base de datos
+        self.recent_marks = (
+            RecentMarksCache(
+                days_back=self.processor.days_back,
+                max_entries=collector.dedup_max_entries,
+                store=open_state(collector.state_dir, "recent_marks.json"),
+            )
+            if collector.dedup_cache and not full_resync else None
+        )
+        self.shard: Optional["ShardCoordinator"] = self._create_shard()
+        self.metrics = CollectorMetrics()
+        self.last_sweep: Optional[SweepReport] = None
+        self._metrics_exported = time.monotonic()
+    
+    def _create_connection_log(self) -> Union[ConnectionLogBuffer, AttendanceRepository]:
+        """
+        Crea el destino de los logs de conexión.
+        
+        Con conn_log_buffer los logs se agrupan en un INSERT por barrido
+        (respaldados por un journal local); sin él se insertan uno a uno.
+        """
+        collector = self.settings.collector
+        if not collector.conn_log_buffer:
+            return self.attendance_repo
+        
+        try:
+            journal = Path(collector.state_dir) / "clock_conn.journal"
+            return ConnectionLogBuffer(
+                self.attendance_repo,
+                journal_path=journal,
+                max_entries=collector.conn_log_max_entries,
+                max_age=collector.conn_log_max_age,
+            )
+        except OSError as e:
+            logger.warning(f"Journal de logs no disponible, se usa solo memoria: {e}")
+            return ConnectionLogBuffer(
+                self.attendance_repo,
+                max_entries=collector.conn_log_max_entries,
+                max_age=collector.conn_log_max_age,
+            )
+    
+    def _create_sessions(self) -> Optional["DeviceSessionManager"]:
+        """Crea el gestor de sesiones persistentes con los relojes (opción keep_sessions)"""
+        collector = self.settings.collector
+        if not collector.keep_sessions:
+            return None
+        from clockcontrol.core.sessions import DeviceSessionManager
+        return DeviceSessionManager(
+            max_sessions=collector.max_sessions,
+            idle_timeout=collector.session_idle_timeout,
+        )
+    
+    def _create_shard(self) -> Optional["ShardCoordinator"]:
+        """
+        Crea el coordinador de reparto de relojes entre recolectores
+        (opción sharding, requiere sql/migrations/002_clock_lease.sql).
+        """
+        collector = self.settings.collector
+        if not collector.sharding:
+            return None
+        from clockcontrol.database.repositories import LeaseRepository
+        from clockcontrol.database.sharding import ShardCoordinator
+        return ShardCoordinator(
+            LeaseRepository(self.db),
+            collector_id=collector.collector_id or None,
+            lease_ttl=collector.lease_ttl,
+        )
+    
+    def active_clocks(self) -> List[Clock]:
+        """
+        Relojes activos a procesar por este recolector: el registro completo
+        recargado, o con sharding solo los arrendados.
+        """
+        clocks = self.registry.all_active(refresh=True)
+        if self.shard is not None:
+            return self.shard.assign(clocks)
+        return clocks
+    
+    @property
+    def clock_refresh_interval(self) -> float:
+        """
+        Segundos entre recargas de la lista de relojes en serve y stream
+        (con sharding, también la renovación de los arriendos).
+        """
+        interval = self.settings.collector.registry_ttl
+        if self.shard is not None:
+            interval = min(interval, self.shard.renew_interval)
+        return interval
+    
+    def release_leases(self) -> None:
+        """Libera los relojes arrendados al detener un modo residente"""
+        if self.shard is not None:
+            self.shard.release()
+    
+    def _create_spool(self) -> Optional["SpoolDrainer"]:
+        """
+        Crea el spool local de marcajes y su hilo de vaciado (opción spool).
+        
+        Con spool los marcajes descargados se guardan primero en disco y un
+        hilo de fondo los envía a PostgreSQL, por lo que la descarga de los
+        relojes no espera a la base de datos.
+        """
+        collector = self.settings.collector
+        if not collector.spool:
+            return None
+        import sqlite3
+        from clockcontrol.database.spool import MarkSpool, SpoolDrainer
+        try:
+            spool = MarkSpool(Path(collector.state_dir) / "marks.spool")
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Spool de marcajes no disponible, se guarda directo: {e}")
+            return None
+        drainer = SpoolDrainer(spool, self.save_marks_many, batch_size=collector.spool_batch)
+        drainer.start()
+        return drainer
+    
+    def store_marks(self, clock_id: int, marks: Marks) -> int:
+        """
+        Entrega marcajes para su guardado: al spool si está activo, si no
+        directo a la base de datos. Con dedup_cache no se reenvían los
+        marcajes ya confirmados.
+        
+        Returns:
+            Insertados en la base de datos (0 si quedaron en el spool)
+        """
+        return self.store_many([(clock_id, marks)])[0]
+    
+    def flush_spool(self, results: Optional[List["ProcessResult"]] = None) -> None:
+        """
+        Vacía el spool en el hilo actual y completa marks_saved de los resultados.
+        
+        Args:
+            results: Resultados del barrido a actualizar con los insertados
+        """
+        if self.spool is None:
+            return
+        self.spool.flush()
+        saved = self.spool.take_saved()
+        for result in results or []:
+            result.marks_saved += saved.get(result.clock_ip, 0)
+    
+    def flush_logs(self) -> None:
+        """Inserta los logs de conexión acumulados"""
+        if isinstance(self.connection_log, ConnectionLogBuffer):
+            self.connection_log.flush()
+    
+    def flush_due_logs(self) -> None:
+        """Inserta los logs de conexión acumulados si superaron su antigüedad máxima"""
+        if isinstance(self.connection_log, ConnectionLogBuffer):
+            self.connection_log.flush_due()
+    
+    def housekeeping(self) -> None:
+        """Tareas periódicas del modo serve (logs vencidos, sesiones inactivas, cache)"""
+        self.flush_due_logs()
+        if self.sessions is not None:
+            self.sessions.prune()
+        if self.recent_marks is not None:
+            self.recent_marks.flush_due()
+        if time.monotonic() - self._metrics_exported >= _METRICS_INTERVAL:
+            self.export_metrics()
+    
+    def export_metrics(self) -> None:
+        """
+        Escribe el reporte JSON del último barrido (metrics_report) y el
+        textfile de Prometheus (metrics_textfile) si están configurados.
+        Un error al escribirlos no interrumpe la recolección.
+        """
+        collector = self.settings.collector
+        self._metrics_exported = time.monotonic()
+        try:
+            if collector.metrics_report and self.last_sweep is not None:
+                self.last_sweep.write_json(collector.metrics_report)
+            if collector.metrics_textfile:
+                self.metrics.write_textfile(collector.metrics_textfile)
+        except OSError as e:
+            logger.warning(f"No se pudieron escribir las métricas: {e}")
+    
+    @contextmanager
+    def device_connection(
+        self,
+        device: ZKDeviceManager,
+        retries: int = 2,
+    ) -> Generator[Any, None, None]:
+        """Conexión con el reloj: sesión persistente si keep_sessions, si no una nueva"""
+        if self.sessions is not None:
+            connection = self.sessions.session(device, retries=retries)
+        else:
+            connection = device.connect(retries=retries)
+        with ExitStack() as stack:
+            with metrics.span("connect"):
+                conn = stack.enter_context(connection)
+            yield conn
+    
+    def log_connection(self, ip: str, success: bool, observation: str) -> None:
+        """Registra un log de conexión en rrhh.clock_conn (o en el buffer)"""
+        with metrics.span("logs"):
+            self.connection_log.log_connection(ip, success, observation)
+    
+    def device_failed(self, ip: str, error: str) -> None:
+        """
+        Registra un fallo del reloj en rrhh.clock_conn.
+        
+        Con circuit breaker solo se registran los fallos previos a la
+        apertura del circuito y la apertura misma; los fallos repetidos
+        de un circuito abierto no generan filas.
+        """
+        observation = (
+            self.circuits.record_failure(ip, error) if self.circuits is not None else error
+        )
+        if observation:
+            self.log_connection(ip, False, observation[:255])
+    
+    def device_recovered(self, ip: str) -> None:
+        """Cierra el circuito del reloj y registra la recuperación si estaba abierto"""
+        if self.circuits is None:
+            return
+        observation = self.circuits.record_success(ip)
+        if observation:
+            self.log_connection(ip, True, observation)
+    
+    def circuit_allows(self, ip: str) -> bool:
+        """Indica si el circuito del reloj permite procesarlo ahora"""
+        return self.circuits is None or self.circuits.allow(ip)
+    
+    def initialize(self) -> None:
+        """
+        Inicializa la aplicación (crea tablas si no existen).
+        
+        Con ingest_mode "copy" o "auto" verifica el índice ux_person_marks_dedup:
+        sin él el INSERT ... ON CONFLICT de COPY falla, por lo que se guarda
+        con el stored procedure.
+        """
+        logger.info("Inicializando clockControl...")
+        self.db.ensure_tables_exist()
+        if self.ingest_mode != "procedure" and not self.attendance_repo.has_dedup_index():
+            logger.warning(
+                f"ingest_mode={self.ingest_mode} requiere el índice rrhh.ux_person_marks_dedup "
+                "(sql/migrations/001_person_marks_dedup_index.sql); "
+                "se guarda con el stored procedure"
+            )
+            self.ingest_mode = "procedure"
+        logger.info("Inicialización completada")
+    
+    def close(self) -> None:
+        """Libera los recursos compartidos (spool, logs, sesiones con relojes y pool)"""
+        if self.recent_marks is not None:
+            self.recent_marks.flush()
+        if self.spool is not None:
+            self.spool.close()
+            self.spool.spool.close()
+        if self.sessions is not None:
+            self.sessions.close()
+        if isinstance(self.connection_log, ConnectionLogBuffer):
+            self.connection_log.close()
+        self.db.close()
+    
+    def save_marks(self, clock_id: int, marks: Marks) -> int:
+        """
+        Guarda marcajes por stored procedure (JSON) o por COPY según ingest_mode.
+        
+        En modo "auto" los lotes de copy_threshold marcajes o más (p. ej.
+        resincronizaciones completas) usan COPY.
+        
+        Returns:
+            Cantidad de registros insertados
+        """
+        use_copy = self.ingest_mode == "copy" or (
+            self.ingest_mode == "auto"
+            and len(marks) >= self.settings.collector.copy_threshold
+        )
+        with metrics.span("save"):
+            if use_copy:
+                return self.attendance_repo.save_marks_copy(marks)
+            
+            with metrics.span("serialize"):
+                json_data = AttendanceProcessor.to_json(marks)
+            metrics.count("bytes", len(json_data.encode("utf-8")))
+            return self.attendance_repo.save_marks(clock_id, json_data)
+    
+    def fetch_clock(
+        self,
+        result: ProcessResult,
+        port: int = 4370,
+        password: str = "0",
+        reachable: Optional[bool] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> Optional["FetchedLog"]:
+        """
+        Etapa de descarga: verifica el reloj y descarga su log.
+        
+        La conexión con el reloj se cierra (o vuelve a la sesión) apenas
+        termina la descarga; el procesamiento y el guardado ocurren fuera.
+        
+        Args:
+            result: Resultado del reloj (result.clock_ip es su IP)
+            port: Puerto del reloj
+            password: Contraseña del reloj
+            reachable: Resultado de un sondeo previo (None = sondear ahora)
+            cancel: Aviso de tiempo límite excedido; se consulta antes de
+                registrar logs, el estado del circuito o la marca de agua
+            
+        Returns:
+            Log descargado, o None si el reloj no tiene nada que procesar
+            (result queda completo)
+            
+        Raises:
+            ClockControlError: Si falla la conexión o la descarga
+            TaskCancelledError: Si el barrido abandonó el reloj
+        """
+        ip = result.clock_ip
+        
+        # Verificar que el reloj existe en DB (desde el registro en memoria)
+        with metrics.span("registry"):
+            clock = self.registry.get(ip)
+        if not clock:
+            result.error = f"Reloj {ip} no encontrado o inactivo en DB"
+            self.log_connection(ip, False, result.error)
+            return None
+        
+        # Relojes con el circuito abierto se omiten sin sondeo ni log
+        if not self.circuit_allows(ip):
+            result.error = (
+                f"Circuito abierto, próximo intento en "
+                f"{self.circuits.retry_in(ip):.0f}s"
+            )
+            logger.info(f"Reloj {ip} omitido: {result.error}")
+            return None
+        half_open = (
+            self.circuits is not None and self.circuits.state(ip).state == HALF_OPEN
+        )
+        
+        # Verificar conectividad
+        probe_config = self.settings.device
+        device = ZKDeviceManager(ip, port=port, password=password)
+        if reachable is None:
+            with metrics.span("probe"):
+                reachable = device.is_reachable(
+                    attempts=probe_config.ping_attempts,
+                    timeout=probe_config.probe_timeout,
+                    protocol=probe_config.probe_protocol,
+                )
+        
+        observation = describe(reachable, port, probe_config.probe_protocol)
+        self.check_cancelled(ip, cancel)
+        if not reachable:
+            result.error = observation
+            self.device_failed(ip, observation)
+            return None
+        
+        if not half_open:
+            self.log_connection(ip, True, observation)
+        
+        # Conectar y obtener marcajes (una sola vez si es la prueba half-open)
+        with self.device_connection(device, retries=1 if half_open else 2) as conn:
+            self.check_cancelled(ip, cancel)
+            self.device_recovered(ip)
+            with metrics.span("download"):
+                device_info = device.get_device_info(conn)
+                
+                previous = None if self.full_resync else self.watermarks.get(ip)
+                if previous is not None:
+                    record_count = device.get_record_count(conn)
+                    max_age = self.settings.collector.watermark_max_age
+                    if WatermarkStore.is_unchanged(previous, record_count, max_age):
+                        logger.info(f"Sin marcajes nuevos en {ip} ({record_count} registros)")
+                        result.success = True
+                        return None
+                
+                raw_attendances = device.get_attendance(conn)
+        
+        self.check_cancelled(ip, cancel)
+        metrics.count("records", len(raw_attendances or ()))
+        if not raw_attendances:
+            self.watermarks.reset(ip)
+            result.success = True
+            return None
+        
+        return FetchedLog(clock, device_info.ip, raw_attendances, previous, result)
+    
+    def parse_log(self, fetched: "FetchedLog") -> Marks:
+        """
+        Etapa de procesamiento: marcajes posteriores a la marca de agua.
+        """
+        with metrics.span("parse"):
+            new_attendances = WatermarkStore.select_new(
+                fetched.clock.ip, fetched.raw, fetched.previous
+            )
+            marks = self.processor.process_batch(
+                new_attendances,
+                fetched.device_ip,
+                fetched.clock.id,
+            )
+        fetched.result.marks_processed = len(marks)
+        return marks
+    
+    def complete_log(self, fetched: "FetchedLog", saved: int) -> None:
+        """
+        Cierra el procesamiento de un log ya guardado (en la base de datos
+        o de forma durable en el spool): recién entonces avanza la marca de agua.
+        
+        Solo se llama con el guardado confirmado: save_marks lanza
+        DatabaseError si el stored procedure informa un error.
+        """
+        self.watermarks.save(fetched.clock.ip, Watermark.from_records(fetched.raw))
+        fetched.result.marks_saved += saved
+        fetched.result.success = True
+    
+    @staticmethod
+    def check_cancelled(ip: str, cancel: Optional[CancelToken]) -> None:
+        """Lanza TaskCancelledError si el barrido abandonó el reloj por tiempo límite"""
+        if cancel is not None and cancel.cancelled:
+            raise TaskCancelledError(f"Reloj {ip} abandonado por tiempo límite")
+    
+    def record_error(
+        self,
+        result: ProcessResult,
+        error: Exception,
+        cancel: Optional[CancelToken] = None,
+    ) -> None:
+        """Registra en result el error de cualquier etapa del procesamiento de un reloj"""
+        ip = result.clock_ip
+        if isinstance(error, TaskCancelledError) or (cancel is not None and cancel.cancelled):
+            # El barrido ya registró el tiempo límite: sin log ni circuito
+            result.error = str(error)
+            logger.info(f"Resultado tardío de {ip} descartado: {error}")
+        elif isinstance(error, DeviceConnectionError):
+            result.error = str(error)
+            self.device_failed(ip, str(error))
+        elif isinstance(error, ClockControlError):
+            result.error = str(error)
+            logger.error(f"Error procesando {ip}: {error}")
+        else:
+            result.error = f"Error inesperado: {error}"
+            logger.error(f"Error inesperado procesando {ip}", exc_info=error)
+    
+    def save_marks_many(self, batches: List[Tuple[int, Marks]]) -> List[int]:
+        """
+        Guarda marcajes de varios relojes en una sola transacción.
+        
+        Con ingest_mode "copy" o "auto" (sin importar copy_threshold) todos
+        los lotes van en un COPY y un INSERT; con "procedure" se hace una
+        llamada al stored procedure por reloj dentro de la misma transacción.
+        Si falla un reloj no se guarda ninguno.
+        
+        Args:
+            batches: (id de reloj, marcajes) por reloj
+            
+        Returns:
+            Insertados por lote, en el mismo orden
+        """
+        if self.ingest_mode == "procedure":
+            with metrics.span("save"):
+                with metrics.span("serialize"):
+                    payloads = [
+                        (index, clock_id, AttendanceProcessor.to_json(marks))
+                        for index, (clock_id, marks) in enumerate(batches) if marks
+                    ]
+                metrics.count("bytes", sum(len(data.encode("utf-8")) for _, _, data in payloads))
+                saved = self.attendance_repo.save_marks_procedure_many(
+                    [(clock_id, data) for _, clock_id, data in payloads]
+                )
+            inserted = [0] * len(batches)
+            for (index, _, _), count in zip(payloads, saved):
+                inserted[index] = count
+            return inserted
+        
+        with metrics.span("save"):
+            inserted_by_clock = self.attendance_repo.save_marks_many(
+                [marks for _, marks in batches]
+            )
+        # Cada id_reloj_bio se atribuye a su primer lote
+        return [inserted_by_clock.pop(clock_id, 0) for clock_id, _ in batches]
+    
+    def persist_many(self, group: List[Tuple["FetchedLog", Marks]]) -> None:
+        """
+        Etapa de guardado: una escritura para los marcajes de varios relojes
+        y cierre de sus logs.
+        
+        Su tiempo se reparte entre los relojes según sus marcajes. Si la
+        escritura falla no avanza ninguna marca de agua del grupo: los
+        relojes se releen completos en el próximo barrido.
+        """
+        spans = Spans()
+        with metrics.recording(spans):
+            try:
+                saved = self.store_many(
+                    [(fetched.clock.id, marks) for fetched, marks in group]
+                )
+                for (fetched, _), inserted in zip(group, saved):
+                    self.complete_log(fetched, inserted)
+            except Exception as e:
+                for fetched, _ in group:
+                    self.record_error(fetched.result, e)
+        total = sum(len(marks) for _, marks in group)
+        for fetched, marks in group:
+            share = len(marks) / total if total else 1 / len(group)
+            fetched.result.spans.merge(spans, share)
+    
+    def process_single_clock(
+        self,
+        ip: str,
+        port: int = 4370,
+        password: str = "0",
+        reachable: Optional[bool] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> ProcessResult:
+        """
+        Procesa marcajes de un solo reloj.
+        
+        Args:
+            ip: IP del reloj
+            port: Puerto del reloj
+            password: Contraseña del reloj
+            reachable: Resultado de un sondeo previo (None = sondear ahora)
+            cancel: Aviso de tiempo límite excedido: un reloj abandonado no
+                guarda marcajes, ni registra logs, ni avanza la marca de agua
+            
+        Returns:
+            ProcessResult con el resultado del procesamiento
+        """
+        start_time = time.time()
+        result = ProcessResult(clock_ip=ip, success=False)
+        
+        with metrics.recording(result.spans):
+            try:
+                fetched = self.fetch_clock(result, port, password, reachable, cancel)
+                if fetched is not None:
+                    marks = self.parse_log(fetched)
+                    # Guardar en DB (o en el spool local)
+                    self.check_cancelled(ip, cancel)
+                    saved = self.store_marks(fetched.clock.id, marks) if marks else 0
+                    self.check_cancelled(ip, cancel)
+                    self.complete_log(fetched, saved)
+            except Exception as e:
+                self.record_error(result, e, cancel)
+        
+        result.elapsed_time = time.time() - start_time
+        return result
+    
+    def store_many(self, batches: List[Tuple[int, Marks]]) -> List[int]:
+        """
+        Entrega marcajes de varios relojes para su guardado.
+        
+        Args:
+            batches: (id de reloj, marcajes) por reloj
+            
+        Returns:
+            Insertados por lote, en el mismo orden (0 si quedaron en el spool)
+        """
+        if self.recent_marks is not None:
+            batches = [(clock_id, self.recent_marks.filter(marks)) for clock_id, marks in batches]
+        
+        if self.spool is not None:
+            with metrics.span("spool"):
+                self.spool.spool.append([mark for _, marks in batches for mark in marks])
+            self.spool.wake()
+            saved = [0] * len(batches)
+        elif len(batches) == 1:
+            clock_id, marks = batches[0]
+            saved = [self.save_marks(clock_id, marks) if marks else 0]
+        else:
+            saved = self.save_marks_many(batches)
+        
+        # Guardados (o ya existentes en la base de datos): no se reenvían
+        if self.recent_marks is not None:
+            for _, marks in batches:
+                self.recent_marks.add(marks)
+        return saved
+    
+    def process_all_clocks(
+        self,
+        max_workers: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ) -> List[ProcessResult]:
+        """
+        Procesa marcajes de todos los relojes activos.
+        
+        Los relojes se procesan en paralelo con un máximo de max_workers
+        hilos; un reloj que excede el tiempo límite se reporta como fallido
+        sin bloquear al resto. Los marcajes se guardan en una sola
+        escritura al final (ver _run_parallel); con la opción pipeline la
+        descarga, el procesamiento y el guardado corren en etapas separadas
+        (ver _run_pipeline).
+        
+        Args:
+            max_workers: Relojes simultáneos (default: settings.collector)
+            deadline: Segundos máximos por reloj (default: settings.collector)
+            
+        Returns:
+            Lista de ProcessResult con resultados de cada reloj,
+            en el mismo orden que el registro de relojes activos
+            (el reporte con tiempo real y etapas queda en last_sweep)
+        """
+        started_at = time.time()
+        start = time.perf_counter()
+        sweep = Spans()
+        with metrics.recording(sweep):
+            results = self._sweep(max_workers, deadline)
+        if results:
+            self.last_sweep = SweepReport(
+                results, time.perf_counter() - start, sweep, started_at=started_at
+            )
+            self.metrics.observe_sweep(self.last_sweep)
+        return results
+    
+    def _sweep(
+        self,
+        max_workers: Optional[int],
+        deadline: Optional[float],
+    ) -> List[ProcessResult]:
+        """Barrido de process_all_clocks; las etapas globales se miden en el hilo actual"""
+        # Registro completo una vez por barrido; cada reloj se resuelve
+        # luego desde el índice en memoria
+        with metrics.span("registry"):
+            clocks = self.active_clocks()
+        
+        if not clocks:
+            if self.shard is not None:
+                logger.warning(f"Ningún reloj asignado al recolector {self.shard.collector_id}")
+            else:
+                logger.warning("No hay relojes activos configurados")
+            return []
+        
+        collector = self.settings.collector
+        workers = max_workers or collector.max_workers
+        limit = deadline if deadline is not None else collector.clock_deadline
+        
+        logger.info(
+            f"Procesando {len(clocks)} relojes activos "
+            f"({workers} en paralelo, límite {limit:.0f}s por reloj)"
+        )
+        
+        # Un solo sondeo concurrente para toda la flota
+        probe_config = self.settings.device
+        with metrics.span("probe"):
+            reachability = probe_many(
+                # Los relojes con el circuito abierto no se sondean
+                [(clock.ip, clock.port) for clock in clocks if self.circuit_allows(clock.ip)],
+                timeout=probe_config.probe_timeout,
+                concurrency=probe_config.probe_concurrency,
+                protocol=probe_config.probe_protocol,
+            )
+        
+        # El hilo de un reloj vencido sigue en ejecución: se le avisa
+        # antes de registrar el fallo para que no registre nada después
+        tokens = {clock.ip: CancelToken() for clock in clocks}
+        
+        def timed_out(clock: Clock) -> ProcessResult:
+            tokens[clock.ip].cancel()
+            error = f"Tiempo límite excedido ({limit:.0f}s)"
+            self.device_failed(clock.ip, error)
+            return ProcessResult(
+                clock_ip=clock.ip,
+                success=False,
+                error=error,
+                elapsed_time=limit,
+            )
+        
+        if collector.pipeline:
+            results = self._run_pipeline(
+                clocks, reachability, workers, limit if limit > 0 else None, timed_out, tokens
+            )
+        else:
+            results = self._run_parallel(
+                clocks, reachability, workers, limit if limit > 0 else None, timed_out, tokens
+            )
+        if self.spool is not None:
+            with metrics.span("spool"):
+                self.flush_spool(results)
+        with metrics.span("logs"):
+            self.flush_logs()
+        return results
+    
+    def _run_parallel(
+        self,
+        clocks: List[Clock],
+        reachability: Dict[str, bool],
+        workers: int,
+        deadline: Optional[float],
+        timed_out: Callable[[Clock], ProcessResult],
+        tokens: Dict[str, CancelToken],
+    ) -> List[ProcessResult]:
+        """
+        Barrido por defecto: workers hilos descargan y procesan cada reloj
+        (el tiempo límite cubre ambas etapas) y al final los marcajes de
+        todos los relojes terminados a tiempo se guardan en una sola
+        escritura (persist_many).
+        """
+        pending: Dict[str, Tuple[FetchedLog, Marks]] = {}
+        started = {}
+        
+        def process(clock: Clock) -> ProcessResult:
+            logger.info(f"Procesando reloj: {clock.ip}")
+            result = ProcessResult(clock_ip=clock.ip, success=False)
+            started[clock.ip] = time.time()
+            with metrics.recording(result.spans):
+                try:
+                    fetched = self.fetch_clock(
+                        result,
+                        clock.port,
+                        clock.password,
+                        reachability.get(clock.ip),
+                        tokens[clock.ip],
+                    )
+                    if fetched is not None:
+                        marks = self.parse_log(fetched)
+                        self.check_cancelled(clock.ip, tokens[clock.ip])
+                        pending[clock.ip] = (fetched, marks)
+                except Exception as e:
+                    self.record_error(result, e, tokens[clock.ip])
+            result.elapsed_time = time.time() - started[clock.ip]
+            return result
+        
+        results = run_bounded(
+            process,
+            clocks,
+            max_workers=workers,
+            deadline=deadline,
+            on_timeout=timed_out,
+        )
+        
+        # Un reloj vencido tiene otro resultado (el de timed_out): su log
+        # descargado tarde no se guarda
+        group = [
+            pending[result.clock_ip] for result in results
+            if result.clock_ip in pending and pending[result.clock_ip][0].result is result
+        ]
+        if group:
+            self.persist_many(group)
+            for fetched, _ in group:
+                fetched.result.elapsed_time = time.time() - started[fetched.result.clock_ip]
+        return results
+    
+    def _run_pipeline(
+        self,
+        clocks: List[Clock],
+        reachability: Dict[str, bool],
+        workers: int,
+        deadline: Optional[float],
+        timed_out: Callable[[Clock], ProcessResult],
+        tokens: Dict[str, CancelToken],
+    ) -> List[ProcessResult]:
+        """
+        Barrido por etapas: workers hilos descargan (el tiempo límite cubre
+        solo la descarga), un hilo procesa y otro guarda, agrupando los
+        marcajes de varios relojes hasta pipeline_merge_marks por escritura
+        (por defecto una sola escritura si el barrido no supera ese tamaño).
+        Si el guardado se atrasa las colas se llenan y la descarga espera.
+        """
+        collector = self.settings.collector
+        results = {
+            clock.ip: ProcessResult(clock_ip=clock.ip, success=False) for clock in clocks
+        }
+        started = {}
+        
+        def finish(result: ProcessResult) -> None:
+            result.elapsed_time = time.time() - started[result.clock_ip]
+        
+        def fetch(clock: Clock) -> Optional[FetchedLog]:
+            logger.info(f"Procesando reloj: {clock.ip}")
+            result = results[clock.ip]
+            started[clock.ip] = time.time()
+            with metrics.recording(result.spans):
+                try:
+                    fetched = self.fetch_clock(
+                        result,
+                        clock.port,
+                        clock.password,
+                        reachability.get(clock.ip),
+                        tokens[clock.ip],
+                    )
+                except Exception as e:
+                    self.record_error(result, e, tokens[clock.ip])
+                    fetched = None
+            if fetched is None:
+                finish(result)
+            return fetched
+        
+        def parse(fetched: FetchedLog) -> Optional[Tuple[FetchedLog, Marks]]:
+            with metrics.recording(fetched.result.spans):
+                try:
+                    return fetched, self.parse_log(fetched)
+                except Exception as e:
+                    self.record_error(fetched.result, e)
+                    finish(fetched.result)
+                    return None
+        
+        def persist(group: List[Tuple[FetchedLog, Marks]]) -> None:
+            self.persist_many(group)
+            for fetched, _ in group:
+                finish(fetched.result)
+        
+        def expire(clock: Clock) -> None:
+            # Resultado nuevo: el hilo vencido puede seguir usando el anterior
+            results[clock.ip] = timed_out(clock)
+        
+        StagedPipeline(
+            fetch,
+            parse,
+            persist,
+            max_workers=workers,
+            queue_size=collector.pipeline_queue_size,
+            merge_size=collector.pipeline_merge_marks,
+            size=lambda item: len(item[1]),
+            # Negativo: un grupo se guarda al llenarse o al terminar el barrido
+            linger=collector.pipeline_linger if collector.pipeline_linger >= 0 else None,
+            deadline=deadline,
+            on_timeout=expire,
+        ).run(clocks)
+        return [results[clock.ip] for clock in clocks]
+    
+    def poll_clocks(
+        self,
+        clocks: List[Clock],
+        submit: Callable[[Clock, Callable[[], ProcessResult]], None],
+    ) -> None:
+        """
+        Sondea un lote de relojes vencidos y encola su procesamiento (modo serve).
+        
+        Args:
+            clocks: Relojes a procesar
+            submit: Encola la función que procesa cada reloj
+        """
+        probe_config = self.settings.device
+        reachability = probe_many(
+            # Los relojes con el circuito abierto no se sondean
+            [(clock.ip, clock.port) for clock in clocks if self.circuit_allows(clock.ip)],
+            timeout=probe_config.probe_timeout,
+            concurrency=probe_config.probe_concurrency,
+            protocol=probe_config.probe_protocol,
+        )
+        
+        for clock in clocks:
+            def process(clock: Clock = clock) -> ProcessResult:
+                result = self.process_single_clock(
+                    ip=clock.ip,
+                    port=clock.port,
+                    password=clock.password,
+                    reachable=reachability.get(clock.ip),
+                )
+                if self.poll_policy is not None:
+                    self.poll_policy.record(clock.ip, result.success, result.marks_processed)
+                self.metrics.observe(result)
+                logger.info(
+                    f"Reloj {clock.ip}: {'OK' if result.success else 'ERROR'} "
+                    f"({result.marks_saved}/{result.marks_processed} marcajes, "
+                    f"{result.elapsed_time:.2f}s)"
+                    + (f" - {result.error}" if result.error else "")
+                )
+                return result
+            submit(clock, process)
+    
+    def create_poll_policy(self) -> "AdaptivePollPolicy":
+        """
+        Crea la política de sondeo adaptativo con el historial de la base de datos.
+        
+        Los fallos consecutivos se toman de rrhh.clock_conn y el perfil de
+        marcajes por hora de rrhh.person_marks; si la consulta falla se
+        empieza sin historial.
+        """
+        from clockcontrol.core.adaptive import AdaptivePollPolicy
+        
+        collector = self.settings.collector
+        policy = AdaptivePollPolicy(
+            min_interval=collector.poll_min_interval,
+            max_interval=collector.poll_max_interval,
+            target_marks=collector.poll_target_marks,
+        )
+        try:
+            policy.bootstrap(
+                self.attendance_repo.get_failure_streaks(),
+                self.attendance_repo.get_hourly_mark_rates(),
+            )
+        except ClockControlError as e:
+            logger.warning(f"Sondeo adaptativo sin historial inicial: {e}")
+        return policy
+    
+    def poll_interval_for(self, clock: Clock) -> float:
+        """
+        Intervalo hasta el próximo sondeo de un reloj en modo serve.
+        
+        Un valor en [clockcontrol.intervals] tiene prioridad; si no, se usa
+        la política adaptativa (adaptive_polling) o poll_interval.
+        """
+        collector = self.settings.collector
+        if clock.ip in collector.poll_intervals or self.poll_policy is None:
+            return collector.poll_interval_for(clock.ip)
+        return self.poll_policy.interval_for(clock.ip)
+    
+    def create_scheduler(self, max_workers: Optional[int] = None) -> "PollScheduler":
+        """
+        Crea el planificador residente del modo serve.
+        
+        La lista de relojes se recarga cada clock_refresh_interval segundos;
+        el intervalo de cada reloj lo decide poll_interval_for.
+        """
+        from clockcontrol.core.scheduler import PollScheduler
+        
+        collector = self.settings.collector
+        if collector.adaptive_polling and self.poll_policy is None:
+            self.poll_policy = self.create_poll_policy()
+        return PollScheduler(
+            list_clocks=self.active_clocks,
+            poll_batch=self.poll_clocks,
+            interval_for=self.poll_interval_for,
+            max_workers=max_workers or collector.max_workers,
+            refresh_interval=self.clock_refresh_interval,
+            on_idle=self.housekeeping,
+            initial_delay=(
+                (lambda clock: self.poll_policy.initial_delay(clock.ip))
+                if self.poll_policy is not None else None
+            ),
+        )
+    
+    def create_live_worker(
+        self,
+        clock: Clock,
+        writer: "MicroBatchWriter",
+        stop: threading.Event,
+    ) -> "LiveCaptureWorker":
+        """
+        Crea el receptor en tiempo real de un reloj (modo stream).
+        
+        Cada stream_reconcile_interval segundos el receptor hace un sondeo
+        incremental normal como respaldo de eventos perdidos; los marcajes
+        repetidos (los ya guardados por el tiempo real) los descarta la base
+        de datos y el sondeo los confirma con 0 insertados, por lo que la
+        marca de agua avanza igual.
+        """
+        from clockcontrol.core.stream import LiveCaptureWorker
+        
+        return LiveCaptureWorker(
+            device=ZKDeviceManager(clock.ip, port=clock.port, password=clock.password),
+            clock_id=clock.id,
+            processor=self.processor,
+            writer=writer,
+            reconcile=lambda: self.process_single_clock(
+                ip=clock.ip, port=clock.port, password=clock.password
+            ),
+            stop=stop,
+            reconcile_interval=self.settings.collector.stream_reconcile_interval,
+        )
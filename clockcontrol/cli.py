@@ -1,163 +1,39 @@
 """
 Interface de línea de comandos para clockControl
+
+Los módulos pesados (pyzk, psycopg2, asyncio) se importan recién al
+ejecutar un comando, no al importar este módulo ni con --help.
 """
+from __future__ import annotations
+
 import logging
+import signal
 import sys
+import threading
 import time
-from dataclasses import dataclass
-from typing import List, Optional
-
-from clockcontrol.config.settings import Settings, get_settings
-from clockcontrol.core.attendance import AttendanceProcessor, AttendanceMark
-from clockcontrol.core.device import ZKDeviceManager
-from clockcontrol.core.exceptions import (
-    ClockControlError,
-    ConfigurationError,
-    DeviceConnectionError,
-)
-from clockcontrol.database.connection import DatabaseConnection
-from clockcontrol.database.repositories import ClockRepository, AttendanceRepository
-from clockcontrol.database.models import Clock
 
-logger = logging.getLogger(__name__)
+from clockcontrol.core.exceptions import ConfigurationError
 
+# Equivale a typing.TYPE_CHECKING sin importar typing (mypy lo reconoce)
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, List, Optional
 
-@dataclass
-class ProcessResult:
-    """Resultado del procesamiento de un reloj"""
-    clock_ip: str
-    success: bool
-    marks_processed: int = 0
-    marks_saved: int = 0
-    error: Optional[str] = None
-    elapsed_time: float = 0.0
+    from clockcontrol.app import ClockControlApp, ProcessResult
+    from clockcontrol.utils.metrics import SweepReport
+    from clockcontrol.utils.profiling import Profiler
 
+logger = logging.getLogger(__name__)
+
+# Nombres que antes se importaban desde este módulo
+_APP_NAMES = ("ClockControlApp", "ProcessResult", "FetchedLog")
 
-class ClockControlApp:
-    """
-    Aplicación principal de clockControl.
-    
-    Orquesta el flujo de obtención de marcajes desde relojes biométricos.
-    """
-    
-    def __init__(self, settings: Optional[Settings] = None):
-        """
-        Args:
-            settings: Configuración de la aplicación (usa default si no se provee)
-        """
-        self.settings = settings or get_settings()
-        self.db = DatabaseConnection(self.settings.database.to_dict())
-        self.clock_repo = ClockRepository(self.db)
-        self.attendance_repo = AttendanceRepository(self.db)
-        self.processor = AttendanceProcessor(days_back=1)
-    
-    def initialize(self) -> None:
-        """Inicializa la aplicación (crea tablas si no existen)"""
-        logger.info("Inicializando clockControl...")
-        self.db.ensure_tables_exist()
-        logger.info("Inicialización completada")
-    
-    def process_single_clock(
-        self,
-        ip: str,
-        port: int = 4370,
-        password: str = "0",
-    ) -> ProcessResult:
-        """
-        Procesa marcajes de un solo reloj.
-        
-        Args:
-            ip: IP del reloj
-            port: Puerto del reloj
-            password: Contraseña del reloj
-            
-        Returns:
-            ProcessResult con el resultado del procesamiento
-        """
-        start_time = time.time()
-        result = ProcessResult(clock_ip=ip, success=False)
-        
-        try:
-            # Verificar que el reloj existe en DB
-            clock = self.clock_repo.get_by_ip(ip)
-            if not clock:
-                result.error = f"Reloj {ip} no encontrado o inactivo en DB"
-                self.attendance_repo.log_connection(ip, False, result.error)
-                return result
-            
-            # Verificar conectividad
-            device = ZKDeviceManager(ip, port=port, password=password)
-            if not device.is_reachable():
-                result.error = "Sin respuesta a ping"
-                self.attendance_repo.log_connection(ip, False, result.error)
-                return result
-            
-            self.attendance_repo.log_connection(ip, True, "Ping exitoso")
-            
-            # Conectar y obtener marcajes
-            with device.connect() as conn:
-                device_info = device.get_device_info(conn)
-                raw_attendances = device.get_attendance(conn)
-                
-                if not raw_attendances:
-                    result.success = True
-                    result.elapsed_time = time.time() - start_time
-                    return result
-                
-                # Procesar marcajes
-                marks = self.processor.process(
-                    raw_attendances,
-                    device_info.ip,
-                    clock.id,
-                )
-                result.marks_processed = len(marks)
-                
-                # Guardar en DB
-                if marks:
-                    json_data = AttendanceProcessor.to_json(marks)
-                    result.marks_saved = self.attendance_repo.save_marks(clock.id, json_data)
-                
-                result.success = True
-                
-        except DeviceConnectionError as e:
-            result.error = str(e)
-            self.attendance_repo.log_connection(ip, False, str(e)[:255])
-        except ClockControlError as e:
-            result.error = str(e)
-            logger.error(f"Error procesando {ip}: {e}")
-        except Exception as e:
-            result.error = f"Error inesperado: {e}"
-            logger.exception(f"Error inesperado procesando {ip}")
-        
-        result.elapsed_time = time.time() - start_time
-        return result
-    
-    def process_all_clocks(self) -> List[ProcessResult]:
-        """
-        Procesa marcajes de todos los relojes activos.
-        
-        Returns:
-            Lista de ProcessResult con resultados de cada reloj
-        """
-        clocks = self.clock_repo.get_all_active()
-        
-        if not clocks:
-            logger.warning("No hay relojes activos configurados")
-            return []
-        
-        logger.info(f"Procesando {len(clocks)} relojes activos")
-        results = []
-        
-        for i, clock in enumerate(clocks, 1):
-            logger.info(f"[{i}/{len(clocks)}] Procesando reloj: {clock.ip}")
-            result = self.process_single_clock(
-                ip=clock.ip,
-                port=clock.port,
-                password=clock.password,
-            )
-            results.append(result)
-        
-        return results
+
+def __getattr__(name: str) -> Any:
+    if name in _APP_NAMES:
+        from clockcontrol import app
+        return getattr(app, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def print_banner() -> None:
@@ -178,12 +54,20 @@ def print_result(result: ProcessResult) -> None:
         print(f"      Error: {result.error}")
 
 
-def print_summary(results: List[ProcessResult]) -> None:
-    """Imprime resumen de procesamiento"""
+def print_summary(results: List[ProcessResult], report: Optional[SweepReport] = None) -> None:
+    """
+    Imprime resumen de procesamiento.
+    
+    El tiempo total es el tiempo real del barrido (los relojes se procesan
+    en paralelo); los tiempos por etapa suman todos los relojes.
+    """
     successful = sum(1 for r in results if r.success)
     total_processed = sum(r.marks_processed for r in results)
     total_saved = sum(r.marks_saved for r in results)
-    total_time = sum(r.elapsed_time for r in results)
+    if report is not None:
+        total_time = report.wall_time
+    else:
+        total_time = max((r.elapsed_time for r in results), default=0.0)
     
     print("\n" + "=" * 60)
     print("  RESUMEN")
@@ -192,13 +76,50 @@ def print_summary(results: List[ProcessResult]) -> None:
     print(f"  Marcajes procesados: {total_processed}")
     print(f"  Marcajes guardados: {total_saved}")
     print(f"  Tiempo total: {total_time:.2f}s")
+    if report is not None:
+        stages = report.stage_totals()
+        if stages:
+            print("  Tiempo por etapa (suma de relojes):")
+            for stage, seconds in stages.items():
+                print(f"      {stage:<10} {seconds:>9.2f}s")
     print("=" * 60 + "\n")
 
 
-def run_single(ip: str, port: int = 4370, password: str = "0") -> int:
+def create_profiler(profile_dir: Optional[str], name: str) -> Optional[Profiler]:
+    """Crea el perfilador de --profile (None si no se pidió)"""
+    if profile_dir is None:
+        return None
+    from clockcontrol.utils.profiling import Profiler
+    return Profiler(profile_dir, name)
+
+
+def print_profile(profiler: Optional[Profiler], top: int) -> None:
+    """Imprime las funciones más costosas del perfil y dónde quedaron los archivos"""
+    if profiler is None:
+        return
+    print("=" * 60)
+    print(f"  PERFIL (top {top} por tiempo acumulado)")
+    print("=" * 60)
+    profiler.print_report(top)
+    print()
+
+
+def run_single(
+    ip: str,
+    port: int = 4370,
+    password: str = "0",
+    full_resync: bool = False,
+    profile_dir: Optional[str] = None,
+    profile_top: int = 25,
+) -> int:
     """
     Ejecuta modo individual (un solo reloj).
     
+    Args:
+        full_resync: Procesa el log completo ignorando la marca de agua
+        profile_dir: Perfila el procesamiento y guarda el perfil aquí (None = sin perfil)
+        profile_top: Funciones a mostrar del perfil
+    
     Returns:
         Código de salida (0=éxito, 1=error)
     """
@@ -207,12 +128,24 @@ def run_single(ip: str, port: int = 4370, password: str = "0") -> int:
     print(f"  Reloj: {ip}:{port}")
     print()
     
+    from clockcontrol.app import ClockControlApp
+    
+    app = None
+    profiler = create_profiler(profile_dir, f"single-{ip}")
     try:
-        app = ClockControlApp()
+        app = ClockControlApp(full_resync=full_resync)
         app.initialize()
-        result = app.process_single_clock(ip, port, password)
+        if profiler is not None:
+            profiler.start()
+        try:
+            result = app.process_single_clock(ip, port, password)
+            app.flush_spool([result])
+        finally:
+            if profiler is not None:
+                profiler.stop()
         
         print_result(result)
+        print_profile(profiler, profile_top)
         return 0 if result.success else 1
         
     except ConfigurationError as e:
@@ -222,12 +155,28 @@ def run_single(ip: str, port: int = 4370, password: str = "0") -> int:
         print(f"\n  ✗ Error: {e}")
         logger.exception("Error en modo individual")
         return 1
+    finally:
+        if app is not None:
+            app.close()
 
 
-def run_all() -> int:
+def run_all(
+    max_workers: Optional[int] = None,
+    deadline: Optional[float] = None,
+    full_resync: bool = False,
+    profile_dir: Optional[str] = None,
+    profile_top: int = 25,
+) -> int:
     """
     Ejecuta modo masivo (todos los relojes).
     
+    Args:
+        max_workers: Relojes simultáneos (None = valor de configuración)
+        deadline: Segundos máximos por reloj (None = valor de configuración)
+        full_resync: Procesa el log completo ignorando las marcas de agua
+        profile_dir: Perfila el barrido y guarda el perfil aquí (None = sin perfil)
+        profile_top: Funciones a mostrar del perfil
+    
     Returns:
         Código de salida (0=éxito, 1=error parcial, 2=error total)
     """
@@ -235,10 +184,20 @@ def run_all() -> int:
     print(f"  Modo: Masivo (todos los relojes)")
     print()
     
+    from clockcontrol.app import ClockControlApp
+    
+    app = None
+    profiler = create_profiler(profile_dir, "all")
     try:
-        app = ClockControlApp()
+        app = ClockControlApp(full_resync=full_resync)
         app.initialize()
-        results = app.process_all_clocks()
+        if profiler is not None:
+            profiler.start()
+        try:
+            results = app.process_all_clocks(max_workers, deadline)
+        finally:
+            if profiler is not None:
+                profiler.stop()
         
         if not results:
             print("  No hay relojes activos para procesar")
@@ -247,7 +206,9 @@ def run_all() -> int:
         for result in results:
             print_result(result)
         
-        print_summary(results)
+        print_summary(results, app.last_sweep)
+        print_profile(profiler, profile_top)
+        app.export_metrics()
         
         successful = sum(1 for r in results if r.success)
         if successful == len(results):
@@ -264,6 +225,174 @@ def run_all() -> int:
         print(f"\n  ✗ Error: {e}")
         logger.exception("Error en modo masivo")
         return 2
+    finally:
+        if app is not None:
+            app.close()
+
+
+def run_serve(max_workers: Optional[int] = None) -> int:
+    """
+    Ejecuta modo residente: sondea cada reloj según su intervalo hasta
+    recibir SIGTERM o SIGINT.
+    
+    Args:
+        max_workers: Relojes simultáneos (None = valor de configuración)
+    
+    Returns:
+        Código de salida (0=detención normal, 1=error)
+    """
+    print_banner()
+    print(f"  Modo: Residente (serve)")
+    print()
+    
+    from clockcontrol.app import ClockControlApp
+    
+    app = None
+    server = None
+    try:
+        app = ClockControlApp()
+        app.initialize()
+        scheduler = app.create_scheduler(max_workers)
+        collector = app.settings.collector
+        if collector.metrics_port:
+            from clockcontrol.utils.metrics import MetricsServer
+            server = MetricsServer(app.metrics, collector.metrics_host, collector.metrics_port)
+            server.start()
+        
+        def handle_signal(signum, frame):
+            logger.info(f"Señal {signal.Signals(signum).name} recibida")
+            scheduler.stop()
+        
+        signal.signal(signal.SIGTERM, handle_signal)
+        signal.signal(signal.SIGINT, handle_signal)
+        
+        scheduler.run()
+        return 0
+        
+    except ConfigurationError as e:
+        print(f"\n  ✗ Error de configuración: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n  ✗ Error: {e}")
+        logger.exception("Error en modo residente")
+        return 1
+    finally:
+        if server is not None:
+            server.close()
+        # Logs pendientes y pool se liberan después de vaciar los sondeos
+        if app is not None:
+            app.export_metrics()
+            app.release_leases()
+            app.close()
+
+
+def run_stream() -> int:
+    """
+    Ejecuta modo tiempo real: escucha los eventos de cada reloj activo y
+    guarda los marcajes en segundos, hasta recibir SIGTERM o SIGINT.
+    
+    Returns:
+        Código de salida (0=detención normal, 1=error)
+    """
+    print_banner()
+    print(f"  Modo: Tiempo real (stream)")
+    print()
+    
+    from clockcontrol.app import ClockControlApp
+    from clockcontrol.core.stream import MicroBatchWriter
+    
+    app = None
+    writer = None
+    stop = threading.Event()
+    threads = {}
+    worker_stops = {}
+    try:
+        app = ClockControlApp()
+        app.initialize()
+        if app.sessions is not None:
+            # El live capture ocupa su propia conexión; una sesión abierta
+            # para la reconciliación sería una segunda conexión simultánea
+            app.sessions.close()
+            app.sessions = None
+        collector = app.settings.collector
+        
+        writer = MicroBatchWriter(
+            app.store_marks,
+            max_batch=collector.stream_max_batch,
+            max_delay=collector.stream_max_delay,
+        )
+        writer.start()
+        
+        def handle_signal(signum, frame):
+            logger.info(f"Señal {signal.Signals(signum).name} recibida")
+            stop.set()
+        
+        signal.signal(signal.SIGTERM, handle_signal)
+        signal.signal(signal.SIGINT, handle_signal)
+        
+        last_refresh = None
+        while not stop.is_set():
+            now = time.monotonic()
+            if last_refresh is None or now - last_refresh >= app.clock_refresh_interval:
+                last_refresh = now
+                clocks = {clock.ip: clock for clock in app.active_clocks()}
+                # Relojes dados de baja (o de otro recolector): se detiene su receptor
+                for ip in list(threads):
+                    if ip not in clocks:
+                        worker_stops.pop(ip).set()
+                        threads.pop(ip)
+                # Relojes nuevos (o cuyo receptor terminó)
+                for ip, clock in clocks.items():
+                    if ip not in threads or not threads[ip].is_alive():
+                        worker_stops[ip] = threading.Event()
+                        worker = app.create_live_worker(clock, writer, worker_stops[ip])
+                        threads[ip] = threading.Thread(
+                            target=worker.run, name=f"clockcontrol-live-{ip}", daemon=True
+                        )
+                        threads[ip].start()
+                logger.info(f"Tiempo real: {len(threads)} relojes escuchados")
+            app.housekeeping()
+            stop.wait(1.0)
+        return 0
+        
+    except ConfigurationError as e:
+        print(f"\n  ✗ Error de configuración: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n  ✗ Error: {e}")
+        logger.exception("Error en modo tiempo real")
+        return 1
+    finally:
+        for worker_stop in worker_stops.values():
+            worker_stop.set()
+        for thread in threads.values():
+            thread.join()
+        if writer is not None:
+            writer.close()
+        if app is not None:
+            app.release_leases()
+            app.close()
+
+
+def add_profile_arguments(parser: Any) -> None:
+    """Opciones --profile de los comandos single y all"""
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Perfilar el procesamiento (cProfile y muestreo de pilas) "
+             "e imprimir las funciones más costosas",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        default="profiles",
+        help="Directorio de los archivos .pstats y .collapsed (default: profiles)",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=25,
+        help="Funciones a mostrar, por tiempo acumulado (default: 25)",
+    )
 
 
 def main() -> None:
@@ -309,19 +438,72 @@ def main() -> None:
         default="0",
         help="Contraseña del reloj (default: 0)",
     )
+    single_parser.add_argument(
+        "--full-resync",
+        action="store_true",
+        help="Procesar el log completo del reloj ignorando la marca de agua",
+    )
+    add_profile_arguments(single_parser)
     
     # Comando: all
-    subparsers.add_parser(
+    all_parser = subparsers.add_parser(
         "all",
         help="Obtener marcajes de todos los relojes activos",
     )
+    all_parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=None,
+        help="Relojes procesados en paralelo (default: max_workers del .ini u 8)",
+    )
+    all_parser.add_argument(
+        "-d", "--deadline",
+        type=float,
+        default=None,
+        help="Tiempo límite por reloj en segundos, 0 = sin límite "
+             "(default: clock_deadline del .ini o 60)",
+    )
+    all_parser.add_argument(
+        "--full-resync",
+        action="store_true",
+        help="Procesar el log completo de cada reloj ignorando las marcas de agua",
+    )
+    add_profile_arguments(all_parser)
+    
+    # Comando: serve
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Proceso residente que sondea cada reloj según su intervalo",
+    )
+    serve_parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=None,
+        help="Relojes procesados en paralelo (default: max_workers del .ini u 8)",
+    )
+    
+    # Comando: stream
+    subparsers.add_parser(
+        "stream",
+        help="Recibir marcajes en tiempo real (live capture) con reconciliación periódica",
+    )
     
     args = parser.parse_args()
     
     if args.command == "single":
-        sys.exit(run_single(args.address, args.port, args.password))
+        sys.exit(run_single(
+            args.address, args.port, args.password, args.full_resync,
+            args.profile_dir if args.profile else None, args.profile_top,
+        ))
     elif args.command == "all":
-        sys.exit(run_all())
+        sys.exit(run_all(
+            args.workers, args.deadline, args.full_resync,
+            args.profile_dir if args.profile else None, args.profile_top,
+        ))
+    elif args.command == "serve":
+        sys.exit(run_serve(args.workers))
+    elif args.command == "stream":
+        sys.exit(run_stream())
     else:
         parser.print_help()
         sys.exit(0)
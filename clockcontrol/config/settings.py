@@ -4,10 +4,10 @@ Configuración centralizada del sistema
 import logging
 import os
 from configparser import ConfigParser
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
 from clockcontrol.core.exceptions import ConfigurationError
 
@@ -20,6 +20,9 @@ class DatabaseConfig:
     database: str
     user: str
     password: str
+    pool_min: int = 1
+    pool_max: int = 10
+    pool_health_check: float = 30.0
 
     def to_dict(self) -> dict:
         """Convierte a diccionario para psycopg2"""
@@ -47,6 +50,61 @@ class DeviceConfig:
     default_timeout: int = 10
     default_password: str = "0"
     ping_attempts: int = 2
+    probe_timeout: float = 2.0
+    probe_protocol: str = "auto"
+    probe_concurrency: int = 256
+
+
+@dataclass
+class CollectorConfig:
+    """Configuración del modo masivo (sección [clockcontrol] del .ini)"""
+    max_workers: int = 8
+    clock_deadline: float = 60.0
+    incremental: bool = True
+    watermark_max_age: float = 3600.0
+    state_dir: str = "state"
+    registry_ttl: float = 300.0
+    conn_log_buffer: bool = True
+    conn_log_max_entries: int = 500
+    conn_log_max_age: float = 30.0
+    ingest_mode: str = "auto"
+    copy_threshold: int = 1000
+    poll_interval: float = 60.0
+    poll_intervals: Dict[str, float] = field(default_factory=dict)
+    adaptive_polling: bool = False
+    poll_min_interval: float = 15.0
+    poll_max_interval: float = 900.0
+    poll_target_marks: float = 10.0
+    spool: bool = False
+    spool_batch: int = 5000
+    circuit_breaker: bool = True
+    circuit_failure_threshold: int = 3
+    circuit_open_interval: float = 300.0
+    circuit_max_open_interval: float = 3600.0
+    keep_sessions: bool = False
+    max_sessions: int = 32
+    session_idle_timeout: float = 300.0
+    stream_reconcile_interval: float = 300.0
+    stream_max_delay: float = 2.0
+    stream_max_batch: int = 500
+    pipeline: bool = False
+    pipeline_queue_size: int = 32
+    pipeline_merge_marks: int = 5000
+    pipeline_linger: float = -1.0
+    dedup_cache: bool = False
+    dedup_max_entries: int = 200000
+    metrics_textfile: str = ""
+    metrics_report: str = ""
+    metrics_port: int = 0
+    metrics_host: str = "127.0.0.1"
+    sharding: bool = False
+    collector_id: str = ""
+    lease_ttl: float = 180.0
+    run_interval: float = 0.0
+
+    def poll_interval_for(self, ip: str) -> float:
+        """Intervalo de sondeo de un reloj en modo serve (segundos)"""
+        return self.poll_intervals.get(ip, self.poll_interval)
 
 
 class Settings:
@@ -60,6 +118,8 @@ class Settings:
         self.config_file = self._find_config_file(config_file)
         self.section = section
         self._db_config: Optional[DatabaseConfig] = None
+        self._collector_config: Optional[CollectorConfig] = None
+        self._parser: Optional[ConfigParser] = None
         self.logging = LoggingConfig()
         self.device = DeviceConfig()
         
@@ -107,10 +167,23 @@ class Settings:
             self._db_config = self._load_database_config()
         return self._db_config
     
+    @property
+    def collector(self) -> CollectorConfig:
+        """Obtiene la configuración del modo masivo (lazy loading)"""
+        if self._collector_config is None:
+            self._collector_config = self._load_collector_config()
+        return self._collector_config
+    
+    def _read_config(self) -> ConfigParser:
+        """Lee el archivo de configuración una sola vez"""
+        if self._parser is None:
+            self._parser = ConfigParser()
+            self._parser.read(self.config_file)
+        return self._parser
+    
     def _load_database_config(self) -> DatabaseConfig:
         """Carga la configuración de base de datos desde el archivo"""
-        parser = ConfigParser()
-        parser.read(self.config_file)
+        parser = self._read_config()
         
         if not parser.has_section(self.section):
             raise ConfigurationError(
@@ -124,9 +197,192 @@ class Settings:
                 database=parser.get(self.section, "database"),
                 user=parser.get(self.section, "user"),
                 password=parser.get(self.section, "password"),
+                pool_min=parser.getint(self.section, "pool_min", fallback=1),
+                pool_max=parser.getint(self.section, "pool_max", fallback=10),
+                pool_health_check=parser.getfloat(
+                    self.section, "pool_health_check", fallback=30.0
+                ),
             )
         except Exception as e:
             raise ConfigurationError(f"Error leyendo configuración: {e}")
+    
+    def _load_collector_config(self) -> CollectorConfig:
+        """
+        Carga la configuración del modo masivo.
+        
+        La sección [clockcontrol] es opcional; si no existe se usan
+        los valores por defecto.
+        """
+        parser = self._read_config()
+        section = "clockcontrol"
+        defaults = CollectorConfig()
+        
+        try:
+            # Segundos entre ejecuciones de "all" (cron o loop): el
+            # entrypoint de Docker lo informa en CLOCKCONTROL_RUN_INTERVAL
+            run_interval = float(
+                os.environ.get("CLOCKCONTROL_RUN_INTERVAL")
+                or parser.get(section, "run_interval", fallback=defaults.run_interval)
+            )
+            config = CollectorConfig(
+                max_workers=parser.getint(
+                    section, "max_workers", fallback=defaults.max_workers
+                ),
+                clock_deadline=parser.getfloat(
+                    section, "clock_deadline", fallback=defaults.clock_deadline
+                ),
+                incremental=parser.getboolean(
+                    section, "incremental", fallback=defaults.incremental
+                ),
+                watermark_max_age=parser.getfloat(
+                    section, "watermark_max_age", fallback=defaults.watermark_max_age
+                ),
+                state_dir=parser.get(section, "state_dir", fallback=defaults.state_dir),
+                registry_ttl=parser.getfloat(
+                    section, "registry_ttl", fallback=defaults.registry_ttl
+                ),
+                conn_log_buffer=parser.getboolean(
+                    section, "conn_log_buffer", fallback=defaults.conn_log_buffer
+                ),
+                conn_log_max_entries=parser.getint(
+                    section, "conn_log_max_entries", fallback=defaults.conn_log_max_entries
+                ),
+                conn_log_max_age=parser.getfloat(
+                    section, "conn_log_max_age", fallback=defaults.conn_log_max_age
+                ),
+                ingest_mode=parser.get(section, "ingest_mode", fallback=defaults.ingest_mode),
+                copy_threshold=parser.getint(
+                    section, "copy_threshold", fallback=defaults.copy_threshold
+                ),
+                poll_interval=parser.getfloat(
+                    section, "poll_interval", fallback=defaults.poll_interval
+                ),
+                adaptive_polling=parser.getboolean(
+                    section, "adaptive_polling", fallback=defaults.adaptive_polling
+                ),
+                poll_min_interval=parser.getfloat(
+                    section, "poll_min_interval", fallback=defaults.poll_min_interval
+                ),
+                poll_max_interval=parser.getfloat(
+                    section, "poll_max_interval", fallback=defaults.poll_max_interval
+                ),
+                poll_target_marks=parser.getfloat(
+                    section, "poll_target_marks", fallback=defaults.poll_target_marks
+                ),
+                spool=parser.getboolean(section, "spool", fallback=defaults.spool),
+                spool_batch=parser.getint(
+                    section, "spool_batch", fallback=defaults.spool_batch
+                ),
+                circuit_breaker=parser.getboolean(
+                    section, "circuit_breaker", fallback=defaults.circuit_breaker
+                ),
+                circuit_failure_threshold=parser.getint(
+                    section, "circuit_failure_threshold",
+                    fallback=defaults.circuit_failure_threshold,
+                ),
+                circuit_open_interval=parser.getfloat(
+                    section, "circuit_open_interval", fallback=defaults.circuit_open_interval
+                ),
+                circuit_max_open_interval=parser.getfloat(
+                    section, "circuit_max_open_interval",
+                    fallback=defaults.circuit_max_open_interval,
+                ),
+                keep_sessions=parser.getboolean(
+                    section, "keep_sessions", fallback=defaults.keep_sessions
+                ),
+                max_sessions=parser.getint(
+                    section, "max_sessions", fallback=defaults.max_sessions
+                ),
+                session_idle_timeout=parser.getfloat(
+                    section, "session_idle_timeout", fallback=defaults.session_idle_timeout
+                ),
+                stream_reconcile_interval=parser.getfloat(
+                    section, "stream_reconcile_interval",
+                    fallback=defaults.stream_reconcile_interval,
+                ),
+                stream_max_delay=parser.getfloat(
+                    section, "stream_max_delay", fallback=defaults.stream_max_delay
+                ),
+                stream_max_batch=parser.getint(
+                    section, "stream_max_batch", fallback=defaults.stream_max_batch
+                ),
+                pipeline=parser.getboolean(section, "pipeline", fallback=defaults.pipeline),
+                pipeline_queue_size=parser.getint(
+                    section, "pipeline_queue_size", fallback=defaults.pipeline_queue_size
+                ),
+                pipeline_merge_marks=parser.getint(
+                    section, "pipeline_merge_marks", fallback=defaults.pipeline_merge_marks
+                ),
+                pipeline_linger=parser.getfloat(
+                    section, "pipeline_linger", fallback=defaults.pipeline_linger
+                ),
+                dedup_cache=parser.getboolean(
+                    section, "dedup_cache", fallback=defaults.dedup_cache
+                ),
+                dedup_max_entries=parser.getint(
+                    section, "dedup_max_entries", fallback=defaults.dedup_max_entries
+                ),
+                metrics_textfile=parser.get(
+                    section, "metrics_textfile", fallback=defaults.metrics_textfile
+                ),
+                metrics_report=parser.get(
+                    section, "metrics_report", fallback=defaults.metrics_report
+                ),
+                metrics_port=parser.getint(section, "metrics_port", fallback=defaults.metrics_port),
+                metrics_host=parser.get(section, "metrics_host", fallback=defaults.metrics_host),
+                sharding=parser.getboolean(section, "sharding", fallback=defaults.sharding),
+                # Varios contenedores comparten el mismo .ini: el entorno
+                # tiene prioridad para distinguir a cada recolector
+                collector_id=os.environ.get("CLOCKCONTROL_COLLECTOR_ID") or parser.get(
+                    section, "collector_id", fallback=defaults.collector_id
+                ),
+                # Por defecto los arriendos cubren tres ejecuciones
+                lease_ttl=parser.getfloat(
+                    section, "lease_ttl", fallback=max(defaults.lease_ttl, 3 * run_interval)
+                ),
+                run_interval=run_interval,
+            )
+            # Intervalos por reloj: sección [clockcontrol.intervals], ip = segundos
+            intervals_section = f"{section}.intervals"
+            if parser.has_section(intervals_section):
+                for ip in parser.options(intervals_section):
+                    config.poll_intervals[ip] = parser.getfloat(intervals_section, ip)
+        except ValueError as e:
+            raise ConfigurationError(f"Error leyendo sección [{section}]: {e}")
+        
+        if config.max_workers < 1:
+            raise ConfigurationError("max_workers debe ser mayor o igual a 1")
+        if config.circuit_failure_threshold < 1:
+            raise ConfigurationError("circuit_failure_threshold debe ser mayor o igual a 1")
+        if config.max_sessions < 1:
+            raise ConfigurationError("max_sessions debe ser mayor o igual a 1")
+        if config.pipeline_queue_size < 1 or config.pipeline_merge_marks < 1:
+            raise ConfigurationError(
+                "pipeline_queue_size y pipeline_merge_marks deben ser mayores o iguales a 1"
+            )
+        if config.lease_ttl <= 0:
+            raise ConfigurationError("lease_ttl debe ser mayor a 0")
+        if config.sharding and config.lease_ttl <= config.run_interval + config.clock_deadline:
+            # Con arriendos más cortos que el intervalo, latidos y arriendos
+            # vencen entre ejecuciones y el primero que corre toma toda la flota
+            raise ConfigurationError(
+                f"lease_ttl ({config.lease_ttl:.0f}s) debe superar el intervalo entre "
+                f"ejecuciones ({config.run_interval:.0f}s) más clock_deadline "
+                f"({config.clock_deadline:.0f}s)"
+            )
+        if not 0 <= config.metrics_port <= 65535:
+            raise ConfigurationError("metrics_port debe estar entre 0 y 65535 (0 = desactivado)")
+        if config.poll_interval <= 0 or any(v <= 0 for v in config.poll_intervals.values()):
+            raise ConfigurationError("Los intervalos de sondeo deben ser mayores a 0")
+        if not 0 < config.poll_min_interval <= config.poll_max_interval:
+            raise ConfigurationError(
+                "poll_min_interval debe ser mayor a 0 y no mayor que poll_max_interval"
+            )
+        if config.ingest_mode not in ("auto", "procedure", "copy"):
+            raise ConfigurationError(
+                f"ingest_mode inválido: {config.ingest_mode} (auto, procedure o copy)"
+            )
+        return config
 
 
 @lru_cache()
@@ -1,23 +1,21 @@
 """
 Core - Lógica de negocio del sistema
 """
-from clockcontrol.core.attendance import AttendanceProcessor, AttendanceMark
-from clockcontrol.core.device import ZKDeviceManager
-from clockcontrol.core.exceptions import (
-    ClockControlError,
-    DeviceConnectionError,
-    DatabaseError,
-    ConfigurationError,
-    ValidationError,
-)
+from clockcontrol.utils.lazy import lazy_exports
 
-__all__ = [
-    "AttendanceProcessor",
-    "AttendanceMark",
-    "ZKDeviceManager",
-    "ClockControlError",
-    "DeviceConnectionError",
-    "DatabaseError",
-    "ConfigurationError",
-    "ValidationError",
-]
+# Importación diferida: usar las excepciones no carga pyzk ni asyncio
+_LAZY_IMPORTS = {
+    "AttendanceProcessor": "clockcontrol.core.attendance",
+    "AttendanceMark": "clockcontrol.core.attendance",
+    "MarkBatch": "clockcontrol.core.attendance",
+    "ZKDeviceManager": "clockcontrol.core.device",
+    "ClockControlError": "clockcontrol.core.exceptions",
+    "DeviceConnectionError": "clockcontrol.core.exceptions",
+    "DatabaseError": "clockcontrol.core.exceptions",
+    "ConfigurationError": "clockcontrol.core.exceptions",
+    "ValidationError": "clockcontrol.core.exceptions",
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+__getattr__, __dir__ = lazy_exports(__name__, globals(), _LAZY_IMPORTS)
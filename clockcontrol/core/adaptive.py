@@ -0,0 +1,183 @@
+"""
+Intervalo de sondeo adaptativo por reloj (actividad y fallos)
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+HOURS = 24
+
+
+@dataclass
+class _ClockActivity:
+    """Historial resumido de un reloj"""
+    rate: float = 0.0                 # marcajes/segundo (media móvil)
+    hourly: List[float] = field(default_factory=lambda: [0.0] * HOURS)  # marcajes/hora
+    failures: int = 0
+    last_poll: Optional[float] = None
+
+
+class AdaptivePollPolicy:
+    """
+    Calcula el próximo sondeo de cada reloj según su actividad.
+
+    - Ritmo reciente: media móvil exponencial de marcajes nuevos por
+      segundo entre sondeos exitosos.
+    - Hora del día: perfil de marcajes por hora (inicial desde
+      rrhh.person_marks); se usa el máximo entre la hora actual y la
+      siguiente para adelantarse a los picos de entrada y salida.
+    - Fallos: con fallos consecutivos el intervalo crece
+      exponencialmente (failure_backoff, 2x, 4x ... hasta max_backoff).
+
+    El intervalo apunta a encontrar unos target_marks marcajes nuevos
+    por sondeo, acotado entre min_interval y max_interval.
+
+    Ejemplo de uso:
+        policy = AdaptivePollPolicy(min_interval=15, max_interval=900)
+        policy.bootstrap(failures, hourly_rates)
+        policy.record("192.168.1.201", success=True, marks=12)
+        interval = policy.interval_for("192.168.1.201")
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 15.0,
+        max_interval: float = 900.0,
+        target_marks: float = 10.0,
+        failure_backoff: float = 60.0,
+        max_backoff: float = 3600.0,
+        alpha: float = 0.3,
+        hourly_alpha: float = 0.1,
+    ):
+        """
+        Args:
+            min_interval: Intervalo mínimo entre sondeos (relojes muy activos)
+            max_interval: Intervalo máximo para relojes sin actividad
+            target_marks: Marcajes nuevos esperados por sondeo
+            failure_backoff: Intervalo tras el primer fallo
+            max_backoff: Intervalo máximo con fallos consecutivos
+            alpha: Peso de cada sondeo en el ritmo reciente
+            hourly_alpha: Peso de cada sondeo en el perfil por hora
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_marks = target_marks
+        self.failure_backoff = failure_backoff
+        self.max_backoff = max_backoff
+        self.alpha = alpha
+        self.hourly_alpha = hourly_alpha
+
+        self._clocks: Dict[str, _ClockActivity] = {}
+        self._lock = threading.Lock()
+
+    def _activity(self, ip: str) -> _ClockActivity:
+        activity = self._clocks.get(ip)
+        if activity is None:
+            activity = self._clocks[ip] = _ClockActivity()
+        return activity
+
+    def bootstrap(
+        self,
+        failures: Dict[str, int],
+        hourly_rates: Dict[str, List[float]],
+    ) -> None:
+        """
+        Carga el historial inicial.
+
+        Args:
+            failures: Fallos consecutivos recientes por IP (rrhh.clock_conn)
+            hourly_rates: Marcajes promedio por hora del día por IP
+        """
+        with self._lock:
+            for ip, count in failures.items():
+                self._activity(ip).failures = count
+            for ip, rates in hourly_rates.items():
+                activity = self._activity(ip)
+                activity.hourly = [float(r) for r in rates[:HOURS]] + [0.0] * (HOURS - len(rates))
+        logger.info(
+            f"Historial de sondeo cargado: {len(hourly_rates)} relojes con actividad, "
+            f"{sum(1 for c in failures.values() if c)} con fallos recientes"
+        )
+
+    def record(
+        self,
+        ip: str,
+        success: bool,
+        marks: int = 0,
+        now: Optional[float] = None,
+        hour: Optional[int] = None,
+    ) -> None:
+        """
+        Registra el resultado de un sondeo.
+
+        Args:
+            ip: IP del reloj
+            success: True si el sondeo terminó bien
+            marks: Marcajes nuevos obtenidos
+            now: Hora monotónica (para tests)
+            hour: Hora del día (para tests)
+        """
+        now = time.monotonic() if now is None else now
+        hour = datetime.now().hour if hour is None else hour
+
+        with self._lock:
+            activity = self._activity(ip)
+            if not success:
+                activity.failures += 1
+                return
+
+            activity.failures = 0
+            if activity.last_poll is not None:
+                elapsed = max(now - activity.last_poll, 1.0)
+                observed = marks / elapsed
+                activity.rate += self.alpha * (observed - activity.rate)
+                activity.hourly[hour] += self.hourly_alpha * (
+                    observed * 3600 - activity.hourly[hour]
+                )
+            activity.last_poll = now
+
+    def initial_delay(self, ip: str) -> float:
+        """
+        Espera antes del primer sondeo: los relojes con fallos recientes
+        en el historial arrancan ya en backoff, el resto de inmediato.
+        """
+        with self._lock:
+            activity = self._clocks.get(ip)
+            failing = activity is not None and activity.failures > 0
+        return self.interval_for(ip) if failing else 0.0
+
+    def interval_for(self, ip: str, hour: Optional[int] = None) -> float:
+        """
+        Segundos hasta el próximo sondeo del reloj.
+
+        Args:
+            ip: IP del reloj
+            hour: Hora del día (para tests)
+        """
+        hour = datetime.now().hour if hour is None else hour
+
+        with self._lock:
+            activity = self._clocks.get(ip)
+            if activity is None:
+                return self.min_interval
+
+            if activity.failures:
+                return min(
+                    self.failure_backoff * 2 ** min(activity.failures - 1, 30),
+                    self.max_backoff,
+                )
+
+            expected = max(
+                activity.rate,
+                activity.hourly[hour] / 3600,
+                activity.hourly[(hour + 1) % HOURS] / 3600,
+            )
+
+        if expected <= 0:
+            return self.max_interval
+        return min(max(self.target_marks / expected, self.min_interval), self.max_interval)
@@ -1,18 +1,25 @@
 """
 Procesamiento de marcajes de asistencia
 """
+import csv
+import io
 import json
 import logging
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from datetime import date, datetime, timedelta
-from typing import Any, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
+# (carnet, date_mark, time_mark) de un marcaje ya validado y filtrado
+MarkFields = Tuple[str, str, str]
+
 
 @dataclass
 class AttendanceMark:
     """Representa un marcaje de asistencia"""
+    __slots__ = ("carnet", "date_mark", "time_mark", "ip_clock", "id_reloj_bio")
+    
     carnet: str
     date_mark: str
     time_mark: str
@@ -30,6 +37,107 @@ class AttendanceMark:
         }
 
 
+class MarkBatch:
+    """
+    Lote columnar de marcajes de un mismo reloj.
+    
+    Para descargas grandes evita un objeto por marcaje: carnets, fechas y
+    horas se guardan en listas paralelas, ip_clock e id_reloj_bio una sola
+    vez por lote y las fechas (muy repetidas) se internan. Se serializa
+    directamente a JSON (stored procedure) o CSV (COPY).
+    
+    Ejemplo de uso:
+        batch = processor.process_batch(raw_attendances, "192.168.1.1", 42)
+        repo.save_marks_copy(batch)
+    """
+    
+    __slots__ = ("ip_clock", "id_reloj_bio", "carnets", "dates", "times", "_interned")
+    
+    def __init__(self, ip_clock: str, id_reloj_bio: int):
+        self.ip_clock = ip_clock
+        self.id_reloj_bio = id_reloj_bio
+        self.carnets: List[str] = []
+        self.dates: List[str] = []
+        self.times: List[str] = []
+        self._interned: Dict[str, str] = {}
+    
+    @classmethod
+    def from_marks(
+        cls,
+        marks: List[AttendanceMark],
+        ip_clock: str,
+        id_reloj_bio: int,
+    ) -> "MarkBatch":
+        """Crea un lote a partir de marcajes individuales del mismo reloj"""
+        batch = cls(ip_clock, id_reloj_bio)
+        for mark in marks:
+            batch.append(mark.carnet, mark.date_mark, mark.time_mark)
+        return batch
+    
+    def append(self, carnet: str, date_mark: str, time_mark: str) -> None:
+        """Agrega un marcaje al lote"""
+        self.carnets.append(carnet)
+        self.dates.append(self._interned.setdefault(date_mark, date_mark))
+        self.times.append(time_mark)
+    
+    def __len__(self) -> int:
+        return len(self.carnets)
+    
+    def __iter__(self) -> Iterator[AttendanceMark]:
+        ip_clock, clock_id = self.ip_clock, self.id_reloj_bio
+        for carnet, date_mark, time_mark in zip(self.carnets, self.dates, self.times):
+            yield AttendanceMark(carnet, date_mark, time_mark, ip_clock, clock_id)
+    
+    def to_marks(self) -> List[AttendanceMark]:
+        """Convierte el lote a marcajes individuales"""
+        return list(self)
+    
+    def to_json(self) -> str:
+        """
+        Serializa el lote en el formato del stored procedure.
+        
+        Las partes constantes (IP y reloj) se codifican una sola vez.
+        """
+        suffix = (
+            f',"inip_clock":{json.dumps(self.ip_clock)},'
+            f'"inid_reloj_bio":{json.dumps(self.id_reloj_bio)}}}'
+        )
+        dumps = json.dumps
+        return "[" + ",".join(
+            f'{{"incarnet":{dumps(c)},"indate_mark":{dumps(d)},"intime_mark":{dumps(t)}{suffix}'
+            for c, d, t in zip(self.carnets, self.dates, self.times)
+        ) + "]"
+    
+    def to_csv(self) -> io.StringIO:
+        """Serializa el lote como CSV para COPY (mismas columnas que to_csv)"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        ip_clock, clock_id = self.ip_clock, self.id_reloj_bio
+        writer.writerows(
+            (c, d, t, ip_clock, clock_id)
+            for c, d, t in zip(self.carnets, self.dates, self.times)
+        )
+        buffer.seek(0)
+        return buffer
+
+
+Marks = Union[List[AttendanceMark], MarkBatch]
+
+
+class _DateWindow:
+    """Rango de fechas precalculado como ordinales y como texto YYYY-MM-DD"""
+    
+    __slots__ = ("start", "end", "start_ordinal", "end_ordinal", "start_text", "end_text")
+    
+    def __init__(self, start: date, end: date):
+        self.start = start
+        self.end = end
+        self.start_ordinal = start.toordinal()
+        self.end_ordinal = end.toordinal()
+        self.start_text = start.isoformat()
+        self.end_text = end.isoformat()
+
+
 class AttendanceProcessor:
     """
     Procesa y filtra marcajes de asistencia.
@@ -67,26 +175,112 @@ class AttendanceProcessor:
             logger.info("No hay marcajes para procesar")
             return []
         
+        processed = [
+            AttendanceMark(carnet, date_mark, time_mark, ip_clock, clock_id)
+            for carnet, date_mark, time_mark
+            in self._iter_fields(raw_attendances, ip_clock, clock_id)
+        ]
+        
+        logger.info(
+            f"Marcajes procesados: {len(processed)} de {len(raw_attendances)}"
+        )
+        return processed
+    
+    def process_batch(
+        self,
+        raw_attendances: List[Any],
+        ip_clock: str,
+        clock_id: int,
+    ) -> MarkBatch:
+        """
+        Igual que process pero devuelve un MarkBatch columnar.
+        
+        Preferible para descargas grandes (resincronizaciones completas):
+        usa bastante menos memoria que una lista de AttendanceMark.
+        
+        Returns:
+            MarkBatch con los marcajes filtrados y procesados
+        """
+        batch = MarkBatch(ip_clock, clock_id)
+        if not raw_attendances:
+            logger.info("No hay marcajes para procesar")
+            return batch
+        
+        append = batch.append
+        for fields in self._iter_fields(raw_attendances, ip_clock, clock_id):
+            append(*fields)
+        
+        logger.info(
+            f"Marcajes procesados: {len(batch)} de {len(raw_attendances)}"
+        )
+        return batch
+    
+    def _iter_fields(
+        self,
+        raw_attendances: List[Any],
+        ip_clock: str,
+        clock_id: int,
+    ) -> Iterator[MarkFields]:
+        """Recorre los marcajes crudos devolviendo los válidos y en rango"""
         today = date.today()
         start_date = today - timedelta(days=self.days_back)
+        window = _DateWindow(start_date, today)
         
-        processed = []
         for attendance in raw_attendances:
             if attendance is None:
                 continue
             
             try:
-                mark = self._parse_attendance(attendance, ip_clock, clock_id)
-                if mark and self._is_in_date_range(mark.date_mark, start_date, today):
-                    processed.append(mark)
+                fields = self._parse_fields(attendance, ip_clock, clock_id, window)
             except Exception as e:
                 logger.warning(f"Error procesando marcaje: {e}")
                 continue
+            if fields is not None:
+                yield fields
+    
+    def _parse_fields(
+        self,
+        attendance: Any,
+        ip_clock: str,
+        clock_id: int,
+        window: "_DateWindow",
+    ) -> Optional[MarkFields]:
+        """
+        Parsea y filtra un marcaje leyendo user_id y timestamp directamente.
         
-        logger.info(
-            f"Marcajes procesados: {len(processed)} de {len(raw_attendances)}"
-        )
-        return processed
+        Con timestamp datetime (pyzk) el filtro de fechas compara ordinales
+        y solo se formatean los marcajes dentro del rango. Con timestamp
+        texto se compara contra los límites ya formateados. Cualquier otro
+        tipo usa el parseo por texto (_parse_attendance).
+        
+        Returns:
+            (carnet, fecha, hora) si es válido y está en el rango, None si no
+        """
+        user_id = getattr(attendance, "user_id", None)
+        timestamp = getattr(attendance, "timestamp", None)
+        
+        if user_id is not None and isinstance(timestamp, datetime):
+            if not window.start_ordinal <= timestamp.toordinal() <= window.end_ordinal:
+                return None
+            text = timestamp.isoformat(" ", "seconds")
+            return str(user_id), text[:10], text[11:19]
+        
+        if user_id is not None and isinstance(timestamp, str):
+            text = timestamp.strip()
+            if not window.start_text <= text[:10] <= window.end_text:
+                return None
+            # Solo se valida el formato de los marcajes dentro del rango
+            try:
+                datetime.strptime(text, "%Y-%m-%d %H:%M:%S")
+            except ValueError:
+                logger.warning(f"Fecha/hora invalida: {text[:100]}")
+                return None
+            return str(user_id), text[:10], text[11:19]
+        
+        mark = self._parse_attendance(attendance, ip_clock, clock_id)
+        if mark and self._is_in_date_range(mark.date_mark, window.start, window.end):
+            return mark.carnet, mark.date_mark, mark.time_mark
+        return None
     
     def _parse_attendance(
         self,
@@ -141,15 +335,41 @@ class AttendanceProcessor:
             return False
     
     @staticmethod
-    def to_json(marks: List[AttendanceMark]) -> str:
+    def to_json(marks: Marks) -> str:
         """
         Convierte lista de marcajes a JSON para stored procedure.
         
         Args:
-            marks: Lista de AttendanceMark
+            marks: Lista de AttendanceMark o MarkBatch
             
         Returns:
             String JSON formateado
         """
+        if isinstance(marks, MarkBatch):
+            return marks.to_json()
         data = [mark.to_db_dict() for mark in marks]
-        return json.dumps(data, sort_keys=True, indent=2)
+        return json.dumps(data, separators=(",", ":"))
+    
+    @staticmethod
+    def to_csv(marks: Marks) -> io.StringIO:
+        """
+        Convierte lista de marcajes a CSV para COPY ... FROM STDIN.
+        
+        Columnas: carnet, date_mark, time_mark, ip_clock, id_reloj_bio
+        
+        Args:
+            marks: Lista de AttendanceMark o MarkBatch
+            
+        Returns:
+            Buffer de texto posicionado al inicio
+        """
+        if isinstance(marks, MarkBatch):
+            return marks.to_csv()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerows(
+            (m.carnet, m.date_mark, m.time_mark, m.ip_clock, m.id_reloj_bio)
+            for m in marks
+        )
+        buffer.seek(0)
+        return buffer
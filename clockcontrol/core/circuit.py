@@ -0,0 +1,188 @@
+"""
+Circuit breaker persistente por reloj
+"""
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+from clockcontrol.utils.state import JsonStateStore
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass
+class CircuitState:
+    """Estado del circuito de un reloj (se persiste entre ejecuciones)"""
+    state: str = CLOSED
+    failures: int = 0
+    trips: int = 0
+    retry_at: float = 0.0
+    last_error: str = ""
+
+
+class CircuitBreaker:
+    """
+    Evita sondear y conectar en cada ejecución a relojes caídos.
+
+    - closed: el reloj se procesa normalmente. Tras failure_threshold
+      fallos consecutivos el circuito se abre.
+    - open: el reloj se omite (sin sondeo, conexión ni log) hasta
+      retry_at. El tiempo de espera se duplica con cada apertura
+      consecutiva, desde open_interval hasta max_open_interval.
+    - half_open: vencida la espera se permite un intento; si funciona
+      el circuito se cierra, si falla se vuelve a abrir.
+
+    El estado se guarda en un JsonStateStore, por lo que sobrevive entre
+    ejecuciones del cron. Los métodos record_* devuelven la observación
+    a registrar en rrhh.clock_conn, o None cuando el fallo es una
+    repetición de un circuito ya abierto.
+
+    Ejemplo de uso:
+        breaker = CircuitBreaker(open_state("state", "circuits.json"))
+        if breaker.allow(ip):
+            ...
+            observation = breaker.record_failure(ip, "Sin respuesta")
+            if observation:
+                repo.log_connection(ip, False, observation)
+    """
+
+    def __init__(
+        self,
+        store: Optional[JsonStateStore] = None,
+        failure_threshold: int = 3,
+        open_interval: float = 300.0,
+        max_open_interval: float = 3600.0,
+    ):
+        """
+        Args:
+            store: Almacén de estado (None = solo en memoria)
+            failure_threshold: Fallos consecutivos que abren el circuito
+            open_interval: Espera tras la primera apertura
+            max_open_interval: Espera máxima entre intentos
+        """
+        self.store = store
+        self.failure_threshold = failure_threshold
+        self.open_interval = open_interval
+        self.max_open_interval = max_open_interval
+        self._memory: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, ip: str) -> CircuitState:
+        data = self.store.get(ip) if self.store is not None else self._memory.get(ip)
+        if not data:
+            return CircuitState()
+        try:
+            return CircuitState(**data)
+        except TypeError:
+            logger.warning(f"Estado de circuito inválido para {ip}, se ignora: {data}")
+            return CircuitState()
+
+    def _put(self, ip: str, circuit: CircuitState) -> None:
+        if circuit == CircuitState():
+            # Circuito sano: no ocupa espacio en el estado
+            if self.store is not None:
+                self.store.delete(ip)
+            else:
+                self._memory.pop(ip, None)
+        elif self.store is not None:
+            self.store.set(ip, asdict(circuit))
+        else:
+            self._memory[ip] = asdict(circuit)
+
+    def state(self, ip: str) -> CircuitState:
+        """Estado actual del circuito de un reloj"""
+        with self._lock:
+            return self._get(ip)
+
+    def allow(self, ip: str, now: Optional[float] = None) -> bool:
+        """
+        Indica si el reloj debe procesarse ahora.
+
+        Vencida la espera de un circuito abierto lo pasa a half_open y
+        permite un intento.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            circuit = self._get(ip)
+            if circuit.state != OPEN:
+                return True
+            if now < circuit.retry_at:
+                return False
+            circuit.state = HALF_OPEN
+            self._put(ip, circuit)
+            logger.info(f"Circuito de {ip} en prueba (half-open)")
+            return True
+
+    def retry_in(self, ip: str, now: Optional[float] = None) -> float:
+        """Segundos hasta el próximo intento de un circuito abierto"""
+        now = time.time() if now is None else now
+        return max(0.0, self.state(ip).retry_at - now)
+
+    def record_success(self, ip: str) -> Optional[str]:
+        """
+        Registra un intento exitoso y cierra el circuito.
+
+        Returns:
+            Observación de la transición a registrar, o None si ya estaba cerrado
+        """
+        with self._lock:
+            circuit = self._get(ip)
+            if circuit == CircuitState():
+                return None
+            reopened = circuit.state != CLOSED
+            failures = circuit.failures
+            self._put(ip, CircuitState())
+
+        if reopened:
+            logger.info(f"Circuito de {ip} cerrado tras {failures} fallos")
+            return f"Circuito cerrado: reloj recuperado tras {failures} fallos"
+        return None
+
+    def record_failure(
+        self,
+        ip: str,
+        error: str,
+        now: Optional[float] = None,
+    ) -> Optional[str]:
+        """
+        Registra un intento fallido.
+
+        Returns:
+            Observación a registrar: el error mientras el circuito sigue
+            cerrado, la apertura al alcanzar el umbral, o None si el
+            circuito ya estaba abierto (fallo repetido de la prueba half-open)
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            circuit = self._get(ip)
+            circuit.failures += 1
+            circuit.last_error = error[:255]
+
+            if circuit.state == CLOSED and circuit.failures < self.failure_threshold:
+                self._put(ip, circuit)
+                return error
+
+            was_closed = circuit.state == CLOSED
+            circuit.trips += 1
+            wait = min(
+                self.open_interval * 2 ** min(circuit.trips - 1, 30),
+                self.max_open_interval,
+            )
+            circuit.state = OPEN
+            circuit.retry_at = now + wait
+            self._put(ip, circuit)
+
+        if was_closed:
+            logger.warning(
+                f"Circuito de {ip} abierto tras {circuit.failures} fallos; "
+                f"próximo intento en {wait:.0f}s"
+            )
+            return f"Circuito abierto tras {circuit.failures} fallos: {error}"
+        logger.info(f"Prueba de {ip} fallida; próximo intento en {wait:.0f}s")
+        return None
@@ -0,0 +1,162 @@
+"""
+Cache de marcajes ya guardados para no reenviarlos a la base de datos
+"""
+import logging
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, Optional, Set, Tuple
+
+from clockcontrol.core.attendance import MarkBatch, Marks
+from clockcontrol.utils.state import JsonStateStore
+
+logger = logging.getLogger(__name__)
+
+# (carnet, time_mark, ip_clock) dentro de una fecha
+_Key = Tuple[str, str, str]
+
+
+class RecentMarksCache:
+    """
+    Conjunto acotado de marcajes confirmados en rrhh.person_marks.
+
+    Cada lectura de un reloj vuelve a procesar toda la ventana de
+    days_back días, y el stored procedure descarta por NOT EXISTS lo que
+    ya existe. Este cache filtra esos marcajes antes de enviarlos, de modo
+    que a la base de datos solo llegan los nuevos.
+
+    Las claves son (carnet, date_mark, time_mark, ip_clock), agrupadas por
+    fecha: las fechas fuera de la ventana se descartan enteras y, si se
+    supera max_entries, se descartan las más antiguas. Un marcaje
+    descartado del cache solo vuelve a enviarse; la deduplicación de la
+    base de datos sigue siendo la garantía final.
+
+    Con un JsonStateStore el cache sobrevive entre ejecuciones del cron
+    (una clave por fecha, escrita en flush).
+
+    Ejemplo de uso:
+        cache = RecentMarksCache(days_back=1)
+        marks = cache.filter(marks)
+        repo.save_marks_copy(marks)
+        cache.add(marks)
+    """
+
+    def __init__(
+        self,
+        days_back: int = 1,
+        max_entries: int = 200000,
+        store: Optional[JsonStateStore] = None,
+        flush_interval: float = 60.0,
+    ):
+        """
+        Args:
+            days_back: Días hacia atrás que se conservan (ventana del procesador)
+            max_entries: Marcajes máximos en el cache
+            store: Almacén persistente (None = solo en memoria)
+            flush_interval: Segundos mínimos entre escrituras de flush_due
+        """
+        self.days_back = days_back
+        self.max_entries = max_entries
+        self.store = store
+        self._dates: Dict[str, Set[_Key]] = {}
+        self._dirty: Set[str] = set()
+        self._size = 0
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+        if store is not None:
+            self._load()
+
+    def _load(self) -> None:
+        """Carga el cache persistido descartando fechas vencidas"""
+        for date_mark, keys in self.store.items().items():
+            try:
+                entries = {(c, t, ip) for c, t, ip in keys}
+            except (TypeError, ValueError):
+                logger.warning(f"Cache de marcajes inválido para {date_mark}, se ignora")
+                self._dirty.add(date_mark)
+                continue
+            self._dates[date_mark] = entries
+            self._size += len(entries)
+        self._evict()
+        if self._size:
+            logger.info(f"Cache de marcajes cargado: {self._size} marcajes recientes")
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _evict(self, today: Optional[date] = None) -> None:
+        """Descarta fechas fuera de la ventana y, si sobra, las más antiguas"""
+        today = today or date.today()
+        cutoff = (today - timedelta(days=self.days_back)).isoformat()
+        for date_mark in sorted(self._dates):
+            if date_mark >= cutoff and self._size <= self.max_entries:
+                break
+            self._size -= len(self._dates.pop(date_mark))
+            self._dirty.add(date_mark)
+
+    def filter(self, marks: Marks) -> Marks:
+        """
+        Quita los marcajes que ya están en el cache.
+
+        Returns:
+            Marcajes no vistos, del mismo tipo que marks
+        """
+        with self._lock:
+            dates = self._dates
+            if isinstance(marks, MarkBatch):
+                batch = MarkBatch(marks.ip_clock, marks.id_reloj_bio)
+                ip_clock = marks.ip_clock
+                for carnet, date_mark, time_mark in zip(marks.carnets, marks.dates, marks.times):
+                    seen = dates.get(date_mark)
+                    if seen is None or (carnet, time_mark, ip_clock) not in seen:
+                        batch.append(carnet, date_mark, time_mark)
+                unseen: Marks = batch
+            else:
+                unseen = [
+                    m for m in marks
+                    if (m.carnet, m.time_mark, m.ip_clock) not in dates.get(m.date_mark, ())
+                ]
+
+        skipped = len(marks) - len(unseen)
+        if skipped:
+            logger.debug(f"Cache de marcajes: {skipped} de {len(marks)} ya guardados")
+        return unseen
+
+    def add(self, marks: Marks, today: Optional[date] = None) -> None:
+        """
+        Registra marcajes confirmados (insertados o ya existentes en la base
+        de datos, o guardados de forma durable en el spool).
+        """
+        with self._lock:
+            for mark in marks:
+                seen = self._dates.get(mark.date_mark)
+                if seen is None:
+                    seen = self._dates[mark.date_mark] = set()
+                key = (mark.carnet, mark.time_mark, mark.ip_clock)
+                if key not in seen:
+                    seen.add(key)
+                    self._size += 1
+                    self._dirty.add(mark.date_mark)
+            self._evict(today)
+
+    def flush_due(self) -> None:
+        """Persiste si pasó flush_interval desde la última escritura"""
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Persiste las fechas modificadas desde el último flush"""
+        self._last_flush = time.monotonic()
+        if self.store is None:
+            return
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            changes = {d: sorted(self._dates[d]) if d in self._dates else None for d in dirty}
+
+        for date_mark, keys in changes.items():
+            if keys is None:
+                self.store.delete(date_mark)
+            else:
+                self.store.set(date_mark, keys)
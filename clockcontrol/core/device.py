@@ -2,13 +2,12 @@
 Gestión de dispositivos ZKTeco
 """
 import logging
-import os
-import platform
 from contextlib import contextmanager
 from dataclasses import dataclass
 from typing import Any, Generator, List, Optional
 
 from clockcontrol.core.exceptions import DeviceConnectionError
+from clockcontrol.core.probe import probe
 
 # Intentar importar pyzk
 try:
@@ -64,49 +63,56 @@ class ZKDeviceManager:
             timeout=timeout,
             password=int(password) if str(password).isdigit() else 0,
             force_udp=force_udp,
+            # La accesibilidad ya se verifica con is_reachable/probe_many;
+            # evita que pyzk lance un ping por cada conexión
+            ommit_ping=True,
         )
     
-    def is_reachable(self, attempts: int = 2) -> bool:
+    def is_reachable(
+        self,
+        attempts: int = 2,
+        timeout: float = 2.0,
+        protocol: str = "auto",
+    ) -> bool:
         """
-        Verifica si el dispositivo es alcanzable vía ping.
+        Verifica si el dispositivo responde en su puerto ZK.
+        
+        Sondea el puerto en proceso (TCP y, si es rechazado, UDP) sin
+        lanzar un proceso ping. Para muchos relojes a la vez usar
+        clockcontrol.core.probe.probe_many.
         
         Args:
-            attempts: Número de intentos de ping
+            attempts: Número de intentos de sondeo
+            timeout: Segundos de espera por intento
+            protocol: "tcp", "udp" o "auto"
             
         Returns:
             True si hay respuesta, False en caso contrario
         """
-        param = "-n" if platform.system().lower() == "windows" else "-c"
-        filter_cmd = (
-            ' | findstr /i "TTL"'
-            if platform.system().lower() == "windows"
-            else ' | grep "ttl"'
-        )
-        silent = (
-            " > NUL 2>&1"
-            if platform.system().lower() == "windows"
-            else " >/dev/null 2>&1"
+        reachable = probe(
+            self.ip,
+            self.port,
+            timeout=timeout,
+            protocol=protocol,
+            attempts=attempts,
         )
-        
-        command = f"ping {param} {attempts} {self.ip}{filter_cmd}{silent}"
-        result = os.system(command)
-        
-        reachable = result == 0
         logger.info(
-            f"Ping a {self.ip}: {'OK' if reachable else 'FALLIDO'}"
+            f"Sondeo a {self.ip}:{self.port}: {'OK' if reachable else 'FALLIDO'}"
         )
         return reachable
     
-    @contextmanager
-    def connect(self, retries: int = 2, delay: float = 2.0) -> Generator[Any, None, None]:
+    def open(self, retries: int = 2, delay: float = 2.0) -> Any:
         """
-        Context manager para conexión con el dispositivo, con reintentos.
+        Abre una conexión con el dispositivo, con reintentos.
+
+        El llamador es responsable de cerrarla con disconnect(); para uso
+        puntual preferir el context manager connect().
 
         Args:
             retries: Número de intentos de conexión
             delay: Segundos entre reintentos
 
-        Yields:
+        Returns:
             Conexión activa al dispositivo ZK
 
         Raises:
@@ -114,7 +120,6 @@ class ZKDeviceManager:
         """
         import time
 
-        conn = None
         last_error = None
 
         for attempt in range(1, retries + 1):
@@ -122,7 +127,7 @@ class ZKDeviceManager:
                 logger.info(f"Conectando a {self.ip}:{self.port} (intento {attempt}/{retries})...")
                 conn = self._zk.connect()
                 logger.info(f"Conexión exitosa a {self.ip}")
-                break
+                return conn
             except Exception as e:
                 last_error = e
                 if attempt < retries:
@@ -131,20 +136,55 @@ class ZKDeviceManager:
                 else:
                     logger.error(f"Error conectando a {self.ip} después de {retries} intentos: {e}")
 
-        if conn is None:
-            raise DeviceConnectionError(
-                f"No se pudo conectar a {self.ip}:{self.port} después de {retries} intentos - {last_error}"
-            )
+        raise DeviceConnectionError(
+            f"No se pudo conectar a {self.ip}:{self.port} después de {retries} intentos - {last_error}"
+        )
+
+    def disconnect(self, conn: Any) -> None:
+        """Cierra una conexión ignorando errores del dispositivo"""
+        try:
+            conn.disconnect()
+            logger.debug(f"Desconectado de {self.ip}")
+        except Exception as e:
+            logger.debug(f"Error al desconectar de {self.ip}: {e}")
+
+    def is_alive(self, conn: Any) -> bool:
+        """
+        Verifica una conexión abierta con un comando liviano (hora del reloj).
+
+        Args:
+            conn: Conexión abierta al dispositivo
+
+        Returns:
+            True si el dispositivo respondió
+        """
+        try:
+            conn.get_time()
+            return True
+        except Exception as e:
+            logger.info(f"Sesión con {self.ip} caída: {e}")
+            return False
+
+    @contextmanager
+    def connect(self, retries: int = 2, delay: float = 2.0) -> Generator[Any, None, None]:
+        """
+        Context manager para conexión con el dispositivo, con reintentos.
+
+        Args:
+            retries: Número de intentos de conexión
+            delay: Segundos entre reintentos
+
+        Yields:
+            Conexión activa al dispositivo ZK
 
+        Raises:
+            DeviceConnectionError: Si no se puede conectar después de todos los intentos
+        """
+        conn = self.open(retries=retries, delay=delay)
         try:
             yield conn
         finally:
-            if conn:
-                try:
-                    conn.disconnect()
-                    logger.debug(f"Desconectado de {self.ip}")
-                except Exception as e:
-                    logger.debug(f"Error al desconectar de {self.ip}: {e}")
+            self.disconnect(conn)
     
     def get_device_info(self, conn: Any) -> DeviceInfo:
         """
@@ -166,6 +206,23 @@ class ZKDeviceManager:
             logger.warning(f"No se pudo obtener info del dispositivo: {e}")
             return DeviceInfo(ip=self.ip)
     
+    def get_record_count(self, conn: Any) -> Optional[int]:
+        """
+        Obtiene la cantidad de marcajes almacenados sin descargarlos.
+        
+        Args:
+            conn: Conexión activa al dispositivo
+            
+        Returns:
+            Cantidad de registros, o None si el dispositivo no la informa
+        """
+        try:
+            conn.read_sizes()
+            return int(conn.records)
+        except Exception as e:
+            logger.warning(f"No se pudo leer la cantidad de registros de {self.ip}: {e}")
+            return None
+    
     def get_attendance(self, conn: Any) -> List[Any]:
         """
         Obtiene los marcajes de asistencia del dispositivo.
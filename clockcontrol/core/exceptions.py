@@ -18,6 +18,11 @@ class DatabaseError(ClockControlError):
     pass
 
 
+class TaskCancelledError(ClockControlError):
+    """Tarea abandonada por tiempo límite: no debe registrar ni guardar nada"""
+    pass
+
+
 class ConfigurationError(ClockControlError):
     """Error en configuración del sistema"""
     pass
@@ -0,0 +1,201 @@
+"""
+Sondeo de accesibilidad de relojes ZK en proceso (sin ping)
+"""
+import asyncio
+import logging
+import struct
+from typing import Dict, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Comandos del protocolo ZK (ver zk/const.py)
+CMD_CONNECT = 1000
+CMD_EXIT = 1001
+CMD_ACK_OK = 2000
+CMD_ACK_UNAUTH = 2005
+USHRT_MAX = 65535
+
+PROTOCOLS = ("auto", "tcp", "udp")
+
+# Resultados internos del sondeo TCP
+_OPEN = "open"
+_REFUSED = "refused"
+_DOWN = "down"
+
+
+def _checksum(packet: bytes) -> int:
+    """Checksum del protocolo ZK (mismo algoritmo que zkemsdk.c / pyzk)"""
+    if len(packet) % 2:
+        packet += b"\x00"
+    checksum = 0
+    for (word,) in struct.iter_unpack("<H", packet):
+        checksum += word
+        if checksum > USHRT_MAX:
+            checksum -= USHRT_MAX
+    checksum = ~checksum
+    while checksum < 0:
+        checksum += USHRT_MAX
+    return checksum
+
+
+def _zk_packet(command: int, session_id: int = 0, reply_id: int = USHRT_MAX - 1) -> bytes:
+    """Arma un paquete UDP del protocolo ZK sin datos"""
+    checksum = _checksum(struct.pack("<4H", command, 0, session_id, reply_id))
+    next_reply = (reply_id + 1) % USHRT_MAX
+    return struct.pack("<4H", command, checksum, session_id, next_reply)
+
+
+class _DatagramResponse(asyncio.DatagramProtocol):
+    """Protocolo asyncio que espera una única respuesta UDP"""
+
+    def __init__(self, future: "asyncio.Future[bytes]"):
+        self.future = future
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        if not self.future.done():
+            self.future.set_result(data)
+
+    def error_received(self, exc: Exception) -> None:
+        if not self.future.done():
+            self.future.set_exception(exc)
+
+
+async def _probe_tcp(ip: str, port: int, timeout: float) -> str:
+    """Intenta abrir una conexión TCP al puerto del reloj"""
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+    except ConnectionRefusedError:
+        return _REFUSED
+    except (OSError, asyncio.TimeoutError):
+        return _DOWN
+
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return _OPEN
+
+
+async def _probe_udp(ip: str, port: int, timeout: float) -> bool:
+    """
+    Envía CMD_CONNECT por UDP y espera cualquier respuesta.
+
+    Si el reloj abre sesión se cierra de inmediato con CMD_EXIT para no
+    dejar sesiones colgadas en el dispositivo.
+    """
+    loop = asyncio.get_running_loop()
+    future: "asyncio.Future[bytes]" = loop.create_future()
+    try:
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DatagramResponse(future),
+            remote_addr=(ip, port),
+        )
+    except OSError:
+        return False
+
+    try:
+        transport.sendto(_zk_packet(CMD_CONNECT))
+        data = await asyncio.wait_for(future, timeout)
+        if len(data) >= 8:
+            code, _, session_id, reply_id = struct.unpack("<4H", data[:8])
+            if code in (CMD_ACK_OK, CMD_ACK_UNAUTH):
+                transport.sendto(_zk_packet(CMD_EXIT, session_id, reply_id))
+        return True
+    except (OSError, asyncio.TimeoutError):
+        return False
+    finally:
+        transport.close()
+
+
+async def _probe_one(ip: str, port: int, timeout: float, protocol: str) -> bool:
+    """Sondea un reloj según el protocolo indicado"""
+    if protocol == "udp":
+        return await _probe_udp(ip, port, timeout)
+
+    state = await _probe_tcp(ip, port, timeout)
+    if state == _OPEN:
+        return True
+    # Un rechazo TCP indica que el host responde; puede ser un reloj solo UDP
+    if protocol == "auto" and state == _REFUSED:
+        return await _probe_udp(ip, port, timeout)
+    return False
+
+
+async def probe_many_async(
+    targets: Sequence[Tuple[str, int]],
+    timeout: float = 2.0,
+    concurrency: int = 256,
+    protocol: str = "auto",
+) -> Dict[str, bool]:
+    """
+    Sondea muchos relojes a la vez dentro del event loop actual.
+
+    Args:
+        targets: Pares (ip, puerto)
+        timeout: Segundos de espera por reloj
+        concurrency: Sondeos simultáneos máximos
+        protocol: "tcp", "udp" o "auto" (TCP y UDP si TCP es rechazado)
+
+    Returns:
+        Diccionario ip -> accesible
+    """
+    if protocol not in PROTOCOLS:
+        raise ValueError(f"Protocolo de sondeo inválido: {protocol}")
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def bounded(ip: str, port: int) -> bool:
+        async with semaphore:
+            return await _probe_one(ip, port, timeout, protocol)
+
+    results = await asyncio.gather(*(bounded(ip, port) for ip, port in targets))
+    return {ip: ok for (ip, _), ok in zip(targets, results)}
+
+
+def probe_many(
+    targets: Sequence[Tuple[str, int]],
+    timeout: float = 2.0,
+    concurrency: int = 256,
+    protocol: str = "auto",
+) -> Dict[str, bool]:
+    """
+    Sondea muchos relojes a la vez y devuelve el mapa de accesibilidad.
+
+    El tiempo total es aproximadamente el timeout de un solo reloj,
+    independientemente del tamaño de la flota.
+
+    Ejemplo de uso:
+        reachable = probe_many([("192.168.1.201", 4370), ("192.168.1.202", 4370)])
+        if reachable["192.168.1.201"]:
+            ...
+    """
+    if not targets:
+        return {}
+
+    reachable = asyncio.run(probe_many_async(targets, timeout, concurrency, protocol))
+    down = sum(1 for ok in reachable.values() if not ok)
+    logger.info(f"Sondeo de {len(reachable)} relojes: {len(reachable) - down} accesibles, {down} sin respuesta")
+    return reachable
+
+
+def probe(
+    ip: str,
+    port: int = 4370,
+    timeout: float = 2.0,
+    protocol: str = "auto",
+    attempts: int = 1,
+) -> bool:
+    """Sondea un solo reloj con reintentos"""
+    for _ in range(max(1, attempts)):
+        if asyncio.run(_probe_one(ip, port, timeout, protocol)):
+            return True
+    return False
+
+
+def describe(reachable: bool, port: int, protocol: str) -> str:
+    """Texto de observación para rrhh.clock_conn"""
+    channel = "tcp/udp" if protocol == "auto" else protocol
+    if reachable:
+        return f"Reloj accesible ({channel}:{port})"
+    return f"Sin respuesta en {channel}:{port}"
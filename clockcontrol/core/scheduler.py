@@ -0,0 +1,206 @@
+"""
+Planificador residente de sondeos por reloj (modo serve)
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class PollScheduler:
+    """
+    Ejecuta el procesamiento de cada reloj según su propio intervalo.
+
+    - Cada reloj tiene su próxima hora de sondeo; el intervalo se cuenta
+      desde que termina el sondeo anterior, por lo que dos sondeos del
+      mismo reloj nunca se superponen ni se acumulan.
+    - La lista de relojes se recarga cada refresh_interval segundos.
+    - stop() (p. ej. desde un handler de SIGTERM) deja de planificar y
+      espera a que terminen los sondeos en curso.
+
+    Ejemplo de uso:
+        scheduler = PollScheduler(
+            list_clocks=app.registry.all_active,
+            poll_batch=app.poll_clocks,
+            interval_for=lambda clock: 60.0,
+        )
+        scheduler.run()
+    """
+
+    def __init__(
+        self,
+        list_clocks: Callable[[], List[Any]],
+        poll_batch: Callable[[List[Any], Callable[[Any], None]], None],
+        interval_for: Callable[[Any], float],
+        max_workers: int = 8,
+        refresh_interval: float = 300.0,
+        max_sleep: float = 1.0,
+        on_idle: Optional[Callable[[], None]] = None,
+        key: Callable[[Any], str] = lambda clock: clock.ip,
+        initial_delay: Optional[Callable[[Any], float]] = None,
+    ):
+        """
+        Args:
+            list_clocks: Devuelve los relojes activos
+            poll_batch: Recibe los relojes vencidos y una función submit
+                        para encolar el procesamiento de cada uno (permite
+                        p. ej. sondear la red de todo el lote de una vez)
+            interval_for: Segundos hasta el próximo sondeo de un reloj,
+                          evaluado al terminar cada sondeo
+            max_workers: Relojes procesados en paralelo
+            refresh_interval: Segundos entre recargas de la lista de relojes
+            max_sleep: Espera máxima entre revisiones del planificador
+            on_idle: Se invoca en cada vuelta del planificador
+            key: Identificador único de un reloj
+            initial_delay: Segundos hasta el primer sondeo de un reloj
+                           recién cargado (None = inmediato)
+        """
+        self.list_clocks = list_clocks
+        self.poll_batch = poll_batch
+        self.interval_for = interval_for
+        self.max_workers = max_workers
+        self.refresh_interval = refresh_interval
+        self.max_sleep = max_sleep
+        self.on_idle = on_idle
+        self.key = key
+        self.initial_delay = initial_delay
+
+        self._clocks: Dict[str, Any] = {}
+        self._next_due: Dict[str, float] = {}
+        self._in_flight: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def in_flight(self) -> Set[str]:
+        """Relojes con un sondeo en curso"""
+        with self._lock:
+            return set(self._in_flight)
+
+    def stop(self) -> None:
+        """Solicita la detención ordenada del planificador"""
+        if not self._stop.is_set():
+            logger.info("Deteniendo planificador...")
+        self._stop.set()
+
+    def _refresh(self) -> None:
+        """Recarga la lista de relojes conservando su planificación"""
+        try:
+            clocks = self.list_clocks()
+        except Exception as e:
+            logger.error(f"No se pudo recargar la lista de relojes: {e}")
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            self._clocks = {self.key(clock): clock for clock in clocks}
+            for ip, clock in self._clocks.items():
+                if ip not in self._next_due:
+                    self._next_due[ip] = now + self._first_delay(clock)
+            for ip in list(self._next_due):
+                if ip not in self._clocks:
+                    del self._next_due[ip]
+        logger.info(f"Planificador: {len(self._clocks)} relojes activos")
+
+    def _first_delay(self, clock: Any) -> float:
+        """Espera antes del primer sondeo de un reloj"""
+        if self.initial_delay is None:
+            return 0.0
+        try:
+            return max(0.0, self.initial_delay(clock))
+        except Exception as e:
+            logger.error(f"No se pudo calcular el primer sondeo de {self.key(clock)}: {e}")
+            return 0.0
+
+    def _due_clocks(self, now: float) -> List[Any]:
+        """Relojes vencidos sin sondeo en curso (marcados como en curso)"""
+        with self._lock:
+            due = [
+                self._clocks[ip]
+                for ip, at in self._next_due.items()
+                if at <= now and ip not in self._in_flight and ip in self._clocks
+            ]
+            for clock in due:
+                self._in_flight.add(self.key(clock))
+        return due
+
+    def _finish(self, clock: Any, future: Future) -> None:
+        """Reprograma un reloj al terminar su sondeo"""
+        ip = self.key(clock)
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Error no controlado procesando {ip}: {error}")
+        try:
+            interval = self.interval_for(clock)
+        except Exception as e:
+            logger.error(f"No se pudo calcular el intervalo de {ip}: {e}")
+            interval = self.refresh_interval
+        with self._lock:
+            self._in_flight.discard(ip)
+            if ip in self._next_due:
+                self._next_due[ip] = time.monotonic() + max(0.0, interval)
+
+    def _submit(self, clock: Any, func: Callable[[], Any]) -> None:
+        """Encola el procesamiento de un reloj en el pool de hilos"""
+        future = self._executor.submit(func)
+        future.add_done_callback(lambda f: self._finish(clock, f))
+
+    def _sleep_time(self, now: float) -> float:
+        """Tiempo hasta el próximo reloj vencido (acotado por max_sleep)"""
+        with self._lock:
+            pending = [
+                at for ip, at in self._next_due.items() if ip not in self._in_flight
+            ]
+        if not pending:
+            return self.max_sleep
+        return max(0.0, min(min(pending) - now, self.max_sleep))
+
+    def run(self) -> None:
+        """Bucle principal; retorna después de stop() y de vaciar los sondeos"""
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, self.max_workers),
+            thread_name_prefix="clockcontrol-poll",
+        )
+        last_refresh: Optional[float] = None
+        logger.info(f"Planificador iniciado ({self.max_workers} relojes en paralelo)")
+
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                if last_refresh is None or now - last_refresh >= self.refresh_interval:
+                    self._refresh()
+                    last_refresh = now
+
+                due = self._due_clocks(now)
+                if due:
+                    submitted: Set[str] = set()
+
+                    def submit(clock: Any, func: Callable[[], Any]) -> None:
+                        submitted.add(self.key(clock))
+                        self._submit(clock, func)
+
+                    try:
+                        self.poll_batch(due, submit)
+                    finally:
+                        # Relojes que poll_batch no encoló vuelven a planificarse
+                        skipped = [c for c in due if self.key(c) not in submitted]
+                        for clock in skipped:
+                            done: Future = Future()
+                            done.set_result(None)
+                            self._finish(clock, done)
+
+                if self.on_idle is not None:
+                    try:
+                        self.on_idle()
+                    except Exception as e:
+                        logger.error(f"Error en tarea periódica del planificador: {e}")
+
+                self._stop.wait(self._sleep_time(time.monotonic()))
+        finally:
+            logger.info("Esperando sondeos en curso...")
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            logger.info("Planificador detenido")
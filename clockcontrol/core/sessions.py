@@ -0,0 +1,278 @@
+"""
+Sesiones persistentes con dispositivos ZK entre sondeos
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Generator, List, Tuple
+
+from clockcontrol.core.device import ZKDeviceManager
+from clockcontrol.core.exceptions import ClockControlError, DeviceConnectionError
+
+logger = logging.getLogger(__name__)
+
+SessionKey = Tuple[str, int]
+
+# Conexión separada de su sesión, pendiente de cerrar fuera del lock
+_Detached = Tuple[ZKDeviceManager, Any]
+
+
+@dataclass
+class _Session:
+    """Conexión abierta con un reloj"""
+    device: ZKDeviceManager
+    conn: Any = None
+    last_used: float = 0.0
+    in_use: bool = False
+    failures: int = 0
+    retry_at: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class DeviceSessionManager:
+    """
+    Mantiene abiertas las conexiones pyzk entre sondeos del mismo reloj.
+
+    - Antes de reutilizar una sesión se verifica con un comando liviano
+      (get_time); si no responde se reconecta de forma transparente.
+    - Tras un fallo de conexión el reloj queda en espera con backoff
+      exponencial (backoff_base, 2x, 4x ... hasta backoff_max).
+    - Como máximo hay max_sessions conexiones abiertas; al llegar al
+      límite se cierra la sesión inactiva usada hace más tiempo.
+
+    Ejemplo de uso:
+        sessions = DeviceSessionManager(max_sessions=32)
+        with sessions.session(ZKDeviceManager("192.168.1.201")) as conn:
+            attendances = conn.get_attendance()
+        ...
+        sessions.close()
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 32,
+        idle_timeout: float = 300.0,
+        backoff_base: float = 5.0,
+        backoff_max: float = 300.0,
+        acquire_timeout: float = 30.0,
+    ):
+        """
+        Args:
+            max_sessions: Conexiones abiertas como máximo
+            idle_timeout: Segundos sin uso tras los cuales prune() cierra la sesión
+            backoff_base: Espera tras el primer fallo de conexión
+            backoff_max: Espera máxima entre reconexiones
+            acquire_timeout: Segundos de espera por un lugar libre
+        """
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.acquire_timeout = acquire_timeout
+
+        # Orden LRU: la sesión usada hace más tiempo queda primero
+        self._sessions: "OrderedDict[SessionKey, _Session]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    @property
+    def open_count(self) -> int:
+        """Cantidad de conexiones abiertas"""
+        with self._cond:
+            return self._open_count()
+
+    def _open_count(self) -> int:
+        return sum(1 for s in self._sessions.values() if s.conn is not None)
+
+    def _get_session(self, device: ZKDeviceManager) -> _Session:
+        """Obtiene (o crea) la sesión de un reloj y la marca como la más reciente"""
+        key = (device.ip, device.port)
+        with self._cond:
+            if self._closed:
+                raise DeviceConnectionError("Gestor de sesiones cerrado")
+            session = self._sessions.get(key)
+            if session is None:
+                session = _Session(device=device)
+                self._sessions[key] = session
+            elif session.conn is None:
+                # Sin conexión abierta se adopta la configuración más reciente
+                session.device = device
+            self._sessions.move_to_end(key)
+            return session
+
+    def _reserve_slot(self, session: _Session) -> None:
+        """
+        Espera un lugar para abrir una conexión nueva, cerrando la sesión
+        inactiva menos reciente si se alcanzó max_sessions.
+        """
+        deadline = time.monotonic() + self.acquire_timeout
+        evicted: List[_Detached] = []
+        try:
+            with self._cond:
+                while self._open_count() >= self.max_sessions:
+                    victim = next(
+                        (s for s in self._sessions.values()
+                         if s.conn is not None and not s.in_use and s is not session),
+                        None,
+                    )
+                    if victim is not None:
+                        logger.debug(f"Límite de sesiones alcanzado, cerrando {victim.device.ip}")
+                        evicted += self._detach(victim)
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise DeviceConnectionError(
+                            f"Sin lugar para abrir sesión con {session.device.ip} "
+                            f"({self.max_sessions} sesiones en uso)"
+                        )
+                    self._cond.wait(remaining)
+                # Reserva el lugar hasta que la conexión se abra o falle
+                session.conn = _PENDING
+        finally:
+            self._disconnect(evicted)
+
+    def _detach(self, session: _Session) -> List[_Detached]:
+        """
+        Separa la conexión de una sesión (con self._cond tomado) y libera
+        su lugar. La conexión se cierra con _disconnect después de soltar
+        el lock: desconectar es E/S de red y un reloj colgado no debe
+        bloquear al resto de los hilos.
+        """
+        conn, session.conn = session.conn, None
+        self._cond.notify_all()
+        if conn is None or conn is _PENDING:
+            return []
+        return [(session.device, conn)]
+
+    @staticmethod
+    def _disconnect(detached: List[_Detached]) -> None:
+        """Cierra conexiones ya separadas de sus sesiones (sin self._cond tomado)"""
+        for device, conn in detached:
+            device.disconnect(conn)
+
+    def _connect(self, session: _Session, retries: int, delay: float) -> None:
+        """Abre la conexión respetando el backoff de fallos previos"""
+        now = time.monotonic()
+        if now < session.retry_at:
+            raise DeviceConnectionError(
+                f"Reconexión con {session.device.ip} en espera "
+                f"({session.retry_at - now:.0f}s, {session.failures} fallos)"
+            )
+
+        self._reserve_slot(session)
+        try:
+            conn = session.device.open(retries=retries, delay=delay)
+        except DeviceConnectionError:
+            with self._cond:
+                session.conn = None
+                session.failures += 1
+                wait = min(
+                    self.backoff_base * 2 ** (session.failures - 1),
+                    self.backoff_max,
+                )
+                session.retry_at = time.monotonic() + wait
+                self._cond.notify_all()
+            raise
+
+        with self._cond:
+            session.conn = conn
+            session.failures = 0
+            session.retry_at = 0.0
+
+    @contextmanager
+    def session(
+        self,
+        device: ZKDeviceManager,
+        retries: int = 2,
+        delay: float = 2.0,
+    ) -> Generator[Any, None, None]:
+        """
+        Context manager que entrega una conexión abierta y la conserva al salir.
+
+        Un error del dispositivo dentro del bloque cierra la sesión (se
+        reconecta en el próximo uso); los errores propios de la aplicación
+        (p. ej. DatabaseError) la conservan.
+
+        Args:
+            device: Reloj al que conectarse
+            retries: Intentos de conexión si no hay sesión abierta
+            delay: Segundos entre reintentos
+
+        Yields:
+            Conexión activa al dispositivo ZK
+
+        Raises:
+            DeviceConnectionError: Si no se puede conectar o el reloj está en backoff
+        """
+        session = self._get_session(device)
+
+        # Una sola operación a la vez por reloj
+        with session.lock:
+            with self._cond:
+                session.in_use = True
+            try:
+                if session.conn is not None and not session.device.is_alive(session.conn):
+                    with self._cond:
+                        dead = self._detach(session)
+                    self._disconnect(dead)
+                if session.conn is None:
+                    self._connect(session, retries, delay)
+
+                try:
+                    yield session.conn
+                except ClockControlError:
+                    raise
+                except BaseException:
+                    with self._cond:
+                        failed = self._detach(session)
+                    self._disconnect(failed)
+                    raise
+            finally:
+                closing: List[_Detached] = []
+                with self._cond:
+                    session.in_use = False
+                    session.last_used = time.monotonic()
+                    if self._closed:
+                        closing = self._detach(session)
+                    self._cond.notify_all()
+                self._disconnect(closing)
+
+    def prune(self) -> int:
+        """
+        Cierra las sesiones inactivas por más de idle_timeout.
+
+        Returns:
+            Cantidad de sesiones cerradas
+        """
+        now = time.monotonic()
+        idle: List[_Detached] = []
+        with self._cond:
+            for session in list(self._sessions.values()):
+                if (
+                    session.conn is not None
+                    and not session.in_use
+                    and now - session.last_used >= self.idle_timeout
+                ):
+                    idle += self._detach(session)
+        self._disconnect(idle)
+        closed = len(idle)
+        if closed:
+            logger.info(f"Sesiones inactivas cerradas: {closed}")
+        return closed
+
+    def close(self) -> None:
+        """Cierra todas las sesiones (las que están en uso, al liberarse)"""
+        detached: List[_Detached] = []
+        with self._cond:
+            self._closed = True
+            for session in self._sessions.values():
+                if not session.in_use:
+                    detached += self._detach(session)
+        self._disconnect(detached)
+
+
+# Marca un lugar reservado mientras se abre la conexión
+_PENDING = object()
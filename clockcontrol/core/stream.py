@@ -0,0 +1,225 @@
+"""
+Captura en tiempo real de marcajes (live capture de pyzk)
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from clockcontrol.core.attendance import AttendanceMark, AttendanceProcessor, MarkBatch
+from clockcontrol.core.device import ZKDeviceManager
+from clockcontrol.core.exceptions import ClockControlError
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatchWriter:
+    """
+    Agrupa marcajes recibidos en tiempo real y los guarda en lotes cortos.
+
+    Un hilo de fondo guarda lo acumulado cada max_delay segundos, o antes
+    si se juntan max_batch marcajes. Se hace un guardado por reloj (el
+    stored procedure recibe el id del reloj). Si el guardado falla los
+    marcajes se conservan para el siguiente intento.
+
+    Ejemplo de uso:
+        writer = MicroBatchWriter(app.save_marks, max_delay=2.0)
+        writer.start()
+        writer.add(marks)
+        ...
+        writer.close()
+    """
+
+    def __init__(
+        self,
+        save: Callable[[int, MarkBatch], int],
+        max_batch: int = 500,
+        max_delay: float = 2.0,
+    ):
+        """
+        Args:
+            save: Guarda un lote de un reloj y devuelve los insertados
+            max_batch: Marcajes acumulados que disparan un guardado inmediato
+            max_delay: Segundos máximos que un marcaje espera en memoria
+        """
+        self.save = save
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+
+        self._pending: Dict[int, MarkBatch] = {}
+        self._count = 0
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def pending(self) -> int:
+        """Marcajes aún no guardados"""
+        with self._cond:
+            return self._count
+
+    def add(self, marks: Iterable[AttendanceMark]) -> None:
+        """Encola marcajes para el próximo guardado"""
+        with self._cond:
+            for mark in marks:
+                batch = self._pending.get(mark.id_reloj_bio)
+                if batch is None:
+                    batch = MarkBatch(mark.ip_clock, mark.id_reloj_bio)
+                    self._pending[mark.id_reloj_bio] = batch
+                batch.append(mark.carnet, mark.date_mark, mark.time_mark)
+                self._count += 1
+            if self._count >= self.max_batch:
+                self._cond.notify_all()
+
+    def flush(self) -> int:
+        """
+        Guarda todo lo acumulado.
+
+        Returns:
+            Cantidad de registros insertados
+        """
+        with self._flush_lock:
+            with self._cond:
+                pending, self._pending = self._pending, {}
+                self._count = 0
+
+            inserted = 0
+            for clock_id, batch in pending.items():
+                try:
+                    saved = self.save(clock_id, batch)
+                    inserted += saved
+                    logger.info(
+                        f"Tiempo real {batch.ip_clock}: {saved}/{len(batch)} marcajes guardados"
+                    )
+                except ClockControlError as e:
+                    logger.error(
+                        f"No se pudieron guardar {len(batch)} marcajes de {batch.ip_clock}: {e}"
+                    )
+                    self._requeue(batch)
+            return inserted
+
+    def _requeue(self, batch: MarkBatch) -> None:
+        """Devuelve un lote fallido a la cola (antes de lo recibido después)"""
+        with self._cond:
+            newer = self._pending.get(batch.id_reloj_bio)
+            if newer is not None:
+                for carnet, date_mark, time_mark in zip(newer.carnets, newer.dates, newer.times):
+                    batch.append(carnet, date_mark, time_mark)
+            self._pending[batch.id_reloj_bio] = batch
+            self._count += len(batch) - (len(newer) if newer is not None else 0)
+
+    def _run(self) -> None:
+        """Hilo de fondo: guarda por tiempo o por tamaño"""
+        while not self._stop.is_set():
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._count >= self.max_batch or self._stop.is_set(),
+                    timeout=self.max_delay,
+                )
+            self.flush()
+
+    def start(self) -> None:
+        """Inicia el hilo de guardado"""
+        self._thread = threading.Thread(
+            target=self._run, name="clockcontrol-writer", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """Detiene el hilo y guarda lo pendiente"""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+
+class LiveCaptureWorker:
+    """
+    Recibe los marcajes de un reloj en el momento en que se registran.
+
+    Alterna dos fases:
+    - reconcile(): sondeo incremental normal (respaldo ante eventos
+      perdidos mientras no había conexión).
+    - live capture durante reconcile_interval segundos, enviando cada
+      evento al MicroBatchWriter.
+
+    Ambas fases usan conexiones distintas pero nunca simultáneas, ya que
+    el reloj no atiende otros comandos durante el live capture.
+    """
+
+    def __init__(
+        self,
+        device: ZKDeviceManager,
+        clock_id: int,
+        processor: AttendanceProcessor,
+        writer: MicroBatchWriter,
+        reconcile: Callable[[], Any],
+        stop: threading.Event,
+        reconcile_interval: float = 300.0,
+        event_timeout: int = 2,
+        retry_delay: float = 30.0,
+    ):
+        """
+        Args:
+            device: Reloj a escuchar
+            clock_id: ID del reloj en rrhh.reloj_biometrico
+            processor: Convierte eventos en AttendanceMark
+            writer: Destino de los marcajes
+            reconcile: Sondeo incremental del reloj
+            stop: Evento de detención compartido
+            reconcile_interval: Segundos de captura entre reconciliaciones
+            event_timeout: Segundos de espera por evento (cada cuánto se
+                           revisa la detención)
+            retry_delay: Espera tras un error de conexión
+        """
+        self.device = device
+        self.clock_id = clock_id
+        self.processor = processor
+        self.writer = writer
+        self.reconcile = reconcile
+        self.stop = stop
+        self.reconcile_interval = reconcile_interval
+        self.event_timeout = event_timeout
+        self.retry_delay = retry_delay
+
+    def capture(self, conn: Any, until: float) -> int:
+        """
+        Escucha eventos hasta la hora monotónica until o la detención.
+
+        Returns:
+            Cantidad de eventos recibidos
+        """
+        events = 0
+        # pyzk entrega None cada event_timeout segundos sin eventos
+        for attendance in conn.live_capture(new_timeout=self.event_timeout):
+            if attendance is not None:
+                events += 1
+                marks = self.processor.process([attendance], self.device.ip, self.clock_id)
+                self.writer.add(marks)
+            if self.stop.is_set() or time.monotonic() >= until:
+                # Termina el bucle de pyzk para que restaure el reloj
+                conn.end_live_capture = True
+        return events
+
+    def run(self) -> None:
+        """Bucle del reloj hasta la detención"""
+        ip = self.device.ip
+        while not self.stop.is_set():
+            try:
+                self.reconcile()
+            except Exception as e:
+                logger.error(f"Error en reconciliación de {ip}: {e}")
+            if self.stop.is_set():
+                break
+
+            try:
+                with self.device.connect() as conn:
+                    logger.info(f"Tiempo real activo en {ip}")
+                    events = self.capture(conn, time.monotonic() + self.reconcile_interval)
+                    logger.info(f"Tiempo real en {ip}: {events} eventos recibidos")
+            except Exception as e:
+                logger.warning(f"Tiempo real interrumpido en {ip}: {e}")
+                self.stop.wait(self.retry_delay)
@@ -0,0 +1,159 @@
+"""
+Descarga incremental de marcajes mediante marca de agua por reloj
+"""
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, List, Optional
+
+from clockcontrol.utils.state import JsonStateStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Watermark:
+    """
+    Último punto procesado del log de un reloj.
+
+    records es la cantidad de registros que tenía el log del dispositivo
+    y last_timestamp la fecha/hora del último de ellos, usada para
+    detectar que el log fue borrado y vuelto a llenar. read_at es el
+    momento (epoch) de la última descarga completa del log.
+    """
+    records: int
+    last_timestamp: Optional[str] = None
+    read_at: Optional[float] = None
+
+    @classmethod
+    def from_records(cls, raw_attendances: List[Any]) -> "Watermark":
+        """Crea la marca de agua a partir del log completo descargado"""
+        last = raw_attendances[-1] if raw_attendances else None
+        return cls(
+            records=len(raw_attendances),
+            last_timestamp=_timestamp_of(last),
+            read_at=time.time(),
+        )
+
+
+class WatermarkStore:
+    """
+    Persiste la marca de agua de cada reloj entre ejecuciones.
+
+    pyzk no permite pedir al dispositivo un rango de registros, pero sí
+    su cantidad (read_sizes). Con la marca de agua se evita por completo
+    la descarga cuando el log no creció, y cuando creció solo se procesan
+    los registros nuevos.
+
+    Ejemplo de uso:
+        watermarks = WatermarkStore(JsonStateStore("state/watermarks.json"))
+        previous = watermarks.get(ip)
+        new_records = watermarks.select_new(ip, raw_attendances, previous)
+        ...
+        watermarks.save(ip, Watermark.from_records(raw_attendances))
+    """
+
+    def __init__(self, store: Optional[JsonStateStore]):
+        """
+        Args:
+            store: Almacén de estado (None = sin persistencia, siempre completo)
+        """
+        self.store = store
+
+    def get(self, ip: str) -> Optional[Watermark]:
+        """Obtiene la marca de agua de un reloj"""
+        if self.store is None:
+            return None
+        data = self.store.get(ip)
+        if not data:
+            return None
+        try:
+            return Watermark(**data)
+        except TypeError:
+            logger.warning(f"Marca de agua inválida para {ip}, se ignora: {data}")
+            return None
+
+    def save(self, ip: str, watermark: Watermark) -> None:
+        """Guarda la marca de agua de un reloj"""
+        if self.store is not None:
+            self.store.set(ip, asdict(watermark))
+
+    def reset(self, ip: str) -> None:
+        """Descarta la marca de agua (fuerza resincronización completa)"""
+        if self.store is not None:
+            self.store.delete(ip)
+
+    @staticmethod
+    def is_unchanged(
+        previous: Optional[Watermark],
+        record_count: Optional[int],
+        max_age: float = 0.0,
+    ) -> bool:
+        """
+        Indica si el log del dispositivo no cambió desde la última lectura.
+        
+        Solo se compara la cantidad de registros: un log borrado y vuelto a
+        llenar (o un log lleno que rota) con la misma cantidad pasaría
+        inadvertido. Por eso, con max_age > 0, el log se descarga completo
+        si la última descarga tiene más de max_age segundos, y select_new
+        lo verifica contra last_timestamp.
+        """
+        if previous is None or record_count is None or record_count != previous.records:
+            return False
+        if max_age > 0:
+            return previous.read_at is not None and time.time() - previous.read_at < max_age
+        return True
+
+    @staticmethod
+    def select_new(
+        ip: str,
+        raw_attendances: List[Any],
+        previous: Optional[Watermark],
+    ) -> List[Any]:
+        """
+        Selecciona los registros posteriores a la marca de agua.
+
+        Si el log tiene menos registros que antes, o el registro en la
+        posición de la marca de agua no coincide, se asume que el log del
+        dispositivo fue borrado y se devuelve completo.
+
+        Args:
+            ip: IP del reloj (para logging)
+            raw_attendances: Log completo descargado del dispositivo
+            previous: Marca de agua anterior (None = primera lectura)
+
+        Returns:
+            Registros a procesar
+        """
+        if previous is None or previous.records <= 0:
+            return raw_attendances
+
+        if len(raw_attendances) < previous.records:
+            logger.warning(
+                f"Log de {ip} se redujo ({previous.records} -> "
+                f"{len(raw_attendances)}), resincronización completa"
+            )
+            return raw_attendances
+
+        anchor = _timestamp_of(raw_attendances[previous.records - 1])
+        if previous.last_timestamp and anchor != previous.last_timestamp:
+            logger.warning(
+                f"Log de {ip} no coincide con la marca de agua "
+                f"({previous.last_timestamp} != {anchor}), resincronización completa"
+            )
+            return raw_attendances
+
+        new_records = raw_attendances[previous.records:]
+        logger.info(
+            f"Lectura incremental de {ip}: {len(new_records)} registros nuevos "
+            f"desde la posición {previous.records}"
+        )
+        return new_records
+
+
+def _timestamp_of(attendance: Any) -> Optional[str]:
+    """Fecha/hora de un registro crudo como texto"""
+    if attendance is None:
+        return None
+    timestamp = getattr(attendance, "timestamp", None)
+    return str(timestamp) if timestamp is not None else None
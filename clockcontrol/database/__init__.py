@@ -1,15 +1,21 @@
 """
 Capa de acceso a datos
 """
-from clockcontrol.database.connection import DatabaseConnection, get_connection
-from clockcontrol.database.models import Clock, ConnectionLog
-from clockcontrol.database.repositories import ClockRepository, AttendanceRepository
+from clockcontrol.utils.lazy import lazy_exports
 
-__all__ = [
-    "DatabaseConnection",
-    "get_connection",
-    "Clock",
-    "ConnectionLog",
-    "ClockRepository",
-    "AttendanceRepository",
-]
+# Importación diferida: psycopg2 se carga con el primer uso
+_LAZY_IMPORTS = {
+    "DatabaseConnection": "clockcontrol.database.connection",
+    "get_connection": "clockcontrol.database.connection",
+    "Clock": "clockcontrol.database.models",
+    "ConnectionLog": "clockcontrol.database.models",
+    "ClockRepository": "clockcontrol.database.repositories",
+    "AttendanceRepository": "clockcontrol.database.repositories",
+    "LeaseRepository": "clockcontrol.database.repositories",
+    "ClockRegistry": "clockcontrol.database.registry",
+    "ShardCoordinator": "clockcontrol.database.sharding",
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+__getattr__, __dir__ = lazy_exports(__name__, globals(), _LAZY_IMPORTS)
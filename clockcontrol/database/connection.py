@@ -2,35 +2,232 @@
 Gestión de conexiones a base de datos
 """
 import logging
+import threading
+import time
+from collections import deque
 from contextlib import contextmanager
-from typing import Any, Generator
+from typing import Any, Deque, Generator, Optional, Tuple
 
 import psycopg2
+from psycopg2 import extensions
 
 from clockcontrol.core.exceptions import DatabaseError
 
 logger = logging.getLogger(__name__)
 
 
+class ConnectionPool:
+    """
+    Pool de conexiones PostgreSQL seguro para varios hilos.
+    
+    A diferencia de psycopg2.pool, bloquea (con timeout) cuando todas las
+    conexiones están en uso, verifica con SELECT 1 las conexiones que
+    estuvieron inactivas más de health_check_interval y descarta las
+    conexiones rotas para que la siguiente solicitud reconecte.
+    
+    Ejemplo de uso:
+        pool = ConnectionPool(params, min_size=1, max_size=10)
+        conn = pool.acquire()
+        try:
+            ...
+        finally:
+            pool.release(conn)
+    """
+    
+    def __init__(
+        self,
+        params: dict,
+        min_size: int = 1,
+        max_size: int = 10,
+        health_check_interval: float = 30.0,
+        acquire_timeout: float = 30.0,
+    ):
+        """
+        Args:
+            params: Parámetros de conexión para psycopg2.connect
+            min_size: Conexiones que se abren al primer uso
+            max_size: Conexiones simultáneas máximas
+            health_check_interval: Segundos de inactividad tras los que
+                                   se verifica la conexión antes de usarla
+            acquire_timeout: Segundos máximos de espera por una conexión libre
+        """
+        if max_size < 1:
+            raise ValueError("max_size debe ser mayor o igual a 1")
+        
+        self.params = params
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._warmed = False
+        self._closed = False
+    
+    def _connect(self) -> Any:
+        """Abre una conexión nueva"""
+        conn = psycopg2.connect(**self.params)
+        logger.debug("Conexión a base de datos establecida (pool)")
+        return conn
+    
+    def _warm(self) -> None:
+        """Abre las conexiones mínimas la primera vez que se usa el pool"""
+        with self._lock:
+            if self._warmed:
+                return
+            self._warmed = True
+            missing = self.min_size - len(self._idle)
+        
+        for _ in range(max(0, missing)):
+            try:
+                conn = self._connect()
+            except psycopg2.Error as e:
+                logger.warning(f"No se pudo precalentar el pool de conexiones: {e}")
+                return
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+    
+    def _is_healthy(self, conn: Any, idle_since: float) -> bool:
+        """Verifica que una conexión inactiva siga viva"""
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error as e:
+            logger.info(f"Conexión inactiva descartada: {e}")
+            return False
+    
+    @staticmethod
+    def _discard(conn: Any) -> None:
+        """Cierra una conexión ignorando errores"""
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+    
+    def acquire(self) -> Any:
+        """
+        Obtiene una conexión del pool (o abre una nueva).
+        
+        Raises:
+            DatabaseError: Si el pool está cerrado o agotado tras acquire_timeout
+            psycopg2.Error: Si no se puede abrir una conexión nueva
+        """
+        if self._closed:
+            raise DatabaseError("El pool de conexiones está cerrado")
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise DatabaseError(
+                f"Pool de conexiones agotado ({self.max_size}) tras "
+                f"{self.acquire_timeout:.0f}s de espera"
+            )
+        
+        try:
+            self._warm()
+            while True:
+                with self._lock:
+                    item = self._idle.pop() if self._idle else None
+                if item is None:
+                    return self._connect()
+                conn, idle_since = item
+                if self._is_healthy(conn, idle_since):
+                    return conn
+                self._discard(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+    
+    def release(self, conn: Any, discard: bool = False) -> None:
+        """
+        Devuelve una conexión al pool.
+        
+        Args:
+            conn: Conexión obtenida con acquire()
+            discard: Cierra la conexión en lugar de reutilizarla
+        """
+        try:
+            if not discard and not conn.closed:
+                status = conn.info.transaction_status
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    discard = True
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    try:
+                        conn.rollback()
+                    except psycopg2.Error:
+                        discard = True
+            
+            if discard or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+    
+    def close(self) -> None:
+        """Cierra todas las conexiones inactivas y rechaza nuevas solicitudes"""
+        self._closed = True
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self._discard(conn)
+        logger.debug(f"Pool de conexiones cerrado ({len(idle)} conexiones)")
+
+
 class DatabaseConnection:
     """
     Gestor de conexiones a PostgreSQL.
     
+    Con pool_max > 0 las conexiones se reutilizan a través de un
+    ConnectionPool compartido por todos los repositorios que usen esta
+    instancia; con pool_max = 0 se abre una conexión por operación.
+    
     Ejemplo de uso:
-        db = DatabaseConnection(config.database.to_dict())
+        db = DatabaseConnection(config.database.to_dict(), pool_max=10)
         
         with db.get_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("SELECT * FROM tabla")
+        
+        db.close()
     """
     
-    def __init__(self, params: dict):
+    def __init__(
+        self,
+        params: dict,
+        pool_min: int = 0,
+        pool_max: int = 0,
+        health_check_interval: float = 30.0,
+    ):
         """
         Args:
             params: Diccionario con parámetros de conexión
                    (host, port, database, user, password)
+            pool_min: Conexiones que el pool abre al primer uso
+            pool_max: Conexiones simultáneas máximas (0 = sin pool)
+            health_check_interval: Segundos de inactividad tras los que
+                                   se verifica una conexión del pool
         """
         self.params = params
+        self._pool: Optional[ConnectionPool] = None
+        if pool_max > 0:
+            self._pool = ConnectionPool(
+                params,
+                min_size=pool_min,
+                max_size=pool_max,
+                health_check_interval=health_check_interval,
+            )
+    
+    @property
+    def pooled(self) -> bool:
+        """Indica si las conexiones se reutilizan mediante pool"""
+        return self._pool is not None
     
     @contextmanager
     def get_connection(self) -> Generator[Any, None, None]:
@@ -43,6 +240,11 @@ class DatabaseConnection:
         Raises:
             DatabaseError: Si hay error de conexión
         """
+        if self._pool is not None:
+            with self._pooled_connection() as conn:
+                yield conn
+            return
+        
         conn = None
         try:
             conn = psycopg2.connect(**self.params)
@@ -59,6 +261,30 @@ class DatabaseConnection:
                 conn.close()
                 logger.debug("Conexión a base de datos cerrada")
     
+    @contextmanager
+    def _pooled_connection(self) -> Generator[Any, None, None]:
+        """Igual que get_connection pero tomando la conexión del pool"""
+        conn = None
+        broken = False
+        try:
+            conn = self._pool.acquire()
+            yield conn
+            conn.commit()
+        except psycopg2.Error as e:
+            # Errores de conexión: la conexión se descarta y la
+            # siguiente operación reconecta
+            broken = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+            if conn and not broken:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            logger.error(f"Error de base de datos: {e}")
+            raise DatabaseError(f"Error de base de datos: {e}") from e
+        finally:
+            if conn:
+                self._pool.release(conn, discard=broken)
+    
     @contextmanager
     def get_cursor(self) -> Generator[Any, None, None]:
         """
@@ -71,6 +297,11 @@ class DatabaseConnection:
             with conn.cursor() as cur:
                 yield cur
     
+    def close(self) -> None:
+        """Cierra las conexiones del pool (no-op sin pool)"""
+        if self._pool is not None:
+            self._pool.close()
+    
     def ensure_tables_exist(self) -> None:
         """Verifica que las tablas necesarias existan"""
         with self.get_cursor() as cur:
@@ -91,6 +322,6 @@ class DatabaseConnection:
                 logger.info("Tablas verificadas correctamente")
 
 
-def get_connection(params: dict) -> DatabaseConnection:
+def get_connection(params: dict, pool_min: int = 0, pool_max: int = 0) -> DatabaseConnection:
     """Factory function para crear DatabaseConnection"""
-    return DatabaseConnection(params)
+    return DatabaseConnection(params, pool_min=pool_min, pool_max=pool_max)
@@ -0,0 +1,219 @@
+"""
+Escritura agrupada de logs de conexión (rrhh.clock_conn)
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Union
+
+from clockcontrol.core.exceptions import ClockControlError
+from clockcontrol.database.models import ConnectionLog
+from clockcontrol.database.repositories import AttendanceRepository
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionLogBuffer:
+    """
+    Acumula los logs de conexión de un barrido y los inserta juntos.
+
+    Cada entrada se escribe primero en un journal local (JSON por línea,
+    con fsync) y recién se descarta del journal cuando el INSERT
+    multi-fila confirma. Si el proceso cae a mitad de barrido, las
+    entradas pendientes se reenvían al crear el siguiente buffer.
+
+    Tiene la misma firma log_connection que AttendanceRepository, por lo
+    que puede usarse en su lugar.
+
+    Ejemplo de uso:
+        buffer = ConnectionLogBuffer(attendance_repo, "state/clock_conn.journal")
+        buffer.log_connection("192.168.1.1", True, "Reloj accesible")
+        ...
+        buffer.flush()
+    """
+
+    def __init__(
+        self,
+        repo: AttendanceRepository,
+        journal_path: Optional[Union[str, Path]] = None,
+        max_entries: int = 500,
+        max_age: float = 30.0,
+    ):
+        """
+        Args:
+            repo: Repositorio donde se insertan los logs
+            journal_path: Archivo journal (None = solo en memoria)
+            max_entries: Entradas acumuladas que disparan un flush
+            max_age: Segundos de antigüedad de la entrada más vieja
+                     que disparan un flush
+        """
+        self.repo = repo
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.journal_path = Path(journal_path) if journal_path else None
+
+        self._entries: List[ConnectionLog] = []
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._journal = None
+
+        if self.journal_path is not None:
+            self._entries = self._replay()
+            if self._entries:
+                self._oldest = time.monotonic()
+                logger.info(
+                    f"Recuperados {len(self._entries)} logs de conexión pendientes "
+                    f"de una ejecución anterior"
+                )
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _replay(self) -> List[ConnectionLog]:
+        """Lee las entradas que quedaron en el journal"""
+        if not self.journal_path.exists():
+            return []
+
+        entries = []
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    data = json.loads(line)
+                    entries.append(ConnectionLog(
+                        ip_clock=data["ip"],
+                        available=data["available"],
+                        observation=data["obs"],
+                        timestamp=datetime.fromisoformat(data["ts"]),
+                    ))
+                except (ValueError, KeyError, TypeError):
+                    # Línea truncada por una caída durante la escritura
+                    logger.warning(f"Entrada inválida en journal ignorada: {line[:100]!r}")
+        return entries
+
+    def _write_journal(self, entry: ConnectionLog) -> None:
+        """Agrega una entrada al journal y la asegura en disco"""
+        if self._journal is None:
+            return
+        self._journal.write(_encode(entry))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _rewrite_journal(self) -> None:
+        """Reemplaza el journal con las entradas aún pendientes"""
+        if self._journal is None:
+            return
+        self._journal.close()
+        tmp_path = self.journal_path.with_suffix(self.journal_path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in self._entries:
+                f.write(_encode(entry))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def log_connection(self, ip: str, available: bool, observation: str) -> None:
+        """
+        Registra un intento de conexión (se inserta en el próximo flush).
+
+        Args:
+            ip: IP del reloj
+            available: True si la conexión fue exitosa
+            observation: Descripción del resultado
+        """
+        entry = ConnectionLog(
+            ip_clock=ip,
+            available=available,
+            observation=observation[:255],
+            # Con zona horaria: PostgreSQL la convierte a la hora del
+            # servidor, igual que el now() por defecto de rrhh.clock_conn
+            timestamp=datetime.now(timezone.utc),
+        )
+        with self._lock:
+            self._entries.append(entry)
+            self._write_journal(entry)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            due = (
+                len(self._entries) >= self.max_entries
+                or time.monotonic() - self._oldest >= self.max_age
+            )
+
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Inserta todas las entradas pendientes en un solo INSERT.
+
+        Si la base de datos falla las entradas se conservan (en memoria y
+        en el journal) para el próximo intento.
+
+        Returns:
+            Cantidad de entradas insertadas
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._entries)
+            if not batch:
+                return 0
+
+            try:
+                self.repo.log_connections(batch)
+            except ClockControlError as e:
+                logger.error(f"No se pudieron registrar {len(batch)} logs de conexión: {e}")
+                return 0
+
+            with self._lock:
+                # Solo flush elimina entradas, y las nuevas se agregan al final
+                del self._entries[:len(batch)]
+                self._oldest = time.monotonic() if self._entries else None
+                self._rewrite_journal()
+
+            logger.info(f"Logs de conexión registrados: {len(batch)}")
+            return len(batch)
+
+    def flush_due(self) -> int:
+        """
+        Hace flush solo si la entrada más vieja superó max_age.
+
+        Pensado para procesos residentes, donde puede no llegar otro
+        log_connection que dispare el flush.
+
+        Returns:
+            Cantidad de entradas insertadas
+        """
+        with self._lock:
+            due = (
+                self._oldest is not None
+                and time.monotonic() - self._oldest >= self.max_age
+            )
+        return self.flush() if due else 0
+
+    @property
+    def pending(self) -> int:
+        """Cantidad de entradas aún no insertadas"""
+        with self._lock:
+            return len(self._entries)
+
+    def close(self) -> None:
+        """Inserta lo pendiente y cierra el journal"""
+        self.flush()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+
+def _encode(entry: ConnectionLog) -> str:
+    """Serializa una entrada como línea del journal"""
+    return json.dumps({
+        "ip": entry.ip_clock,
+        "available": entry.available,
+        "obs": entry.observation,
+        "ts": entry.timestamp.isoformat(),
+    }) + "\n"
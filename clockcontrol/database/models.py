@@ -3,7 +3,7 @@ Modelos de datos
 """
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import ClassVar, FrozenSet, Optional, Tuple
 
 
 @dataclass
@@ -17,6 +17,32 @@ class Clock:
     name: Optional[str] = None
     location: Optional[str] = None
     
+    # Columnas de rrhh.reloj_biometrico en el orden que espera from_record
+    # (ver GUIA_DESPLIEGUE_PRODUCCION.md, sección de relojes)
+    COLUMNS: ClassVar[Tuple[str, ...]] = ("id_reloj_bio", "ip_reloj", "clave", "puerto")
+    
+    @classmethod
+    def select_columns(cls) -> str:
+        """Lista de columnas para SELECT, en el orden de from_record"""
+        return ", ".join(cls.COLUMNS)
+    
+    @classmethod
+    def from_record(cls, row: tuple) -> "Clock":
+        """
+        Crea instancia desde una fila obtenida con select_columns().
+        
+        A diferencia de from_db_row no depende de la posición de las
+        columnas en la tabla.
+        """
+        clock_id, ip, password, port = row
+        return cls(
+            id=clock_id,
+            ip=ip,
+            port=port if port is not None else 4370,
+            password=str(password) if password is not None else "0",
+            active=True,
+        )
+    
     @classmethod
     def from_db_row(cls, row: tuple) -> "Clock":
         """
@@ -44,3 +70,11 @@ class ConnectionLog:
     available: bool
     observation: str
     timestamp: Optional[datetime] = None
+
+
+@dataclass
+class LeaseAssignment:
+    """Relojes arrendados por un recolector (modo sharding)"""
+    clock_ids: FrozenSet[int]
+    collectors: int
+    share: int
@@ -0,0 +1,98 @@
+"""
+Registro en memoria de relojes activos indexado por IP
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from clockcontrol.database.models import Clock
+from clockcontrol.database.repositories import ClockRepository
+
+logger = logging.getLogger(__name__)
+
+
+class ClockRegistry:
+    """
+    Caché de rrhh.reloj_biometrico con índice por IP y tiempo de vida.
+
+    El modo masivo carga el registro completo una vez por barrido y cada
+    reloj se resuelve desde el índice en memoria, sin una consulta por
+    reloj. El modo individual usa la misma caché mientras no expire.
+
+    Ejemplo de uso:
+        registry = ClockRegistry(clock_repo, ttl=300)
+        clocks = registry.all_active(refresh=True)
+        clock = registry.get("192.168.1.201")
+    """
+
+    def __init__(self, repo: ClockRepository, ttl: float = 300.0):
+        """
+        Args:
+            repo: Repositorio de relojes
+            ttl: Segundos de validez de la caché (0 = consultar siempre)
+        """
+        self.repo = repo
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._clocks: List[Clock] = []
+        self._by_ip: Dict[str, Clock] = {}
+        self._loaded_at: Optional[float] = None
+
+    def _expired(self) -> bool:
+        """Indica si la caché debe recargarse"""
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at >= self.ttl
+        )
+
+    def _load(self) -> None:
+        """Recarga el registro completo desde la base de datos"""
+        clocks = self.repo.get_all_active()
+        self._clocks = clocks
+        self._by_ip = {clock.ip: clock for clock in clocks}
+        self._loaded_at = time.monotonic()
+        logger.debug(f"Registro de relojes cargado: {len(clocks)} activos")
+
+    def all_active(self, refresh: bool = False) -> List[Clock]:
+        """
+        Obtiene todos los relojes activos.
+
+        Args:
+            refresh: Fuerza la recarga aunque la caché no haya expirado
+
+        Returns:
+            Lista de Clock activos
+        """
+        with self._lock:
+            if refresh or self._expired():
+                self._load()
+            return list(self._clocks)
+
+    def get(self, ip: str) -> Optional[Clock]:
+        """
+        Obtiene un reloj activo por IP desde la caché.
+
+        Si la IP no está en la caché vigente se consulta directamente,
+        para no ignorar relojes dados de alta después de la última carga.
+
+        Returns:
+            Clock si existe y está activo, None en caso contrario
+        """
+        with self._lock:
+            if self._expired():
+                self._load()
+            clock = self._by_ip.get(ip)
+        if clock is not None:
+            return clock
+
+        clock = self.repo.get_by_ip(ip)
+        if clock is not None:
+            with self._lock:
+                self._by_ip[ip] = clock
+        return clock
+
+    def invalidate(self) -> None:
+        """Descarta la caché; la próxima consulta recarga el registro"""
+        with self._lock:
+            self._loaded_at = None
@@ -1,16 +1,66 @@
 """
 Repositorios - Patrón Repository para acceso a datos
 """
+import io
 import json
 import logging
-from typing import List, Optional
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
 
+from psycopg2.extras import execute_values
+
+from clockcontrol.core.exceptions import DatabaseError
 from clockcontrol.database.connection import DatabaseConnection
-from clockcontrol.database.models import Clock, ConnectionLog
-from clockcontrol.core.attendance import AttendanceMark
+from clockcontrol.database.models import Clock, ConnectionLog, LeaseAssignment
+from clockcontrol.core.attendance import AttendanceProcessor, Marks
+from clockcontrol.utils import metrics
 
 logger = logging.getLogger(__name__)
 
+# Tabla temporal de staging para la carga por COPY. ON COMMIT DELETE ROWS
+# permite reutilizarla en conexiones del pool sin recrearla.
+_STAGING_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS person_marks_staging (
+        carnet varchar,
+        date_mark varchar,
+        time_mark varchar,
+        ip_clock varchar,
+        id_reloj_bio integer
+    ) ON COMMIT DELETE ROWS
+"""
+
+# Inserción set-based desde staging con la misma deduplicación que
+# rrhh.set_attendance_info_clock (carnet, fecha, hora, reloj). ON CONFLICT
+# sobre ux_person_marks_dedup (sql/migrations/001_person_marks_dedup_index.sql):
+# con NOT EXISTS dos escrituras concurrentes del mismo marcaje chocaban
+# con el índice único y fallaba el lote completo
+_STAGING_INSERT = """
+    INSERT INTO rrhh.person_marks (carnet, date_mark, time_mark, ip_clock, id_reloj_bio)
+    SELECT DISTINCT s.carnet, s.date_mark, s.time_mark, s.ip_clock, s.id_reloj_bio
+    FROM person_marks_staging s
+    ON CONFLICT (date_mark, time_mark, ip_clock, carnet) DO NOTHING
+"""
+
+# Variante de _STAGING_INSERT que devuelve los insertados por reloj
+_STAGING_INSERT_BY_CLOCK = f"""
+    WITH inserted AS ({_STAGING_INSERT}
+        RETURNING id_reloj_bio
+    )
+    SELECT id_reloj_bio, count(*) FROM inserted GROUP BY id_reloj_bio
+"""
+
+_STAGING_COPY = (
+    "COPY person_marks_staging "
+    "(carnet, date_mark, time_mark, ip_clock, id_reloj_bio) "
+    "FROM STDIN WITH (FORMAT csv, "
+    "FORCE_NOT_NULL (carnet, date_mark, time_mark, ip_clock))"
+)
+
+# Mensaje de rrhh.set_attendance_info_clock cuando todos los marcajes ya
+# existían. Usa el mismo código (-100) que sus errores, que en su lugar
+# devuelven el texto del error de PostgreSQL
+_SP_NOTHING_NEW = "NO SE INSERTARON REGISTROS"
+
 
 class ClockRepository:
     """
@@ -36,8 +86,8 @@ class ClockRepository:
             Clock si existe y está activo, None en caso contrario
         """
         with self.db.get_cursor() as cur:
-            query = """
-                SELECT * FROM rrhh.reloj_biometrico
+            query = f"""
+                SELECT {Clock.select_columns()} FROM rrhh.reloj_biometrico
                 WHERE activo = %s AND ip_reloj = %s
             """
             cur.execute(query, (1, ip))
@@ -45,7 +95,7 @@ class ClockRepository:
 
             if row:
                 logger.info(f"Reloj encontrado: {ip}")
-                return Clock.from_db_row(row)
+                return Clock.from_record(row)
 
             logger.warning(f"Reloj no encontrado o inactivo: {ip}")
             return None
@@ -58,11 +108,14 @@ class ClockRepository:
             Lista de Clock activos
         """
         with self.db.get_cursor() as cur:
-            query = "SELECT * FROM rrhh.reloj_biometrico WHERE activo = %s"
+            query = f"""
+                SELECT {Clock.select_columns()} FROM rrhh.reloj_biometrico
+                WHERE activo = %s
+            """
             cur.execute(query, (1,))
             rows = cur.fetchall()
 
-            clocks = [Clock.from_db_row(row) for row in rows]
+            clocks = [Clock.from_record(row) for row in rows]
             logger.info(f"Relojes activos encontrados: {len(clocks)}")
             return clocks
 
@@ -102,6 +155,106 @@ class AttendanceRepository:
             cur.execute(query, (ip, available, observation[:255]))
             logger.debug(f"Log de conexión: {ip} - {'OK' if available else 'FAIL'}")
 
+    def log_connections(self, entries: List[ConnectionLog]) -> int:
+        """
+        Registra varios intentos de conexión en un solo INSERT multi-fila.
+
+        Args:
+            entries: Logs de conexión; si timestamp es None se usa now().
+                Los timestamps con zona horaria se guardan en la hora
+                local del servidor (la de now())
+
+        Returns:
+            Cantidad de registros insertados
+        """
+        if not entries:
+            return 0
+
+        with self.db.get_cursor() as cur:
+            execute_values(
+                cur,
+                "INSERT INTO rrhh.clock_conn (ip_clock, available, obs, date) VALUES %s",
+                [
+                    (e.ip_clock, e.available, e.observation[:255], e.timestamp)
+                    for e in entries
+                ],
+                template="(%s, %s, %s, COALESCE(%s::timestamptz, now()))",
+                page_size=1000,
+            )
+            logger.debug(f"Logs de conexión registrados: {len(entries)}")
+            return len(entries)
+
+    def get_failure_streaks(self, days: int = 7) -> Dict[str, int]:
+        """
+        Cuenta los fallos consecutivos recientes de cada reloj en rrhh.clock_conn.
+
+        Args:
+            days: Días de historial considerados
+
+        Returns:
+            Diccionario IP -> fallos desde el último intento exitoso
+        """
+        with self.db.get_cursor() as cur:
+            query = """
+                SELECT c.ip_clock, count(*)
+                FROM rrhh.clock_conn c
+                LEFT JOIN (
+                    SELECT ip_clock, max(date) AS last_ok
+                    FROM rrhh.clock_conn
+                    WHERE available AND date >= now() - make_interval(days => %s)
+                    GROUP BY ip_clock
+                ) ok ON ok.ip_clock = c.ip_clock
+                WHERE NOT c.available
+                  AND c.date >= now() - make_interval(days => %s)
+                  AND c.date > COALESCE(ok.last_ok, '-infinity')
+                GROUP BY c.ip_clock
+            """
+            cur.execute(query, (days, days))
+            return {ip: int(count) for ip, count in cur.fetchall()}
+
+    def get_hourly_mark_rates(self, days: int = 14) -> Dict[str, List[float]]:
+        """
+        Calcula los marcajes promedio por hora del día de cada reloj.
+
+        Args:
+            days: Días de historial considerados
+
+        Returns:
+            Diccionario IP -> 24 promedios (marcajes por hora, índice = hora)
+        """
+        with self.db.get_cursor() as cur:
+            query = """
+                SELECT ip_clock, left(time_mark, 2)::int AS hour, count(*)
+                FROM rrhh.person_marks
+                WHERE date_mark >= to_char(current_date - %s, 'YYYY-MM-DD')
+                  AND time_mark ~ '^[0-2][0-9]:'
+                GROUP BY ip_clock, hour
+            """
+            cur.execute(query, (days,))
+            rates: Dict[str, List[float]] = {}
+            for ip, hour, count in cur.fetchall():
+                if 0 <= hour < 24:
+                    rates.setdefault(ip, [0.0] * 24)[hour] = count / days
+            return rates
+
+    def has_dedup_index(self) -> bool:
+        """
+        Indica si existe el índice único ux_person_marks_dedup
+        (sql/migrations/001_person_marks_dedup_index.sql), requerido por el
+        ON CONFLICT de la carga por COPY. Un índice creado con CONCURRENTLY
+        que falló queda inválido y no cuenta.
+        """
+        with self.db.get_cursor() as cur:
+            cur.execute("""
+                SELECT i.indisvalid
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = 'rrhh' AND c.relname = 'ux_person_marks_dedup'
+            """)
+            row = cur.fetchone()
+        return bool(row and row[0])
+
     def save_marks(self, clock_id: int, marks_json: str) -> int:
         """
         Guarda marcajes usando el stored procedure.
@@ -111,28 +264,269 @@ class AttendanceRepository:
             marks_json: JSON con los marcajes
 
         Returns:
-            Cantidad de registros insertados
+            Cantidad de registros insertados (0 = ya existían todos)
+
+        Raises:
+            DatabaseError: Si el JSON es inválido o el stored procedure
+                informa un error; los marcajes no se guardaron y no debe
+                avanzar la marca de agua
         """
         try:
             json.loads(marks_json)
         except json.JSONDecodeError as e:
             logger.error(f"JSON de marcajes invalido: {e}")
-            return 0
+            raise DatabaseError(f"JSON de marcajes invalido: {e}") from e
 
         with self.db.get_cursor() as cur:
             cur.callproc("rrhh.set_attendance_info_clock", (clock_id, marks_json))
             result = cur.fetchone()
 
-            if result:
-                cod_respuesta = result[0]
-                mensaje = result[1]
-                inserted = result[2] if len(result) > 2 else 0
+        inserted = _procedure_inserted(result)
+        logger.info(f"Marcajes guardados: {inserted} nuevos")
+        return inserted
+
+    def save_marks_copy(self, marks: Marks) -> int:
+        """
+        Guarda marcajes con COPY a una tabla de staging e INSERT set-based.
+
+        Alternativa a save_marks para lotes grandes: evita serializar y
+        volver a parsear JSON, y la deduplicación se resuelve en un solo
+        INSERT ... SELECT.
+
+        Args:
+            marks: Lista de AttendanceMark o MarkBatch
+
+        Returns:
+            Cantidad de registros insertados
+        """
+        if not marks:
+            return 0
+
+        with metrics.span("serialize"):
+            buffer = AttendanceProcessor.to_csv(marks)
+        metrics.count("bytes", len(buffer.getvalue().encode("utf-8")))
+
+        with self.db.get_cursor() as cur:
+            cur.execute(_STAGING_DDL)
+            cur.copy_expert(_STAGING_COPY, buffer)
+            cur.execute(_STAGING_INSERT)
+            inserted = cur.rowcount
+
+        logger.info(f"Marcajes guardados (COPY): {inserted} nuevos de {len(marks)}")
+        return inserted
+
+    def save_marks_many(self, batches: Sequence[Marks]) -> Dict[int, int]:
+        """
+        Guarda marcajes de varios relojes en una sola transacción.
+
+        Un solo COPY a staging y un solo INSERT set-based para todos los
+        lotes (en lugar de una llamada al stored procedure por reloj).
+
+        Args:
+            batches: Lotes de marcajes (normalmente uno por reloj)
+
+        Returns:
+            Cantidad de registros insertados por id_reloj_bio
+        """
+        batches = [marks for marks in batches if marks]
+        if not batches:
+            return {}
+
+        with metrics.span("serialize"):
+            buffer = io.StringIO()
+            for marks in batches:
+                buffer.write(AttendanceProcessor.to_csv(marks).getvalue())
+            buffer.seek(0)
+        metrics.count("bytes", len(buffer.getvalue().encode("utf-8")))
+
+        with self.db.get_cursor() as cur:
+            cur.execute(_STAGING_DDL)
+            cur.copy_expert(_STAGING_COPY, buffer)
+            cur.execute(_STAGING_INSERT_BY_CLOCK)
+            inserted = {clock_id: count for clock_id, count in cur.fetchall()}
+
+        total = sum(len(marks) for marks in batches)
+        logger.info(
+            f"Marcajes guardados (lote): {sum(inserted.values())} nuevos de "
+            f"{total} en {len(batches)} lotes"
+        )
+        return inserted
+
+    def save_marks_procedure_many(self, batches: Sequence[Tuple[int, str]]) -> List[int]:
+        """
+        Guarda marcajes de varios relojes con el stored procedure en una
+        sola transacción (una llamada por reloj, un solo commit).
+
+        Si el stored procedure informa un error en cualquier reloj se
+        revierte el lote completo.
+
+        Args:
+            batches: (id de reloj, JSON de marcajes) por reloj
+
+        Returns:
+            Insertados por lote, en el mismo orden
+
+        Raises:
+            DatabaseError: Si un JSON es inválido o el stored procedure
+                informa un error; no se guardó ningún reloj del lote
+        """
+        for _, marks_json in batches:
+            try:
+                json.loads(marks_json)
+            except json.JSONDecodeError as e:
+                logger.error(f"JSON de marcajes invalido: {e}")
+                raise DatabaseError(f"JSON de marcajes invalido: {e}") from e
+
+        with self.db.get_cursor() as cur:
+            inserted = []
+            for clock_id, marks_json in batches:
+                cur.callproc("rrhh.set_attendance_info_clock", (clock_id, marks_json))
+                # Dentro del cursor: un error revierte también los relojes anteriores
+                inserted.append(_procedure_inserted(cur.fetchone()))
+
+        logger.info(
+            f"Marcajes guardados (lote): {sum(inserted)} nuevos en {len(batches)} relojes"
+        )
+        return inserted
+
+
+class LeaseRepository:
+    """
+    Repositorio de arriendos de relojes entre recolectores (rrhh.clock_lease
+    y rrhh.collector_heartbeat, ver sql/migrations/002_clock_lease.sql).
+
+    Ejemplo:
+        repo = LeaseRepository(db_connection)
+        assignment = repo.claim_share("collector-a", ttl=180)
+        repo.release("collector-a")
+    """
+
+    def __init__(self, db: DatabaseConnection):
+        self.db = db
+
+    def claim_share(self, collector_id: str, ttl: float) -> LeaseAssignment:
+        """
+        Registra el latido del recolector y ajusta sus arriendos a su parte
+        de la flota, en una sola transacción.
+
+        La parte es ceil(relojes activos / recolectores vivos). Se renuevan
+        los arriendos propios; si sobran (llegó otro recolector) se liberan
+        los excedentes y si faltan se toman relojes libres o con el
+        arriendo vencido (de un recolector caído).
+
+        Args:
+            collector_id: Identificador estable del recolector
+            ttl: Segundos de validez de latidos y arriendos
 
-                if cod_respuesta < 0:
-                    logger.error(f"Error en SP [{cod_respuesta}]: {mensaje}")
-                else:
-                    logger.info(f"Marcajes guardados: {inserted} nuevos")
+        Returns:
+            Relojes arrendados por el recolector
+        """
+        with self.db.get_cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO rrhh.collector_heartbeat (collector_id) VALUES (%s)
+                ON CONFLICT (collector_id) DO UPDATE SET last_seen = now()
+                """,
+                (collector_id,),
+            )
+            # Latidos de recolectores dados de baja hace tiempo
+            cur.execute(
+                "DELETE FROM rrhh.collector_heartbeat "
+                "WHERE last_seen < now() - make_interval(secs => %s)",
+                (ttl * 10,),
+            )
+            cur.execute(
+                "SELECT count(*) FROM rrhh.collector_heartbeat "
+                "WHERE last_seen > now() - make_interval(secs => %s)",
+                (ttl,),
+            )
+            collectors = max(cur.fetchone()[0], 1)
+            cur.execute(
+                "SELECT count(*) FROM rrhh.reloj_biometrico WHERE activo = %s", (1,)
+            )
+            share = math.ceil(cur.fetchone()[0] / collectors)
+
+            # Renovar los propios (solo relojes que siguen activos)
+            cur.execute(
+                """
+                UPDATE rrhh.clock_lease l
+                SET lease_expires = now() + make_interval(secs => %s)
+                FROM rrhh.reloj_biometrico r
+                WHERE l.collector_id = %s AND r.id_reloj_bio = l.id_reloj_bio AND r.activo = %s
+                RETURNING l.id_reloj_bio
+                """,
+                (ttl, collector_id, 1),
+            )
+            owned = sorted(row[0] for row in cur.fetchall())
+
+            if len(owned) > share:
+                excess = owned[share:]
+                cur.execute(
+                    "DELETE FROM rrhh.clock_lease "
+                    "WHERE collector_id = %s AND id_reloj_bio = ANY(%s)",
+                    (collector_id, excess),
+                )
+                owned = owned[:share]
+                logger.info(f"Arriendos liberados para otros recolectores: {len(excess)}")
+            elif len(owned) < share:
+                # El orden por hash del recolector reparte las preferencias:
+                # dos recolectores que arrancan juntos no compiten por los mismos
+                cur.execute(
+                    """
+                    INSERT INTO rrhh.clock_lease (id_reloj_bio, collector_id, lease_expires)
+                    SELECT r.id_reloj_bio, %s, now() + make_interval(secs => %s)
+                    FROM rrhh.reloj_biometrico r
+                    LEFT JOIN rrhh.clock_lease l ON l.id_reloj_bio = r.id_reloj_bio
+                    WHERE r.activo = %s
+                      AND (l.id_reloj_bio IS NULL OR l.lease_expires < now())
+                    ORDER BY md5(r.id_reloj_bio::text || %s)
+                    LIMIT %s
+                    ON CONFLICT (id_reloj_bio) DO UPDATE
+                    SET collector_id = EXCLUDED.collector_id,
+                        acquired_at = now(),
+                        lease_expires = EXCLUDED.lease_expires
+                    WHERE rrhh.clock_lease.lease_expires < now()
+                    RETURNING id_reloj_bio
+                    """,
+                    (collector_id, ttl, 1, collector_id, share - len(owned)),
+                )
+                owned += [row[0] for row in cur.fetchall()]
+
+        return LeaseAssignment(frozenset(owned), collectors, share)
+
+    def release(self, collector_id: str) -> None:
+        """Libera todos los arriendos y el latido del recolector (detención normal)"""
+        with self.db.get_cursor() as cur:
+            cur.execute("DELETE FROM rrhh.clock_lease WHERE collector_id = %s", (collector_id,))
+            released = cur.rowcount
+            cur.execute(
+                "DELETE FROM rrhh.collector_heartbeat WHERE collector_id = %s", (collector_id,)
+            )
+        logger.info(f"Arriendos liberados: {released}")
+
+
+def _procedure_inserted(result: Optional[Sequence]) -> int:
+    """
+    Insertados según la respuesta (codRespuesta, mensaje, cantidadInsertados)
+    de rrhh.set_attendance_info_clock.
+
+    codRespuesta -100 con _SP_NOTHING_NEW no es un error: todos los
+    marcajes ya estaban guardados (p. ej. un reenvío tras una
+    resincronización) y el guardado queda confirmado con 0 nuevos.
+
+    Raises:
+        DatabaseError: Si no hay respuesta o el stored procedure informa un error
+    """
+    if not result:
+        raise DatabaseError("El stored procedure no devolvió resultado")
 
-                return inserted
+    cod_respuesta = result[0]
+    mensaje = result[1]
+    inserted = result[2] if len(result) > 2 else 0
 
+    if cod_respuesta < 0:
+        if not inserted and str(mensaje).strip() == _SP_NOTHING_NEW:
             return 0
+        logger.error(f"Error en SP [{cod_respuesta}]: {mensaje}")
+        raise DatabaseError(f"Error en SP [{cod_respuesta}]: {mensaje}")
+    return inserted
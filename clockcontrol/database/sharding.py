@@ -0,0 +1,121 @@
+"""
+Reparto de la flota de relojes entre varios recolectores
+"""
+import logging
+import socket
+import threading
+import time
+from typing import FrozenSet, List, Optional
+
+from clockcontrol.core.exceptions import ClockControlError
+from clockcontrol.database.models import Clock
+from clockcontrol.database.repositories import LeaseRepository
+
+logger = logging.getLogger(__name__)
+
+
+def default_collector_id() -> str:
+    """Identificador del recolector si no se configura collector_id: el hostname"""
+    return socket.gethostname()
+
+
+class ShardCoordinator:
+    """
+    Relojes que le tocan a este recolector cuando varias instancias
+    comparten la flota (opción sharding).
+
+    Cada llamada a assign renueva el latido y los arriendos en
+    rrhh.clock_lease y filtra la lista de relojes activos a los propios.
+    Un recolector nuevo recibe su parte cuando los demás liberan el
+    excedente en su siguiente barrido; los relojes de un recolector caído
+    se redistribuyen cuando vencen sus arriendos (lease_ttl).
+
+    Ejemplo de uso:
+        shard = ShardCoordinator(LeaseRepository(db), "collector-a", lease_ttl=180)
+        clocks = shard.assign(registry.all_active(refresh=True))
+        ...
+        shard.release()
+    """
+
+    def __init__(
+        self,
+        repo: LeaseRepository,
+        collector_id: Optional[str] = None,
+        lease_ttl: float = 180.0,
+    ):
+        """
+        Args:
+            repo: Repositorio de arriendos
+            collector_id: Identificador estable del recolector (default: hostname)
+            lease_ttl: Segundos de validez de los arriendos; debe superar el
+                intervalo entre barridos más la duración de un barrido
+        """
+        self.repo = repo
+        self.collector_id = collector_id or default_collector_id()
+        self.lease_ttl = lease_ttl
+        self._lock = threading.Lock()
+        self._owned: FrozenSet[int] = frozenset()
+        self._renewed_at: Optional[float] = None
+
+    @property
+    def renew_interval(self) -> float:
+        """Segundos entre renovaciones en los modos residentes (un tercio del arriendo)"""
+        return self.lease_ttl / 3
+
+    def assign(self, clocks: List[Clock]) -> List[Clock]:
+        """
+        Renueva los arriendos y devuelve los relojes de este recolector.
+
+        Si la base de datos no responde se mantienen los relojes propios
+        mientras sus arriendos no hayan vencido; después no se procesa
+        ninguno (otro recolector puede haberlos tomado).
+
+        Args:
+            clocks: Relojes activos (registro completo)
+
+        Returns:
+            Relojes arrendados, en el mismo orden
+        """
+        with self._lock:
+            try:
+                assignment = self.repo.claim_share(self.collector_id, self.lease_ttl)
+            except ClockControlError as e:
+                expired = (
+                    self._renewed_at is None
+                    or time.monotonic() - self._renewed_at >= self.lease_ttl
+                )
+                if expired:
+                    self._owned = frozenset()
+                logger.error(
+                    f"No se pudieron renovar los arriendos de {self.collector_id}: {e} "
+                    f"({len(self._owned)} relojes conservados)"
+                )
+            else:
+                if assignment.clock_ids != self._owned:
+                    logger.info(
+                        f"Recolector {self.collector_id}: {len(assignment.clock_ids)} "
+                        f"relojes de {len(clocks)} ({assignment.collectors} recolectores, "
+                        f"parte {assignment.share})"
+                    )
+                self._owned = assignment.clock_ids
+                self._renewed_at = time.monotonic()
+            owned = self._owned
+        return [clock for clock in clocks if clock.id in owned]
+
+    def owns(self, clock_id: int) -> bool:
+        """Indica si el reloj está arrendado por este recolector"""
+        return clock_id in self._owned
+
+    def release(self) -> None:
+        """
+        Libera los arriendos y el latido para que los demás recolectores
+        tomen los relojes sin esperar el vencimiento (detención normal de
+        serve y stream; el modo all los conserva entre ejecuciones).
+        """
+        with self._lock:
+            try:
+                self.repo.release(self.collector_id)
+            except ClockControlError as e:
+                logger.warning(f"No se pudieron liberar los arriendos: {e}")
+            self._owned = frozenset()
+            self._renewed_at = None
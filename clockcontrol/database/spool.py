@@ -0,0 +1,289 @@
+"""
+Spool local durable de marcajes (SQLite en modo WAL)
+"""
+import logging
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from clockcontrol.core.attendance import MarkBatch, Marks
+from clockcontrol.core.exceptions import ClockControlError, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# Guarda lotes de varios relojes: [(id de reloj, lote)] -> insertados por lote
+SaveMany = Callable[[List[Tuple[int, MarkBatch]]], List[int]]
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS spool (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_reloj_bio INTEGER NOT NULL,
+        ip_clock TEXT NOT NULL,
+        carnet TEXT NOT NULL,
+        date_mark TEXT NOT NULL,
+        time_mark TEXT NOT NULL
+    )
+"""
+
+
+class MarkSpool:
+    """
+    Cola persistente de marcajes pendientes de guardar en PostgreSQL.
+
+    Los marcajes descargados se escriben primero aquí (una transacción
+    SQLite por lectura de reloj, con synchronous=FULL) y recién se
+    eliminan cuando la base de datos confirma el guardado. Así la marca
+    de agua del reloj puede avanzar aunque PostgreSQL esté caído o lento.
+
+    Ejemplo de uso:
+        spool = MarkSpool("state/marks.spool")
+        spool.append(marks)
+        saved = spool.drain(app.save_marks_many)
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Args:
+            path: Archivo SQLite del spool (se crea si no existe)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(_SCHEMA)
+
+        pending = self.pending
+        if pending:
+            logger.info(f"Spool con {pending} marcajes pendientes de una ejecución anterior")
+
+    @property
+    def pending(self) -> int:
+        """Marcajes aún no guardados en la base de datos"""
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM spool").fetchone()[0]
+
+    def append(self, marks: Marks) -> int:
+        """
+        Guarda marcajes en el spool de forma durable.
+
+        Returns:
+            Cantidad de marcajes agregados
+        """
+        rows = [
+            (m.id_reloj_bio, m.ip_clock, m.carnet, m.date_mark, m.time_mark)
+            for m in marks
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO spool (id_reloj_bio, ip_clock, carnet, date_mark, time_mark) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        logger.debug(f"Spool: {len(rows)} marcajes agregados")
+        return len(rows)
+
+    def _read(self, limit: int) -> Tuple[Dict[int, MarkBatch], Dict[int, List[int]]]:
+        """Lee los marcajes más antiguos agrupados por reloj (con sus ids)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, id_reloj_bio, ip_clock, carnet, date_mark, time_mark "
+                "FROM spool ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+        batches: Dict[int, MarkBatch] = {}
+        ids: Dict[int, List[int]] = {}
+        for row_id, clock_id, ip_clock, carnet, date_mark, time_mark in rows:
+            batch = batches.get(clock_id)
+            if batch is None:
+                batch = batches[clock_id] = MarkBatch(ip_clock, clock_id)
+                ids[clock_id] = []
+            batch.append(carnet, date_mark, time_mark)
+            ids[clock_id].append(row_id)
+        return batches, ids
+
+    def _delete(self, ids: List[int]) -> None:
+        """Elimina del spool los marcajes ya guardados"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("DELETE FROM spool WHERE id = ?", [(i,) for i in ids])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def drain(self, save: SaveMany, limit: int = 5000) -> Dict[str, int]:
+        """
+        Envía a la base de datos un lote de los marcajes más antiguos.
+
+        Los marcajes de todos los relojes leídos se guardan en una sola
+        llamada y se eliminan del spool solo si esta confirma: save debe
+        lanzar ClockControlError ante cualquier error, incluido el que
+        informa el stored procedure (AttendanceRepository.save_marks). Tras
+        un error se reenvía el lote completo; la base de datos descarta los
+        marcajes ya guardados. Un lote que ya estaba guardado (p. ej. si el
+        proceso terminó entre la confirmación y el borrado) se confirma con
+        0 insertados y se elimina: no bloquea a los siguientes.
+
+        Args:
+            save: Guarda los lotes de varios relojes y devuelve los insertados
+            limit: Marcajes leídos como máximo
+
+        Returns:
+            Insertados por IP de reloj
+
+        Raises:
+            ClockControlError: Si la base de datos rechaza un lote
+        """
+        with self._drain_lock:
+            batches, ids = self._read(limit)
+            if not batches:
+                return {}
+            inserted = save(list(batches.items()))
+            if len(inserted) != len(batches):
+                raise DatabaseError(
+                    f"Guardado sin confirmar: {len(inserted)} resultados para "
+                    f"{len(batches)} relojes"
+                )
+            self._delete([row_id for clock_ids in ids.values() for row_id in clock_ids])
+            saved: Dict[str, int] = {}
+            for batch, count in zip(batches.values(), inserted):
+                saved[batch.ip_clock] = saved.get(batch.ip_clock, 0) + count
+            return saved
+
+    def close(self) -> None:
+        """Cierra el archivo del spool"""
+        with self._lock:
+            self._conn.close()
+
+
+class SpoolDrainer:
+    """
+    Hilo de fondo que vacía el spool cuando la base de datos responde.
+
+    Tras un error espera con backoff exponencial (hasta max_backoff) sin
+    afectar a la descarga de los relojes, que solo escribe en el spool.
+    """
+
+    def __init__(
+        self,
+        spool: MarkSpool,
+        save: SaveMany,
+        batch_size: int = 5000,
+        interval: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        """
+        Args:
+            spool: Spool a vaciar
+            save: Guarda los lotes de varios relojes y devuelve los insertados
+            batch_size: Marcajes enviados por vuelta
+            interval: Espera entre vueltas con el spool vacío
+            max_backoff: Espera máxima tras errores consecutivos
+        """
+        self.spool = spool
+        self.save = save
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+
+        self._saved: Counter = Counter()
+        self._saved_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def drain_once(self) -> bool:
+        """
+        Envía un lote.
+
+        Returns:
+            True si quedan marcajes y conviene seguir de inmediato
+        """
+        saved = self.spool.drain(self.save, self.batch_size)
+        if saved:
+            with self._saved_lock:
+                self._saved.update(saved)
+            logger.info(f"Spool: {sum(saved.values())} marcajes insertados desde {len(saved)} relojes")
+        return self.spool.pending > 0
+
+    def flush(self, timeout: float = 60.0) -> bool:
+        """
+        Vacía el spool en el hilo actual.
+
+        Returns:
+            True si el spool quedó vacío
+        """
+        deadline = time.monotonic() + timeout
+        try:
+            while self.drain_once():
+                if time.monotonic() >= deadline:
+                    return False
+        except ClockControlError as e:
+            logger.error(f"Spool: no se pudo vaciar, se reintentará: {e}")
+            return False
+        return True
+
+    def take_saved(self) -> Dict[str, int]:
+        """Devuelve y reinicia los insertados por IP desde la última llamada"""
+        with self._saved_lock:
+            saved, self._saved = dict(self._saved), Counter()
+        return saved
+
+    def wake(self) -> None:
+        """Avisa que hay marcajes nuevos en el spool"""
+        self._wake.set()
+
+    def _run(self) -> None:
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                more = self.drain_once()
+                failures = 0
+            except ClockControlError as e:
+                failures += 1
+                wait = min(self.interval * 2 ** min(failures, 30), self.max_backoff)
+                logger.error(f"Spool: error guardando marcajes, reintento en {wait:.0f}s: {e}")
+                self._stop.wait(wait)
+                continue
+            except Exception:
+                logger.exception("Spool: error inesperado")
+                more = False
+            if not more:
+                self._wake.wait(self.interval)
+                self._wake.clear()
+
+    def start(self) -> None:
+        """Inicia el hilo de vaciado"""
+        self._thread = threading.Thread(
+            target=self._run, name="clockcontrol-spool", daemon=True
+        )
+        self._thread.start()
+
+    def close(self, timeout: float = 30.0) -> None:
+        """Detiene el hilo e intenta vaciar lo pendiente"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        if not self.flush(timeout):
+            logger.warning(
+                f"Spool: {self.spool.pending} marcajes quedan pendientes para la próxima ejecución"
+            )
@@ -0,0 +1,146 @@
+"""
+Ejecución concurrente acotada con tiempo límite por tarea
+"""
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Espera máxima entre revisiones de tiempo límite cuando no hay
+# ninguna tarea en ejecución todavía
+_IDLE_WAIT = 0.5
+
+
+class CancelToken:
+    """
+    Aviso de cancelación para una tarea abandonada por tiempo límite.
+
+    run_bounded no puede detener un hilo en ejecución: la tarea debe
+    consultar cancelled antes de cada efecto visible (logs, guardado,
+    estado) y terminar sin hacer nada si fue cancelada.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        """Marca la tarea como abandonada"""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Indica si la tarea fue abandonada"""
+        return self._event.is_set()
+
+
+def run_bounded(
+    func: Callable[[T], R],
+    items: Sequence[T],
+    max_workers: int,
+    deadline: Optional[float] = None,
+    on_timeout: Optional[Callable[[T], R]] = None,
+    thread_name_prefix: str = "clockcontrol",
+) -> List[R]:
+    """
+    Ejecuta func sobre cada elemento con concurrencia acotada.
+
+    El tiempo límite se cuenta desde que cada tarea empieza a ejecutarse
+    (no desde que se encola). Las tareas que lo exceden se abandonan: su
+    resultado se reemplaza por on_timeout(item) y el hilo sigue hasta que
+    la operación bloqueante termine por su propio timeout. Para que el
+    hilo abandonado no produzca efectos tardíos, on_timeout debe
+    cancelar el CancelToken que consulta la tarea.
+
+    Args:
+        func: Función a ejecutar por elemento
+        items: Elementos a procesar
+        max_workers: Número máximo de hilos simultáneos
+        deadline: Segundos máximos por tarea (None = sin límite)
+        on_timeout: Genera el resultado para una tarea que excedió el límite
+        thread_name_prefix: Prefijo para el nombre de los hilos
+
+    Returns:
+        Lista de resultados en el mismo orden que items
+    """
+    if not items:
+        return []
+
+    results: List[Optional[R]] = [None] * len(items)
+    started: Dict[int, float] = {}
+    lock = threading.Lock()
+
+    def task(index: int, item: T) -> R:
+        with lock:
+            started[index] = time.monotonic()
+        return func(item)
+
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(max_workers, len(items))),
+        thread_name_prefix=thread_name_prefix,
+    )
+    futures: Dict[Future, int] = {
+        executor.submit(task, index, item): index
+        for index, item in enumerate(items)
+    }
+    pending = set(futures)
+
+    try:
+        while pending:
+            done, pending = wait(
+                pending,
+                timeout=_next_wait(pending, futures, started, lock, deadline),
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                results[futures[future]] = future.result()
+
+            if deadline is None:
+                continue
+
+            now = time.monotonic()
+            for future in list(pending):
+                index = futures[future]
+                with lock:
+                    start = started.get(index)
+                if start is None or now - start < deadline:
+                    continue
+
+                logger.warning(
+                    f"Tarea {index + 1}/{len(items)} excedió el tiempo límite "
+                    f"de {deadline:.0f}s"
+                )
+                pending.discard(future)
+                future.cancel()
+                if on_timeout is None:
+                    raise TimeoutError(f"Tiempo límite excedido ({deadline:.0f}s)")
+                results[index] = on_timeout(items[index])
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results  # type: ignore[return-value]
+
+
+def _next_wait(
+    pending: set,
+    futures: Dict[Future, int],
+    started: Dict[int, float],
+    lock: threading.Lock,
+    deadline: Optional[float],
+) -> Optional[float]:
+    """Calcula cuánto esperar hasta el próximo vencimiento de tiempo límite"""
+    if deadline is None:
+        return None
+
+    with lock:
+        starts = [started[futures[f]] for f in pending if futures[f] in started]
+    if not starts:
+        return _IDLE_WAIT
+
+    remaining = min(starts) + deadline - time.monotonic()
+    return max(0.0, min(remaining, _IDLE_WAIT * 2))
@@ -0,0 +1,43 @@
+"""
+Exportación diferida de nombres públicos de un paquete (PEP 562)
+"""
+import importlib
+
+# Este módulo se importa al cargar el paquete: evita importar typing
+# (equivale a typing.TYPE_CHECKING, mypy lo reconoce)
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Callable, Dict, List, Tuple
+
+
+def lazy_exports(
+    package: str,
+    namespace: "Dict[str, Any]",
+    exports: "Dict[str, str]",
+) -> "Tuple[Callable[[str], Any], Callable[[], List[str]]]":
+    """
+    Crea __getattr__ y __dir__ para un __init__.py que reexporta nombres
+    de sus módulos sin importarlos hasta el primer uso.
+
+    Args:
+        package: __name__ del paquete
+        namespace: globals() del paquete (cachea cada nombre resuelto)
+        exports: Nombre público -> módulo que lo define
+
+    Ejemplo de uso (en un __init__.py):
+        __getattr__, __dir__ = lazy_exports(__name__, globals(), {
+            "Settings": "clockcontrol.config.settings",
+        })
+    """
+    def __getattr__(name: str) -> "Any":
+        module_name = exports.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module_name), name)
+        namespace[name] = value
+        return value
+
+    def __dir__() -> "List[str]":
+        return sorted(set(namespace) | set(exports))
+
+    return __getattr__, __dir__
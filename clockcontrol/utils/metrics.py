@@ -0,0 +1,319 @@
+"""
+Tiempos por etapa y métricas de los barridos (Prometheus y reporte JSON)
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Generator, List, Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+# Etapas del procesamiento de un reloj, en orden
+STAGES = (
+    "registry",   # búsqueda del reloj en el registro
+    "probe",      # sondeo de accesibilidad
+    "connect",    # conexión (o sesión) con el reloj
+    "download",   # lectura de info, cantidad de registros y log
+    "parse",      # selección por marca de agua y procesamiento
+    "serialize",  # JSON o CSV para la base de datos
+    "save",       # escritura en PostgreSQL
+    "spool",      # escritura en el spool local
+    "logs",       # logs de conexión (rrhh.clock_conn)
+)
+
+_active = threading.local()
+
+
+@dataclass
+class Spans:
+    """Segundos por etapa y contadores (registros, bytes) de un reloj o un barrido"""
+    seconds: Dict[str, float] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def count(self, name: str, value: int) -> None:
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def merge(self, other: "Spans", share: float = 1.0) -> None:
+        """Suma otra medición; share reparte una escritura agrupada entre relojes"""
+        for stage, seconds in other.seconds.items():
+            self.add(stage, seconds * share)
+        for name, value in other.counts.items():
+            self.count(name, round(value * share))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "seconds": {stage: round(s, 6) for stage, s in self.seconds.items()},
+            "counts": dict(self.counts),
+        }
+
+
+@contextmanager
+def recording(spans: Spans) -> Generator[Spans, None, None]:
+    """
+    Registra en spans las etapas medidas por el hilo actual (span y count)
+    dentro del bloque. Se puede anidar: al salir vuelve la medición anterior.
+    """
+    previous = getattr(_active, "spans", None)
+    _active.spans = spans
+    try:
+        yield spans
+    finally:
+        _active.spans = previous
+
+
+@contextmanager
+def span(stage: str) -> Generator[None, None, None]:
+    """
+    Mide la duración de una etapa en la medición activa del hilo.
+
+    Las etapas anidadas se descuentan de la que las contiene (se registra
+    el tiempo propio), así la suma de etapas no cuenta dos veces el mismo
+    intervalo. Sin medición activa no registra nada.
+    """
+    spans = getattr(_active, "spans", None)
+    if spans is None:
+        yield
+        return
+    stack = _active.__dict__.setdefault("stack", [])
+    # Tiempo de las etapas hijas, que se descuenta al cerrar
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        children = stack.pop()
+        spans.add(stage, elapsed - children)
+        if stack:
+            stack[-1] += elapsed
+
+
+def count(name: str, value: int) -> None:
+    """Suma value al contador name de la medición activa del hilo"""
+    spans = getattr(_active, "spans", None)
+    if spans is not None:
+        spans.count(name, value)
+
+
+def _write_atomic(path: Union[str, Path], text: str) -> None:
+    """Escribe un archivo completo con archivo temporal + os.replace"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@dataclass
+class SweepReport:
+    """
+    Reporte de un barrido: tiempo real (wall time), etapas globales del
+    barrido (registro, sondeo de la flota, logs) y resultado de cada reloj.
+    """
+    results: Sequence[Any]
+    wall_time: float
+    spans: Spans = field(default_factory=Spans)
+    started_at: float = field(default_factory=time.time)
+
+    def stage_totals(self) -> Dict[str, float]:
+        """Segundos por etapa sumando barrido y relojes (tiempo de CPU/espera, no real)"""
+        totals = Spans()
+        totals.merge(self.spans)
+        for result in self.results:
+            totals.merge(result.spans)
+        return {stage: totals.seconds[stage] for stage in _ordered(totals.seconds)}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "started_at": self.started_at,
+            "wall_time": round(self.wall_time, 6),
+            "clocks": len(self.results),
+            "successful": sum(1 for r in self.results if r.success),
+            "marks_processed": sum(r.marks_processed for r in self.results),
+            "marks_saved": sum(r.marks_saved for r in self.results),
+            "stage_totals": {s: round(v, 6) for s, v in self.stage_totals().items()},
+            "sweep": self.spans.to_dict(),
+            "results": [
+                {
+                    "clock_ip": r.clock_ip,
+                    "success": r.success,
+                    "marks_processed": r.marks_processed,
+                    "marks_saved": r.marks_saved,
+                    "elapsed_time": round(r.elapsed_time, 6),
+                    "error": r.error,
+                    **r.spans.to_dict(),
+                }
+                for r in self.results
+            ],
+        }
+
+    def write_json(self, path: Union[str, Path]) -> None:
+        """Guarda el reporte en JSON (reemplazo atómico)"""
+        _write_atomic(path, json.dumps(self.to_dict(), indent=2, ensure_ascii=False))
+
+
+def _ordered(stages: Dict[str, Any]) -> List[str]:
+    """Etapas conocidas en orden de STAGES y luego las demás"""
+    return [s for s in STAGES if s in stages] + sorted(s for s in stages if s not in STAGES)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class CollectorMetrics:
+    """
+    Acumula los resultados de los relojes y los barridos del proceso y los
+    exporta en el formato de texto de Prometheus.
+
+    En modo all (un proceso por barrido) los contadores corresponden al
+    último barrido; en modo serve acumulan desde el arranque.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clocks = {"ok": 0, "error": 0}
+        self._marks = {"processed": 0, "saved": 0}
+        self._totals = Spans()
+        self._last: Dict[str, Any] = {}
+        self._sweeps = 0
+        self._last_sweep: Optional[SweepReport] = None
+
+    def observe(self, result: Any) -> None:
+        """Registra el resultado de un reloj"""
+        with self._lock:
+            self._clocks["ok" if result.success else "error"] += 1
+            self._marks["processed"] += result.marks_processed
+            self._marks["saved"] += result.marks_saved
+            self._totals.merge(result.spans)
+            self._last[result.clock_ip] = result
+
+    def observe_sweep(self, report: SweepReport) -> None:
+        """Registra un barrido completo (sus relojes y sus etapas globales)"""
+        for result in report.results:
+            self.observe(result)
+        with self._lock:
+            self._totals.merge(report.spans)
+            self._sweeps += 1
+            self._last_sweep = report
+
+    def render(self) -> str:
+        """Métricas en formato de exposición de texto de Prometheus"""
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[tuple]) -> None:
+            lines.append(f"# HELP clockcontrol_{name} {help_text}")
+            lines.append(f"# TYPE clockcontrol_{name} {kind}")
+            for labels, value in samples:
+                text = ",".join(f'{k}="{_label(str(v))}"' for k, v in labels.items())
+                lines.append(f"clockcontrol_{name}{{{text}}} {value}" if text
+                             else f"clockcontrol_{name} {value}")
+
+        with self._lock:
+            metric("clocks_processed_total", "counter", "Relojes procesados por resultado",
+                   [({"status": s}, v) for s, v in self._clocks.items()])
+            metric("marks_total", "counter", "Marcajes procesados y guardados",
+                   [({"kind": k}, v) for k, v in self._marks.items()])
+            metric("stage_seconds_total", "counter",
+                   "Segundos por etapa (suma de todos los relojes y barridos)",
+                   [({"stage": s}, f"{self._totals.seconds[s]:.6f}")
+                    for s in _ordered(self._totals.seconds)])
+            metric("records_downloaded_total", "counter", "Registros descargados de los relojes",
+                   [({}, self._totals.counts.get("records", 0))])
+            metric("payload_bytes_total", "counter", "Bytes serializados hacia la base de datos",
+                   [({}, self._totals.counts.get("bytes", 0))])
+
+            clocks = sorted(self._last.items())
+            metric("clock_success", "gauge", "Resultado del último procesamiento de cada reloj",
+                   [({"clock": ip}, int(r.success)) for ip, r in clocks])
+            metric("clock_duration_seconds", "gauge", "Duración del último procesamiento de cada reloj",
+                   [({"clock": ip}, f"{r.elapsed_time:.6f}") for ip, r in clocks])
+            metric("clock_stage_seconds", "gauge", "Segundos por etapa del último procesamiento de cada reloj",
+                   [({"clock": ip, "stage": s}, f"{r.spans.seconds[s]:.6f}")
+                    for ip, r in clocks for s in _ordered(r.spans.seconds)])
+
+            metric("sweeps_total", "counter", "Barridos completos", [({}, self._sweeps)])
+            if self._last_sweep is not None:
+                metric("sweep_duration_seconds", "gauge", "Tiempo real del último barrido",
+                       [({}, f"{self._last_sweep.wall_time:.6f}")])
+                metric("sweep_timestamp_seconds", "gauge", "Inicio del último barrido (epoch)",
+                       [({}, f"{self._last_sweep.started_at:.3f}")])
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Union[str, Path]) -> None:
+        """
+        Escribe las métricas para el textfile collector de node_exporter
+        (reemplazo atómico: nunca se lee un archivo a medio escribir).
+        """
+        _write_atomic(path, self.render())
+
+
+class MetricsServer:
+    """
+    Endpoint HTTP /metrics en un hilo de fondo (modo serve).
+
+    Ejemplo de uso:
+        server = MetricsServer(metrics, port=9469)
+        server.start()
+        ...
+        server.close()
+    """
+
+    def __init__(self, metrics: CollectorMetrics, host: str = "127.0.0.1", port: int = 9469):
+        # Solo el modo serve lo usa: no se carga en el arranque del CLI
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        registry = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug(f"/metrics {self.address_string()}: {format % args}")
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="clockcontrol-metrics", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Métricas en http://{self._server.server_address[0]}:{self.port}/metrics")
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
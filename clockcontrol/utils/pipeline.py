@@ -0,0 +1,203 @@
+"""
+Pipeline por etapas (descarga, procesamiento, guardado) con colas acotadas
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Generic, List, Optional, Sequence, TypeVar
+
+from clockcontrol.utils.concurrency import run_bounded
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+F = TypeVar("F")
+P = TypeVar("P")
+
+_DONE = object()
+
+
+class StagedPipeline(Generic[T, F, P]):
+    """
+    Ejecuta fetch -> parse -> persist en hilos separados unidos por colas
+    acotadas.
+
+    - fetch: max_workers hilos con tiempo límite por elemento (E/S con
+      los relojes). Si la cola de parse está llena, fetch espera
+      (backpressure) en lugar de acumular descargas en memoria.
+    - parse: parse_workers hilos (CPU).
+    - persist: un solo hilo que junta lo disponible en la cola, hasta
+      merge_size unidades según size(), y lo guarda en una sola llamada.
+      Con linger espera hasta esos segundos a que llegue más antes de
+      guardar un grupo incompleto (None = hasta que terminen las etapas
+      anteriores).
+
+    fetch y parse devuelven None cuando el elemento no continúa a la
+    siguiente etapa. Las funciones de cada etapa son responsables de
+    registrar sus propios errores.
+
+    Ejemplo de uso:
+        pipeline = StagedPipeline(fetch, parse, persist, max_workers=8)
+        pipeline.run(clocks)
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[T], Optional[F]],
+        parse: Callable[[F], Optional[P]],
+        persist: Callable[[List[P]], None],
+        max_workers: int = 8,
+        parse_workers: int = 1,
+        queue_size: int = 32,
+        merge_size: int = 5000,
+        size: Callable[[P], int] = lambda item: 1,
+        linger: Optional[float] = 0.0,
+        deadline: Optional[float] = None,
+        on_timeout: Optional[Callable[[T], None]] = None,
+    ):
+        """
+        Args:
+            fetch: Etapa de descarga
+            parse: Etapa de procesamiento
+            persist: Guarda un grupo de elementos procesados
+            max_workers: Hilos de descarga
+            parse_workers: Hilos de procesamiento
+            queue_size: Capacidad de cada cola entre etapas
+            merge_size: Unidades máximas por llamada a persist
+            size: Unidades de un elemento procesado (p. ej. marcajes)
+            linger: Espera máxima por más elementos antes de guardar un grupo
+            deadline: Segundos máximos de descarga por elemento
+            on_timeout: Se invoca para cada elemento que excede el límite
+        """
+        self.fetch = fetch
+        self.parse = parse
+        self.persist = persist
+        self.max_workers = max_workers
+        self.parse_workers = max(1, parse_workers)
+        self.queue_size = queue_size
+        self.merge_size = merge_size
+        self.size = size
+        self.linger = linger
+        self.deadline = deadline
+        self.on_timeout = on_timeout
+
+    def _parse_loop(self, parse_q: "queue.Queue", persist_q: "queue.Queue") -> None:
+        while True:
+            item = parse_q.get()
+            if item is _DONE:
+                return
+            try:
+                out = self.parse(item)
+            except Exception:
+                logger.exception("Error no controlado en etapa parse")
+                continue
+            if out is not None:
+                persist_q.put(out)
+
+    def _persist_loop(self, persist_q: "queue.Queue") -> None:
+        done = False
+        while not done:
+            item = persist_q.get()
+            if item is _DONE:
+                return
+            group, units = [item], self.size(item)
+            until = None if self.linger is None else time.monotonic() + self.linger
+            # Junta lo que llegue dentro de linger (sin linger, lo ya encolado)
+            while units < self.merge_size:
+                try:
+                    if until is None:
+                        item = persist_q.get()
+                    else:
+                        remaining = until - time.monotonic()
+                        if remaining > 0:
+                            item = persist_q.get(timeout=remaining)
+                        else:
+                            item = persist_q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    done = True
+                    break
+                group.append(item)
+                units += self.size(item)
+            try:
+                self.persist(group)
+            except Exception:
+                logger.exception("Error no controlado en etapa persist")
+
+    def run(self, items: Sequence[T]) -> None:
+        """Procesa todos los elementos; retorna cuando las tres etapas terminan"""
+        parse_q: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        persist_q: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+
+        parsers = [
+            threading.Thread(
+                target=self._parse_loop,
+                args=(parse_q, persist_q),
+                name=f"clockcontrol-parse-{i}",
+                daemon=True,
+            )
+            for i in range(self.parse_workers)
+        ]
+        persister = threading.Thread(
+            target=self._persist_loop,
+            args=(persist_q,),
+            name="clockcontrol-persist",
+            daemon=True,
+        )
+        for thread in parsers + [persister]:
+            thread.start()
+
+        # El tiempo límite cubre la descarga, no la espera por lugar en la
+        # cola: un elemento ya descargado no se da por vencido, y uno
+        # vencido que termina de descargar tarde se descarta
+        cond = threading.Condition()
+        downloaded = set()
+        expired = set()
+        enqueuing = [0]
+
+        def fetch_stage(entry) -> None:
+            index, item = entry
+            fetched = self.fetch(item)
+            if fetched is None:
+                return
+            with cond:
+                if index in expired:
+                    return
+                downloaded.add(index)
+                enqueuing[0] += 1
+            try:
+                parse_q.put(fetched)
+            finally:
+                with cond:
+                    enqueuing[0] -= 1
+                    cond.notify_all()
+
+        def timed_out(entry) -> None:
+            index, item = entry
+            with cond:
+                if index in downloaded:
+                    return
+                expired.add(index)
+            if self.on_timeout is not None:
+                self.on_timeout(item)
+
+        try:
+            run_bounded(
+                fetch_stage,
+                list(enumerate(items)),
+                max_workers=self.max_workers,
+                deadline=self.deadline,
+                on_timeout=timed_out,
+                thread_name_prefix="clockcontrol-fetch",
+            )
+            with cond:
+                cond.wait_for(lambda: enqueuing[0] == 0)
+        finally:
+            for _ in parsers:
+                parse_q.put(_DONE)
+            for thread in parsers:
+                thread.join()
+            persist_q.put(_DONE)
+            persister.join()
@@ -0,0 +1,158 @@
+"""
+Perfilado de barridos: cProfile (.pstats) y muestreo de pilas (flamegraph)
+"""
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Desde Python 3.12 cProfile usa sys.monitoring: un solo perfil ve todos
+# los hilos (y no admite un segundo perfil activo)
+_GLOBAL_PROFILE = sys.version_info >= (3, 12)
+
+
+class Profiler:
+    """
+    Perfila un bloque de código en todos sus hilos.
+
+    Combina cProfile (conteo exacto de llamadas y tiempos acumulados, se
+    guarda en .pstats para snakeviz o pstats) con un muestreo periódico de
+    las pilas de todos los hilos, guardado en formato "collapsed stacks"
+    (flamegraph.pl, speedscope, inferno).
+
+    Ejemplo de uso:
+        profiler = Profiler("profiles", "all")
+        with profiler:
+            app.process_all_clocks()
+        profiler.print_report(top=25)
+    """
+
+    def __init__(
+        self,
+        output_dir: Union[str, Path] = "profiles",
+        name: str = "clockcontrol",
+        interval: float = 0.005,
+    ):
+        """
+        Args:
+            output_dir: Directorio de los archivos generados
+            name: Prefijo de los archivos (se agrega fecha y hora)
+            interval: Segundos entre muestras de pilas
+        """
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        base = Path(output_dir) / f"{name}-{stamp}"
+        self.pstats_path = base.with_suffix(".pstats")
+        self.collapsed_path = base.with_suffix(".collapsed")
+        self.interval = interval
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._samples: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._main: Optional[cProfile.Profile] = None
+        self._stats: Optional[pstats.Stats] = None
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _new_profile(self) -> cProfile.Profile:
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+        return profile
+
+    def _thread_hook(self, frame, event, arg) -> None:
+        # Primera llamada en cada hilo nuevo: el perfil propio del hilo
+        # reemplaza a este hook
+        self._new_profile()
+
+    def start(self) -> None:
+        """Empieza a perfilar el hilo actual, los hilos nuevos y a muestrear pilas"""
+        self._sampler = threading.Thread(
+            target=self._sample, name="clockcontrol-profiler", daemon=True
+        )
+        self._sampler.start()
+        if not _GLOBAL_PROFILE:
+            threading.setprofile(self._thread_hook)
+        self._main = self._new_profile()
+
+    def stop(self) -> None:
+        """Detiene el perfilado y escribe .pstats y .collapsed"""
+        if not _GLOBAL_PROFILE:
+            threading.setprofile(None)
+        self._main.disable()
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+        with self._lock:
+            profiles = list(self._profiles)
+        # create_stats desactiva el perfil solo en el hilo actual: los hilos
+        # abandonados por tiempo límite siguen midiéndose, pero ya no cuentan
+        stats = pstats.Stats(self._main)
+        for profile in profiles:
+            if profile is self._main:
+                continue
+            try:
+                stats.add(profile)
+            except TypeError:
+                # Hilo que no llegó a registrar ninguna llamada
+                pass
+        self._stats = stats
+
+        self.pstats_path.parent.mkdir(parents=True, exist_ok=True)
+        stats.dump_stats(str(self.pstats_path))
+        with open(self.collapsed_path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self._samples.items()):
+                f.write(f"{stack} {count}\n")
+        logger.info(f"Perfil guardado en {self.pstats_path} y {self.collapsed_path}")
+
+    def _sample(self) -> None:
+        """Hilo de muestreo: cuenta las pilas de todos los hilos cada interval"""
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                key = ";".join(reversed(stack))
+                self._samples[key] = self._samples.get(key, 0) + 1
+
+    def report(self, top: int = 25) -> str:
+        """
+        Funciones con mayor tiempo acumulado: primero en general y luego
+        las del paquete (procesamiento, serialización, E/S con relojes y DB).
+        """
+        if self._stats is None:
+            return ""
+        out = io.StringIO()
+        self._stats.stream = out
+        self._stats.sort_stats("cumulative")
+        self._stats.print_stats(top)
+        out.write("  Funciones de clockcontrol:\n")
+        self._stats.print_stats(r"clockcontrol[/\\](core|database|utils|app)", top)
+        return out.getvalue()
+
+    def print_report(self, top: int = 25) -> None:
+        """Imprime report(top) y la ubicación de los archivos"""
+        print(self.report(top))
+        print(f"  Perfil (cProfile): {self.pstats_path}")
+        print(f"  Pilas (flamegraph): {self.collapsed_path}")
@@ -0,0 +1,106 @@
+"""
+Almacenamiento local de estado entre ejecuciones
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+class JsonStateStore:
+    """
+    Diccionario persistente en un archivo JSON.
+
+    Cada escritura reemplaza el archivo de forma atómica (archivo temporal
+    + os.replace), por lo que una caída a mitad de escritura nunca deja
+    el estado corrupto. Es seguro usarlo desde varios hilos.
+
+    Ejemplo de uso:
+        store = JsonStateStore("state/watermarks.json")
+        store.set("192.168.1.201", {"records": 1500})
+        data = store.get("192.168.1.201")
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Args:
+            path: Ruta del archivo JSON (se crea si no existe)
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data: Dict[str, Any] = self._load()
+
+    def _load(self) -> Dict[str, Any]:
+        """Carga el estado desde disco (vacío si no existe o es inválido)"""
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Estado local ilegible en {self.path}, se reinicia: {e}")
+            return {}
+
+    def _flush(self) -> None:
+        """Escribe el estado completo en disco de forma atómica"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Obtiene el valor de una clave"""
+        with self._lock:
+            return self._data.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        """Guarda el valor de una clave y persiste en disco"""
+        with self._lock:
+            self._data[key] = value
+            self._flush()
+
+    def delete(self, key: str) -> None:
+        """Elimina una clave y persiste en disco"""
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self._flush()
+
+    def items(self) -> Dict[str, Any]:
+        """Copia superficial de todo el estado"""
+        with self._lock:
+            return dict(self._data)
+
+
+def open_state(directory: Union[str, Path], name: str) -> Optional[JsonStateStore]:
+    """
+    Abre un archivo de estado dentro del directorio de estado.
+
+    Returns:
+        JsonStateStore, o None si el directorio no es utilizable
+        (en ese caso el llamador debe operar sin estado persistente)
+    """
+    try:
+        base = Path(directory)
+        base.mkdir(parents=True, exist_ok=True)
+        return JsonStateStore(base / name)
+    except OSError as e:
+        logger.warning(f"No se pudo abrir el estado local '{name}' en {directory}: {e}")
+        return None
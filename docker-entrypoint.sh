@@ -4,6 +4,9 @@
 # Soporta dos modos de intervalo:
 #   - CRON_INTERVAL (minutos, usa cron)       -> para produccion
 #   - LOOP_INTERVAL_SECONDS (segundos, usa loop) -> para alta frecuencia
+# Con RUN_MODE=serve no se usa cron ni loop: un solo proceso residente
+# sondea cada reloj segun poll_interval / [clockcontrol.intervals].
+# Con RUN_MODE=stream el proceso residente recibe marcajes en tiempo real.
 #
 
 set -e
@@ -25,12 +28,33 @@ fi
 
 echo "Modo de ejecucion: $RUN_MODE"
 
+# Modos residentes: el proceso Python es PID 1 y recibe SIGTERM de docker stop
+if [ "$RUN_MODE" = "serve" ] || [ "$RUN_MODE" = "stream" ]; then
+    echo "Proceso residente (detener con docker stop)"
+    cd /app
+    exec /usr/local/bin/python -m clockcontrol "$RUN_MODE"
+fi
+
+# Segundos entre ejecuciones (valida lease_ttl con sharding=true)
+if [ -n "$LOOP_INTERVAL_SECONDS" ] && [ "$LOOP_INTERVAL_SECONDS" -gt 0 ] 2>/dev/null; then
+    RUN_INTERVAL_SECONDS=$LOOP_INTERVAL_SECONDS
+else
+    RUN_INTERVAL_SECONDS=$((CRON_INTERVAL * 60))
+fi
+
+# cron no hereda el entorno del contenedor: las variables que usa
+# clockcontrol se pasan en el comando
+CLOCK_ENV="CLOCKCONTROL_RUN_INTERVAL=$RUN_INTERVAL_SECONDS"
+if [ -n "$CLOCKCONTROL_COLLECTOR_ID" ]; then
+    CLOCK_ENV="$CLOCK_ENV CLOCKCONTROL_COLLECTOR_ID=$CLOCKCONTROL_COLLECTOR_ID"
+fi
+
 # Construir el comando segun el modo
 if [ "$RUN_MODE" = "single" ]; then
-    CLOCK_CMD="cd /app && /usr/local/bin/python -m clockcontrol single --address $CLOCK_IP --port $CLOCK_PORT --password $CLOCK_PASSWORD"
+    CLOCK_CMD="cd /app && env $CLOCK_ENV /usr/local/bin/python -m clockcontrol single --address $CLOCK_IP --port $CLOCK_PORT --password $CLOCK_PASSWORD"
     echo "Reloj configurado: $CLOCK_IP:$CLOCK_PORT"
 else
-    CLOCK_CMD="cd /app && /usr/local/bin/python -m clockcontrol all"
+    CLOCK_CMD="cd /app && env $CLOCK_ENV /usr/local/bin/python -m clockcontrol all"
     echo "Procesando todos los relojes activos"
 fi
 
@@ -0,0 +1,138 @@
+-- ============================================================
+-- BENCHMARK: DEDUPLICACION DE MARCAJES SEGUN TAMANO DE TABLA
+-- ============================================================
+-- Compara el tiempo de una carga tipica (2000 marcajes: 1000 ya
+-- existentes + 1000 nuevos) a medida que crece la tabla:
+--
+--   not_exists  : tabla sin indice + NOT EXISTS (stored procedure 001)
+--   on_conflict : tabla con ux_person_marks_dedup + ON CONFLICT (002)
+--
+-- Trabaja en un esquema temporal bench_dedup con tablas de la misma
+-- estructura que rrhh.person_marks; NO toca datos reales.
+--
+-- Uso (una base de pruebas, toma varios minutos con 5M filas):
+--   psql -h <host> -U <usuario> -d <base> -f sql/benchmarks/bench_person_marks_dedup.sql
+--
+-- Resultado esperado: not_exists crece con el tamano de la tabla,
+-- on_conflict se mantiene practicamente constante.
+-- ============================================================
+
+DROP SCHEMA IF EXISTS bench_dedup CASCADE;
+CREATE SCHEMA bench_dedup;
+
+CREATE TABLE bench_dedup.marks_not_exists (
+    id serial PRIMARY KEY,
+    carnet varchar(255),
+    date_mark varchar(255),
+    time_mark varchar(255),
+    ip_clock varchar(255),
+    id_reloj_bio int
+);
+
+CREATE TABLE bench_dedup.marks_on_conflict (
+    id serial PRIMARY KEY,
+    carnet varchar(255),
+    date_mark varchar(255),
+    time_mark varchar(255),
+    ip_clock varchar(255),
+    id_reloj_bio int
+);
+
+CREATE UNIQUE INDEX ux_bench_marks_dedup
+    ON bench_dedup.marks_on_conflict (date_mark, time_mark, ip_clock, carnet);
+
+CREATE TABLE bench_dedup.results (
+    table_rows bigint,
+    method varchar(20),
+    inserted int,
+    elapsed_ms numeric(12, 2)
+);
+
+-- Genera marcajes sinteticos unicos: la fila g corresponde a un segundo
+-- distinto a partir de base_day, con 150 relojes y 5000 carnets
+CREATE FUNCTION bench_dedup.synthetic_marks(from_g bigint, to_g bigint, base_day date)
+RETURNS TABLE (carnet varchar, date_mark varchar, time_mark varchar, ip_clock varchar, id_reloj_bio int)
+LANGUAGE sql AS $$
+    SELECT (1000000 + g % 5000)::varchar,
+           to_char(base_day + (g / 86400)::int, 'YYYY-MM-DD')::varchar,
+           to_char(time '00:00' + (g % 86400) * interval '1 second', 'HH24:MI:SS')::varchar,
+           ('10.0.0.' || (g % 150))::varchar,
+           (g % 150)::int
+    FROM generate_series(from_g, to_g) AS g
+$$;
+
+DO $$
+DECLARE
+    -- Ajustar los tamanos a evaluar segun el tiempo disponible
+    v_sizes     bigint[] := ARRAY[100000, 500000, 1000000, 2000000, 5000000];
+    v_size      bigint;
+    v_current   bigint := 0;
+    v_round     int := 0;
+    v_batch     json;
+    v_t0        timestamptz;
+    v_cnt       int;
+BEGIN
+    FOREACH v_size IN ARRAY v_sizes LOOP
+        v_round := v_round + 1;
+
+        -- Crecer ambas tablas hasta v_size filas
+        INSERT INTO bench_dedup.marks_not_exists (carnet, date_mark, time_mark, ip_clock, id_reloj_bio)
+            SELECT * FROM bench_dedup.synthetic_marks(v_current + 1, v_size, date '2020-01-01');
+        INSERT INTO bench_dedup.marks_on_conflict (carnet, date_mark, time_mark, ip_clock, id_reloj_bio)
+            SELECT * FROM bench_dedup.synthetic_marks(v_current + 1, v_size, date '2020-01-01');
+        v_current := v_size;
+        ANALYZE bench_dedup.marks_not_exists;
+        ANALYZE bench_dedup.marks_on_conflict;
+
+        -- Lote: 1000 marcajes existentes + 1000 nuevos (fechas futuras por ronda)
+        SELECT json_agg(json_build_object(
+                   'incarnet', m.carnet, 'indate_mark', m.date_mark, 'intime_mark', m.time_mark,
+                   'inip_clock', m.ip_clock, 'inid_reloj_bio', m.id_reloj_bio))
+          INTO v_batch
+          FROM (
+              SELECT * FROM bench_dedup.synthetic_marks(v_size - 999, v_size, date '2020-01-01')
+              UNION ALL
+              SELECT * FROM bench_dedup.synthetic_marks(1, 1000, date '2100-01-01' + v_round * 10)
+          ) m;
+
+        -- Metodo actual: NOT EXISTS sin indice
+        v_t0 := clock_timestamp();
+        INSERT INTO bench_dedup.marks_not_exists (carnet, date_mark, time_mark, ip_clock, id_reloj_bio)
+        SELECT ma.incarnet, ma.indate_mark, ma.intime_mark, ma.inip_clock, ma.inid_reloj_bio
+          FROM json_populate_recordset(null::record, v_batch)
+            AS ma(incarnet varchar, indate_mark varchar, intime_mark varchar, inip_clock varchar, inid_reloj_bio int)
+         WHERE NOT EXISTS (
+               SELECT 1 FROM bench_dedup.marks_not_exists pm
+                WHERE ma.indate_mark = pm.date_mark
+                  AND ma.intime_mark = pm.time_mark
+                  AND ma.inip_clock = pm.ip_clock
+                  AND ma.incarnet = pm.carnet);
+        GET DIAGNOSTICS v_cnt = ROW_COUNT;
+        INSERT INTO bench_dedup.results
+            VALUES (v_size, 'not_exists', v_cnt,
+                    extract(epoch FROM clock_timestamp() - v_t0) * 1000);
+
+        -- Metodo nuevo: indice unico + ON CONFLICT DO NOTHING
+        v_t0 := clock_timestamp();
+        INSERT INTO bench_dedup.marks_on_conflict (carnet, date_mark, time_mark, ip_clock, id_reloj_bio)
+        SELECT ma.incarnet, ma.indate_mark, ma.intime_mark, ma.inip_clock, ma.inid_reloj_bio
+          FROM json_populate_recordset(null::record, v_batch)
+            AS ma(incarnet varchar, indate_mark varchar, intime_mark varchar, inip_clock varchar, inid_reloj_bio int)
+        ON CONFLICT (date_mark, time_mark, ip_clock, carnet) DO NOTHING;
+        GET DIAGNOSTICS v_cnt = ROW_COUNT;
+        INSERT INTO bench_dedup.results
+            VALUES (v_size, 'on_conflict', v_cnt,
+                    extract(epoch FROM clock_timestamp() - v_t0) * 1000);
+
+        RAISE NOTICE 'Filas: % - ronda % completada', v_size, v_round;
+    END LOOP;
+END $$;
+
+-- ============================================================
+-- RESULTADOS (inserted debe ser 1000 en ambos metodos)
+-- ============================================================
+SELECT table_rows, method, inserted, elapsed_ms
+FROM bench_dedup.results
+ORDER BY table_rows, method;
+
+DROP SCHEMA bench_dedup CASCADE;
@@ -0,0 +1,64 @@
+-- ============================================================
+-- INDICE UNICO DE DEDUPLICACION PARA rrhh.person_marks
+-- ============================================================
+-- Objetivo: Que la deduplicacion de marcajes (carnet, fecha, hora,
+--           reloj) se resuelva con un indice en lugar de recorrer
+--           rrhh.person_marks completa en cada carga.
+--
+-- Requisito para:
+--   sql/stored_procedures/002_set_attendance_info_clock_on_conflict.sql
+--
+-- Ejecutar con un usuario con permisos de CREATE en schema rrhh.
+-- Los pasos 1 y 2 se pueden ejecutar en cualquier momento; el paso 3
+-- usa CONCURRENTLY (no bloquea inserciones) y NO puede ejecutarse
+-- dentro de una transaccion (psql sin -1 / --single-transaction).
+-- ============================================================
+
+-- 1. Verificar si existen duplicados (deberian ser pocos o ninguno,
+--    el stored procedure ya filtraba con NOT EXISTS)
+SELECT date_mark, time_mark, ip_clock, carnet, count(*) AS repeticiones
+FROM rrhh.person_marks
+GROUP BY date_mark, time_mark, ip_clock, carnet
+HAVING count(*) > 1
+ORDER BY repeticiones DESC
+LIMIT 50;
+
+-- 2. Eliminar duplicados conservando el registro mas antiguo (menor id).
+--    Sin este paso la creacion del indice unico falla si hay repetidos.
+BEGIN;
+
+DELETE FROM rrhh.person_marks pm
+USING rrhh.person_marks older
+WHERE pm.date_mark = older.date_mark
+  AND pm.time_mark = older.time_mark
+  AND pm.ip_clock = older.ip_clock
+  AND pm.carnet = older.carnet
+  AND pm.id > older.id;
+
+COMMIT;
+
+-- 3. Crear el indice unico (mismo orden de columnas que usa el
+--    ON CONFLICT del stored procedure)
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_person_marks_dedup
+    ON rrhh.person_marks (date_mark, time_mark, ip_clock, carnet);
+
+-- Si la creacion CONCURRENTLY falla queda un indice INVALID; eliminarlo
+-- y volver a ejecutar el paso 3:
+-- DROP INDEX CONCURRENTLY IF EXISTS rrhh.ux_person_marks_dedup;
+
+ANALYZE rrhh.person_marks;
+
+-- ============================================================
+-- VERIFICACION
+-- ============================================================
+-- El indice debe figurar como valido (indisvalid = true)
+-- SELECT c.relname, i.indisvalid, i.indisunique
+-- FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+-- WHERE c.relname = 'ux_person_marks_dedup';
+
+-- ============================================================
+-- PARA REVERTIR
+-- ============================================================
+-- Primero restaurar sql/stored_procedures/001_create_stored_procedure.sql
+-- (la version con ON CONFLICT necesita este indice), luego:
+-- DROP INDEX CONCURRENTLY IF EXISTS rrhh.ux_person_marks_dedup;
@@ -0,0 +1,64 @@
+-- ============================================================
+-- REPARTO DE RELOJES ENTRE VARIOS RECOLECTORES (sharding=true)
+-- ============================================================
+-- Objetivo: Que varias instancias de clockControl (contenedores o
+--           servidores) se repartan los relojes de
+--           rrhh.reloj_biometrico sin procesar dos veces el mismo reloj.
+--
+-- Cada recolector:
+--   - registra un latido en rrhh.collector_heartbeat en cada barrido
+--     (o cada lease_ttl / 3 segundos en modo serve y stream);
+--   - toma relojes con una fila en rrhh.clock_lease que vence en
+--     lease_ttl segundos y la renueva mientras sigue activo;
+--   - toma como maximo su parte (relojes activos / recolectores vivos)
+--     y libera el excedente cuando aparece otro recolector.
+--
+-- Si un recolector muere su latido y sus arriendos vencen y los demas
+-- toman sus relojes en el siguiente barrido.
+--
+-- Ejecutar con un usuario con permisos de CREATE en schema rrhh. El
+-- usuario de clockControl necesita SELECT, INSERT, UPDATE y DELETE en
+-- ambas tablas.
+-- ============================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS rrhh.collector_heartbeat (
+    collector_id varchar(128) PRIMARY KEY,
+    started_at   timestamptz NOT NULL DEFAULT now(),
+    last_seen    timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS rrhh.clock_lease (
+    id_reloj_bio  integer PRIMARY KEY
+                  REFERENCES rrhh.reloj_biometrico (id_reloj_bio) ON DELETE CASCADE,
+    collector_id  varchar(128) NOT NULL,
+    acquired_at   timestamptz NOT NULL DEFAULT now(),
+    lease_expires timestamptz NOT NULL
+);
+
+-- Renovacion y liberacion por recolector
+CREATE INDEX IF NOT EXISTS ix_clock_lease_collector
+    ON rrhh.clock_lease (collector_id);
+
+COMMIT;
+
+-- ============================================================
+-- VERIFICACION
+-- ============================================================
+-- Relojes por recolector y vencimiento de sus arriendos:
+-- SELECT collector_id, count(*) AS relojes, min(lease_expires) AS vence
+-- FROM rrhh.clock_lease
+-- WHERE lease_expires > now()
+-- GROUP BY collector_id;
+--
+-- Recolectores vivos:
+-- SELECT collector_id, started_at, last_seen
+-- FROM rrhh.collector_heartbeat
+-- ORDER BY last_seen DESC;
+
+-- ============================================================
+-- PARA REVERTIR
+-- ============================================================
+-- DROP TABLE IF EXISTS rrhh.clock_lease;
+-- DROP TABLE IF EXISTS rrhh.collector_heartbeat;
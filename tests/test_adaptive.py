@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para el sondeo adaptativo
+"""
+import pytest
+
+from clockcontrol.core.adaptive import AdaptivePollPolicy
+
+
+class TestAdaptivePollPolicy:
+    """Tests para AdaptivePollPolicy"""
+
+    def setup_method(self):
+        """Setup para cada test"""
+        self.policy = AdaptivePollPolicy(
+            min_interval=15,
+            max_interval=900,
+            target_marks=10,
+            failure_backoff=60,
+            max_backoff=3600,
+            alpha=1.0,
+        )
+
+    def test_unknown_clock_polled_soon(self):
+        """Test que un reloj sin historial se sondea con el intervalo minimo"""
+        assert self.policy.interval_for("10.0.0.1", hour=10) == 15
+
+    def test_idle_clock_uses_max_interval(self):
+        """Test que un reloj sin marcajes se sondea con el intervalo maximo"""
+        self.policy.record("10.0.0.1", True, 0, now=0, hour=3)
+        self.policy.record("10.0.0.1", True, 0, now=600, hour=3)
+
+        assert self.policy.interval_for("10.0.0.1", hour=3) == 900
+
+    def test_busy_clock_polled_more_often(self):
+        """Test que el intervalo se acorta con el ritmo de marcajes"""
+        self.policy.record("busy", True, 0, now=0, hour=8)
+        self.policy.record("busy", True, 60, now=60, hour=8)
+        self.policy.record("quiet", True, 0, now=0, hour=8)
+        self.policy.record("quiet", True, 10, now=600, hour=8)
+
+        busy = self.policy.interval_for("busy", hour=8)
+        quiet = self.policy.interval_for("quiet", hour=8)
+
+        assert busy == 15
+        assert busy < quiet < 900
+
+    def test_failure_backoff(self):
+        """Test que los fallos consecutivos alargan el intervalo exponencialmente"""
+        intervals = []
+        for _ in range(8):
+            self.policy.record("dead", False)
+            intervals.append(self.policy.interval_for("dead"))
+
+        assert intervals[:4] == [60, 120, 240, 480]
+        assert intervals[-1] == 3600
+
+        self.policy.record("dead", True, 0, now=0)
+        assert self.policy.interval_for("dead", hour=3) == 900
+
+    def test_hourly_profile_anticipates_peak(self):
+        """Test que el perfil por hora adelanta el sondeo antes del pico"""
+        profile = [0.0] * 24
+        profile[8] = 3600.0  # 1 marcaje por segundo a las 08:00
+        self.policy.bootstrap({}, {"10.0.0.1": profile})
+
+        assert self.policy.interval_for("10.0.0.1", hour=7) == 15
+        assert self.policy.interval_for("10.0.0.1", hour=3) == 900
+
+    def test_bootstrap_failures_delay_first_poll(self):
+        """Test que los fallos del historial retrasan el primer sondeo"""
+        self.policy.bootstrap({"dead": 3, "alive": 0}, {})
+
+        assert self.policy.initial_delay("dead") == 240
+        assert self.policy.initial_delay("alive") == 0
+        assert self.policy.initial_delay("new") == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
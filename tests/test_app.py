@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para la orquestación de ClockControlApp con relojes y base de datos
+simulados (benchmarks/fakes.py)
+"""
+import csv
+import io
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.fakes import FakeCursor, FakeZKConnection, MockDatabase, make_attendances
+from clockcontrol import app as clockcontrol_app
+from clockcontrol.config.settings import Settings
+from clockcontrol.core import device
+from clockcontrol.core.exceptions import TaskCancelledError
+from clockcontrol.core.stream import MicroBatchWriter
+from clockcontrol.utils.concurrency import CancelToken
+
+
+class StoredCursor(FakeCursor):
+    """Cursor que deduplica como rrhh.person_marks y responde como el stored procedure"""
+
+    def execute(self, query, params=None):
+        super().execute(query, params)
+        if "ux_person_marks_dedup" in str(query):
+            self._result = [(True,)] if self.db.dedup_index else []
+        elif "rrhh.clock_conn" in str(query) and params:
+            self.db.conn_logs.append(tuple(params))
+
+    def callproc(self, name, args):
+        self._round_trip()
+        self.db.writes.append("procedure")
+        self.wrote = True
+        if self.db.failure and self.db.failing_clocks in (None, args[0]):
+            self._result = [(-100, self.db.failure, 0)]
+            return
+        inserted = self.db.store(
+            (m["incarnet"], m["indate_mark"], m["intime_mark"], m["inip_clock"], m["inid_reloj_bio"])
+            for m in json.loads(args[1])
+        )
+        if inserted:
+            self._result = [(100, "CARGA INFORMACION DEL FUNCIONARIO - RELOJ", inserted)]
+        else:
+            self._result = [(-100, "NO SE INSERTARON REGISTROS", 0)]
+
+    def copy_expert(self, sql, buffer):
+        self._round_trip()
+        self.db.writes.append("copy")
+        self.wrote = True
+        for carnet, date_mark, time_mark, ip, clock_id in csv.reader(io.StringIO(buffer.read())):
+            if self.db.store([(carnet, date_mark, time_mark, ip, int(clock_id))]):
+                self.db.staged[int(clock_id)] = self.db.staged.get(int(clock_id), 0) + 1
+        self.rowcount = sum(self.db.staged.values())
+
+
+class StoredDatabase(MockDatabase):
+    """
+    MockDatabase que guarda los marcajes: los repetidos no se insertan y
+    una transacción con error no deja nada guardado.
+    """
+
+    def __init__(self, clocks):
+        super().__init__(clocks=clocks)
+        self.marks = set()
+        self.failure = None
+        self.failing_clocks = None
+        self.dedup_index = True
+        self.writes = []
+        self.transactions = 0
+        self.conn_logs = []
+
+    def store(self, marks):
+        before = len(self.marks)
+        self.marks.update(marks)
+        return len(self.marks) - before
+
+    def carnets(self, clock_id):
+        return sorted(m[0] for m in self.marks if m[4] == clock_id)
+
+    def failures(self, ip):
+        return [obs for log_ip, available, obs in self.conn_logs if log_ip == ip and not available]
+
+    @contextmanager
+    def get_cursor(self):
+        with self._lock:
+            committed = set(self.marks)
+            cursor = StoredCursor(self)
+            cursor.wrote = False
+            try:
+                yield cursor
+            except Exception:
+                self.marks = committed
+                self.staged.clear()
+                raise
+            if cursor.wrote:
+                self.transactions += 1
+
+
+def attendances(count, hours_ago=0):
+    return make_attendances(
+        count, users=count, span=timedelta(hours=10),
+        now=datetime.now() - timedelta(hours=hours_ago),
+    )
+
+
+class Gate:
+    """Detiene un reloj simulado en connect o en la descarga hasta release()"""
+
+    def __init__(self, stage, fail=False):
+        self.stage = stage
+        self.fail = fail
+        self.reached = threading.Event()
+        self.released = threading.Event()
+
+    def wait(self, stage, ip):
+        if stage != self.stage:
+            return
+        self.reached.set()
+        self.released.wait(5)
+        if self.fail:
+            raise ConnectionError(f"can't reach device ({ip})")
+
+    def release(self):
+        self.released.set()
+
+
+class GatedConnection(FakeZKConnection):
+    def __init__(self, ip, records, gate):
+        super().__init__(ip, records, 0.0)
+        self.gate = gate
+
+    def get_attendance(self):
+        if self.gate is not None:
+            self.gate.wait("download", self.ip)
+        return super().get_attendance()
+
+
+@pytest.fixture
+def fleet(tmp_path, monkeypatch):
+    """
+    Crea apps sobre n relojes simulados (10.0.0.0 ... con id 1 ...); logs
+    es el log de cada reloj por IP y se puede reemplazar entre ejecuciones,
+    gates detiene relojes por IP.
+    """
+    monkeypatch.chdir(tmp_path)
+    logs = {}
+    gates = {}
+    apps = []
+
+    class FakeZK:
+        def __init__(self, ip, port=4370, **kwargs):
+            self.ip = ip
+
+        def connect(self):
+            gate = gates.get(self.ip)
+            if gate is not None:
+                gate.wait("connect", self.ip)
+            return GatedConnection(self.ip, logs[self.ip], gate)
+
+    open_device = device.ZKDeviceManager.open
+    monkeypatch.setattr(device, "ZK", FakeZK)
+    monkeypatch.setattr(device.ZKDeviceManager, "is_reachable", lambda self, **kwargs: True)
+    # Sin espera entre reintentos de conexión
+    monkeypatch.setattr(
+        device.ZKDeviceManager, "open",
+        lambda self, retries=2, delay=2.0: open_device(self, retries, 0.0),
+    )
+    monkeypatch.setattr(
+        clockcontrol_app, "probe_many",
+        lambda targets, **kwargs: {ip: True for ip, _ in targets},
+    )
+
+    class Fleet:
+        def __init__(self):
+            self.logs = logs
+            self.gates = gates
+            self.db = None
+
+        def app(self, clocks=1, full_resync=False, **options):
+            if self.db is None:
+                self.db = StoredDatabase(clocks)
+                for _, ip, _, _ in self.db.clock_rows:
+                    logs.setdefault(ip, [])
+            monkeypatch.setattr(clockcontrol_app, "DatabaseConnection", lambda *a, **k: self.db)
+            config = tmp_path / "database.ini"
+            config.write_text(
+                "[postgresql]\nhost=localhost\ndatabase=test\nuser=test\npassword=test\n"
+                "[clockcontrol]\n"
+                f"state_dir={tmp_path}/state\n"
+                + "".join(
+                    f"{key}={value}\n"
+                    for key, value in {"circuit_breaker": "false", **options}.items()
+                )
+            )
+            app = clockcontrol_app.ClockControlApp(Settings(str(config)), full_resync=full_resync)
+            apps.append(app)
+            return app
+
+    yield Fleet()
+    for app in apps:
+        app.close()
+
+
+class TestWatermarkAfterSave:
+    """Tests para la marca de agua en fetch_clock/complete_log"""
+
+    IP = "10.0.0.0"
+
+    def run(self, app):
+        return app.process_single_clock(self.IP, reachable=True)
+
+    def test_advances_after_confirmed_save(self, fleet):
+        """Test que la marca de agua avanza con el guardado y la siguiente lectura es incremental"""
+        app = fleet.app()
+        fleet.logs[self.IP] = attendances(5)
+
+        first = self.run(app)
+        fleet.logs[self.IP] = fleet.logs[self.IP] + attendances(2)[-2:]
+        second = self.run(app)
+
+        assert (first.success, first.marks_saved) == (True, 5)
+        assert (second.success, second.marks_processed) == (True, 2)
+        assert app.watermarks.get(self.IP).records == 7
+
+    def test_failed_save_keeps_watermark(self, fleet):
+        """Test que un error del stored procedure no avanza la marca de agua"""
+        app = fleet.app()
+        fleet.logs[self.IP] = attendances(5)
+        fleet.db.failure = "COULD NOT SERIALIZE ACCESS. CÓDIGO ESTADO:40001"
+
+        failed = self.run(app)
+        fleet.db.failure = None
+        retried = self.run(app)
+
+        assert not failed.success and "-100" in failed.error
+        assert (retried.success, retried.marks_processed, retried.marks_saved) == (True, 5, 5)
+
+    def test_all_duplicates_advance_watermark(self, fleet):
+        """Test que reenviar marcajes ya guardados (-100 sin registros nuevos) completa el reloj"""
+        fleet.logs[self.IP] = attendances(5)
+        self.run(fleet.app())
+
+        # Sin marca de agua (p. ej. el primer barrido tras desplegar): se reenvía todo
+        app = fleet.app(full_resync=True)
+        result = self.run(app)
+
+        assert (result.success, result.marks_processed, result.marks_saved) == (True, 5, 0)
+        assert result.error is None
+        assert app.watermarks.get(self.IP).records == 5
+
+    def test_shrunk_log_resyncs(self, fleet):
+        """Test que un log con menos registros que la marca de agua se procesa completo"""
+        app = fleet.app()
+        fleet.logs[self.IP] = attendances(5, hours_ago=2)
+        self.run(app)
+
+        fleet.logs[self.IP] = attendances(3)
+        result = self.run(app)
+
+        assert (result.success, result.marks_processed, result.marks_saved) == (True, 3, 3)
+        assert app.watermarks.get(self.IP).records == 3
+
+    def test_changed_anchor_resyncs(self, fleet):
+        """Test que un log borrado y vuelto a llenar (otra fecha en la marca de agua) se procesa completo"""
+        app = fleet.app()
+        fleet.logs[self.IP] = attendances(5, hours_ago=2)
+        self.run(app)
+
+        fleet.logs[self.IP] = attendances(7)
+        result = self.run(app)
+
+        assert (result.success, result.marks_processed, result.marks_saved) == (True, 7, 7)
+
+
+class TestIngestMode:
+    """Tests para la verificación de ingest_mode en initialize()"""
+
+    IP = "10.0.0.0"
+
+    def test_missing_dedup_index_uses_procedure(self, fleet):
+        """Test que sin ux_person_marks_dedup la carga por COPY pasa al stored procedure"""
+        app = fleet.app(ingest_mode="copy")
+        fleet.db.dedup_index = False
+        fleet.logs[self.IP] = attendances(5)
+
+        app.initialize()
+        result = app.process_single_clock(self.IP, reachable=True)
+
+        assert app.ingest_mode == "procedure"
+        assert (result.success, result.marks_saved) == (True, 5)
+        assert fleet.db.writes == ["procedure"]
+
+    def test_dedup_index_keeps_copy(self, fleet):
+        """Test que con el índice se mantiene el ingest_mode configurado"""
+        app = fleet.app(ingest_mode="copy")
+        fleet.logs[self.IP] = attendances(5)
+
+        app.initialize()
+        result = app.process_single_clock(self.IP, reachable=True)
+
+        assert app.ingest_mode == "copy"
+        assert (result.success, result.marks_saved) == (True, 5)
+        assert fleet.db.writes == ["copy"]
+
+
+class TestSweepSave:
+    """Tests para el guardado de process_all_clocks en una sola transacción"""
+
+    def sweep(self, fleet, **options):
+        app = fleet.app(clocks=3, **options)
+        for ip in fleet.logs:
+            fleet.logs[ip] = attendances(5)
+        return app, app.process_all_clocks()
+
+    def test_small_sweep_single_transaction(self, fleet):
+        """Test que menos de copy_threshold marcajes de varios relojes se guardan con un solo COPY"""
+        app, results = self.sweep(fleet)
+
+        assert [(r.success, r.marks_saved) for r in results] == [(True, 5)] * 3
+        assert fleet.db.writes == ["copy"]
+        assert fleet.db.transactions == 1
+
+    def test_procedure_single_transaction(self, fleet):
+        """Test que con ingest_mode=procedure las llamadas de todos los relojes van en una transacción"""
+        app, results = self.sweep(fleet, ingest_mode="procedure")
+
+        assert [(r.success, r.marks_saved) for r in results] == [(True, 5)] * 3
+        assert fleet.db.writes == ["procedure"] * 3
+        assert fleet.db.transactions == 1
+
+    def test_failed_clock_rolls_back_group(self, fleet):
+        """Test que un error del stored procedure en un reloj no deja guardados a los anteriores"""
+        app = fleet.app(clocks=3, ingest_mode="procedure")
+        for ip in fleet.logs:
+            fleet.logs[ip] = attendances(5)
+        fleet.db.failure = "COULD NOT SERIALIZE ACCESS. CÓDIGO ESTADO:40001"
+        fleet.db.failing_clocks = 2
+
+        results = app.process_all_clocks()
+
+        assert not any(r.success for r in results)
+        assert fleet.db.marks == set()
+        assert all(app.watermarks.get(r.clock_ip) is None for r in results)
+        assert fleet.db.transactions == 0
+
+
+class TestCancellation:
+    """Tests para el tiempo límite por reloj y el aviso de cancelación (CancelToken)"""
+
+    SLOW = "10.0.0.1"
+
+    def sweep(self, fleet, gate):
+        app = fleet.app(clocks=3, clock_deadline=0.3, conn_log_buffer="false")
+        for ip in fleet.logs:
+            fleet.logs[ip] = attendances(5)
+        fleet.gates[self.SLOW] = gate
+        # Avisa cuando el hilo vencido termina (su error se registra al final)
+        finished = threading.Event()
+        record_error = app.record_error
+
+        def recorded(result, error, cancel=None):
+            record_error(result, error, cancel)
+            if result.clock_ip == self.SLOW:
+                finished.set()
+
+        app.record_error = recorded
+        results = app.process_all_clocks()
+        gate.release()
+        assert finished.wait(5)
+        return app, results
+
+    def test_keeps_order_under_deadline(self, fleet):
+        """Test que el reloj vencido se reporta en su posición sin demorar a los demás"""
+        app, results = self.sweep(fleet, Gate("connect", fail=True))
+
+        assert [r.clock_ip for r in results] == ["10.0.0.0", "10.0.0.1", "10.0.0.2"]
+        assert [r.success for r in results] == [True, False, True]
+        assert "Tiempo límite excedido" in results[1].error
+        assert [r.marks_saved for r in results] == [5, 0, 5]
+
+    def test_late_failure_is_not_logged(self, fleet):
+        """Test que el error de conexión de un reloj ya vencido no genera otro log de fallo"""
+        app, results = self.sweep(fleet, Gate("connect", fail=True))
+
+        assert fleet.db.failures(self.SLOW) == [results[1].error]
+
+    def test_late_download_is_not_saved(self, fleet):
+        """Test que un reloj que termina la descarga después del tiempo límite no guarda marcajes"""
+        app, results = self.sweep(fleet, Gate("download"))
+
+        assert fleet.db.carnets(2) == []
+        assert app.watermarks.get(self.SLOW) is None
+        assert fleet.db.carnets(1) and fleet.db.carnets(3)
+        assert fleet.db.failures(self.SLOW) == [results[1].error]
+
+    def test_cancelled_single_clock_has_no_effects(self, fleet):
+        """Test que process_single_clock cancelado durante la descarga no guarda ni avanza la marca de agua"""
+        app = fleet.app(conn_log_buffer="false")
+        ip = "10.0.0.0"
+        fleet.logs[ip] = attendances(5)
+        gate = fleet.gates[ip] = Gate("download")
+        cancel = CancelToken()
+        results = []
+        worker = threading.Thread(
+            target=lambda: results.append(app.process_single_clock(ip, reachable=True, cancel=cancel))
+        )
+        worker.start()
+        assert gate.reached.wait(5)
+
+        cancel.cancel()
+        gate.release()
+        worker.join(5)
+
+        assert not results[0].success and "abandonado" in results[0].error
+        assert fleet.db.marks == set()
+        assert app.watermarks.get(ip) is None
+        assert fleet.db.failures(ip) == []
+
+    def test_check_cancelled(self):
+        """Test que check_cancelled lanza TaskCancelledError solo con el aviso activo"""
+        cancel = CancelToken()
+        clockcontrol_app.ClockControlApp.check_cancelled("10.0.0.0", None)
+        clockcontrol_app.ClockControlApp.check_cancelled("10.0.0.0", cancel)
+
+        cancel.cancel()
+        with pytest.raises(TaskCancelledError):
+            clockcontrol_app.ClockControlApp.check_cancelled("10.0.0.0", cancel)
+
+
+class TestStreamReconcile:
+    """Tests para la reconciliación del modo stream (create_live_worker)"""
+
+    IP = "10.0.0.0"
+
+    def test_reconcile_confirms_live_marks(self, fleet):
+        """Test que la reconciliación no falla por los marcajes ya guardados en tiempo real y avanza la marca de agua"""
+        app = fleet.app()
+        clock = app.registry.get(self.IP)
+        fleet.logs[self.IP] = attendances(3, hours_ago=1)
+        worker = app.create_live_worker(clock, MicroBatchWriter(app.save_marks), threading.Event())
+        worker.reconcile()
+
+        # Eventos recibidos por live capture: quedan también en el log del reloj
+        events = attendances(2)
+        worker.writer.add(app.processor.process(events, self.IP, clock.id))
+        assert worker.writer.flush() == 2
+        fleet.logs[self.IP] = fleet.logs[self.IP] + events
+        result = worker.reconcile()
+
+        assert (result.success, result.marks_processed, result.marks_saved) == (True, 2, 0)
+        assert result.error is None
+        assert app.watermarks.get(self.IP).records == 5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
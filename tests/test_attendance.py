@@ -8,7 +8,7 @@ from datetime import date, datetime, timedelta
 
 import pytest
 
-from clockcontrol.core.attendance import AttendanceProcessor, AttendanceMark
+from clockcontrol.core.attendance import AttendanceProcessor, AttendanceMark, MarkBatch
 
 
 class MockAttendance:
@@ -157,6 +157,31 @@ class TestAttendanceProcessor:
         data = json.loads(json_str)
         assert data == []
     
+    def test_to_json_is_compact(self):
+        """Test que to_json no agrega indentacion"""
+        marks = [
+            AttendanceMark("12345", "2026-02-07", "08:00:00", "192.168.1.100", 42),
+        ]
+
+        json_str = AttendanceProcessor.to_json(marks)
+
+        assert "\n" not in json_str
+        assert json.loads(json_str)[0]["inid_reloj_bio"] == 42
+
+    def test_to_csv_for_copy(self):
+        """Test de conversion a CSV para COPY"""
+        marks = [
+            AttendanceMark("12345", "2026-02-07", "08:00:00", "192.168.1.100", 42),
+            AttendanceMark("A,1", "2026-02-07", "17:30:00", "192.168.1.100", 42),
+        ]
+
+        buffer = AttendanceProcessor.to_csv(marks)
+
+        assert buffer.read().splitlines() == [
+            "12345,2026-02-07,08:00:00,192.168.1.100,42",
+            '"A,1",2026-02-07,17:30:00,192.168.1.100,42',
+        ]
+
     def test_days_back_parameter(self):
         """Test del parametro days_back"""
         processor = AttendanceProcessor(days_back=3)
@@ -175,6 +200,144 @@ class TestAttendanceProcessor:
         assert result[0].carnet == "12345"
 
 
+class ZKAttendance:
+    """Mock con la misma forma que zk.attendance.Attendance (timestamp datetime)"""
+    def __init__(self, user_id: str, timestamp: datetime):
+        self.user_id = user_id
+        self.timestamp = timestamp
+        self.status = 1
+        self.punch = 0
+
+    def __str__(self) -> str:
+        return f"<Attendance>: {self.user_id} : {self.timestamp} ({self.status}, {self.punch})"
+
+
+class OpaqueAttendance:
+    """Objeto sin atributos conocidos: solo se puede parsear por texto"""
+    def __init__(self, text: str):
+        self.text = text
+
+    def __str__(self) -> str:
+        return self.text
+
+
+class TestAttendanceProcessorFastPath:
+    """Tests para el parseo directo de user_id/timestamp"""
+
+    def setup_method(self):
+        """Setup para cada test"""
+        self.processor = AttendanceProcessor(days_back=1)
+        self.today = datetime.combine(date.today(), datetime.min.time())
+
+    def test_datetime_timestamps(self):
+        """Test con timestamps datetime como los entrega pyzk"""
+        attendances = [
+            ZKAttendance("12345", self.today.replace(hour=8, minute=5, second=9)),
+            ZKAttendance("67890", self.today - timedelta(days=1, hours=-17)),
+            ZKAttendance("11111", self.today - timedelta(days=2)),  # Debe ser filtrado
+        ]
+
+        result = self.processor.process(attendances, "192.168.1.100", 42)
+
+        today = date.today()
+        assert [(m.carnet, m.date_mark, m.time_mark) for m in result] == [
+            ("12345", f"{today}", "08:05:09"),
+            ("67890", f"{today - timedelta(days=1)}", "17:00:00"),
+        ]
+
+    def test_microseconds_are_truncated(self):
+        """Test que los microsegundos no alteran la hora"""
+        stamp = self.today.replace(hour=8, microsecond=123456)
+        result = self.processor.process([ZKAttendance("1", stamp)], "192.168.1.100", 42)
+
+        assert result[0].time_mark == "08:00:00"
+
+    def test_same_result_as_string_parsing(self):
+        """Test que el parseo directo coincide con el parseo por texto"""
+        stamps = [self.today - timedelta(hours=h, minutes=7 * h) for h in range(0, 72, 5)]
+        direct = [ZKAttendance(str(100 + i), ts) for i, ts in enumerate(stamps)]
+        textual = [OpaqueAttendance(str(a)) for a in direct]
+
+        fast = self.processor.process(direct, "192.168.1.100", 42)
+        slow = self.processor.process(textual, "192.168.1.100", 42)
+
+        assert fast == slow
+        assert len(fast) > 0
+
+    def test_invalid_string_timestamp_in_range(self):
+        """Test con timestamp texto invalido dentro del rango"""
+        attendances = [MockAttendance("12345", f"{date.today()} 25:00:00")]
+
+        assert self.processor.process(attendances, "192.168.1.100", 42) == []
+
+
+class TestMarkBatch:
+    """Tests para el lote columnar MarkBatch"""
+
+    def setup_method(self):
+        """Setup para cada test"""
+        self.processor = AttendanceProcessor(days_back=1)
+        today = datetime.combine(date.today(), datetime.min.time())
+        self.attendances = [
+            ZKAttendance(str(1000 + i), today - timedelta(minutes=37 * i))
+            for i in range(100)
+        ]
+
+    def test_same_marks_as_process(self):
+        """Test que process_batch produce los mismos marcajes que process"""
+        batch = self.processor.process_batch(self.attendances, "192.168.1.100", 42)
+        marks = self.processor.process(self.attendances, "192.168.1.100", 42)
+
+        assert len(batch) == len(marks) > 0
+        assert batch.to_marks() == marks
+
+    def test_same_json_as_marks(self):
+        """Test que el JSON del lote equivale al de la lista de marcajes"""
+        batch = self.processor.process_batch(self.attendances, "192.168.1.100", 42)
+        marks = batch.to_marks()
+
+        assert json.loads(AttendanceProcessor.to_json(batch)) == json.loads(
+            AttendanceProcessor.to_json(marks)
+        )
+
+    def test_same_csv_as_marks(self):
+        """Test que el CSV del lote equivale al de la lista de marcajes"""
+        batch = self.processor.process_batch(self.attendances, "192.168.1.100", 42)
+
+        assert (
+            AttendanceProcessor.to_csv(batch).read()
+            == AttendanceProcessor.to_csv(batch.to_marks()).read()
+        )
+
+    def test_json_escapes_carnet(self):
+        """Test que el carnet se escapa correctamente en JSON"""
+        batch = MarkBatch("192.168.1.100", 42)
+        batch.append('12"34', "2026-02-07", "08:00:00")
+
+        assert json.loads(batch.to_json())[0]["incarnet"] == '12"34'
+
+    def test_dates_are_interned(self):
+        """Test que las fechas repetidas comparten el mismo objeto"""
+        batch = MarkBatch.from_marks(
+            [
+                AttendanceMark("1", "".join(["2026-02-", "07"]), "08:00:00", "192.168.1.100", 42),
+                AttendanceMark("2", "".join(["2026-02-", "07"]), "09:00:00", "192.168.1.100", 42),
+            ],
+            "192.168.1.100",
+            42,
+        )
+
+        assert batch.dates[0] is batch.dates[1]
+
+    def test_empty_batch(self):
+        """Test con lote vacio"""
+        batch = self.processor.process_batch([], "192.168.1.100", 42)
+
+        assert len(batch) == 0
+        assert not batch
+        assert json.loads(batch.to_json()) == []
+
+
 class TestAttendanceProcessorEdgeCases:
     """Tests para casos borde"""
     
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para el circuit breaker de relojes
+"""
+import pytest
+
+from clockcontrol.core.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from clockcontrol.utils.state import JsonStateStore
+
+
+class TestCircuitBreaker:
+    """Tests para CircuitBreaker"""
+
+    def setup_method(self):
+        """Setup para cada test"""
+        self.breaker = CircuitBreaker(
+            failure_threshold=3, open_interval=300, max_open_interval=1200
+        )
+
+    def trip(self, ip="10.0.0.1", now=0):
+        for _ in range(3):
+            self.breaker.record_failure(ip, "Sin respuesta", now=now)
+
+    def test_failures_below_threshold_are_logged(self):
+        """Test que los fallos previos a la apertura se registran tal cual"""
+        assert self.breaker.record_failure("10.0.0.1", "Sin respuesta", now=0) == "Sin respuesta"
+        assert self.breaker.allow("10.0.0.1", now=0)
+
+    def test_opens_after_threshold(self):
+        """Test que el circuito se abre y omite el reloj hasta la espera"""
+        observations = [
+            self.breaker.record_failure("10.0.0.1", "Sin respuesta", now=0)
+            for _ in range(3)
+        ]
+
+        assert observations[-1].startswith("Circuito abierto tras 3 fallos")
+        assert self.breaker.state("10.0.0.1").state == OPEN
+        assert not self.breaker.allow("10.0.0.1", now=299)
+        assert self.breaker.allow("10.0.0.1", now=300)
+        assert self.breaker.state("10.0.0.1").state == HALF_OPEN
+
+    def test_failed_half_open_probe_is_collapsed(self):
+        """Test que los fallos repetidos de un circuito abierto no se registran"""
+        self.trip()
+        self.breaker.allow("10.0.0.1", now=300)
+
+        assert self.breaker.record_failure("10.0.0.1", "Sin respuesta", now=300) is None
+        # La espera se duplica con cada apertura consecutiva
+        assert not self.breaker.allow("10.0.0.1", now=899)
+        assert self.breaker.allow("10.0.0.1", now=900)
+
+    def test_open_interval_is_capped(self):
+        """Test que la espera no supera max_open_interval"""
+        self.trip()
+        for now in (300, 900, 2100, 3300):
+            assert self.breaker.allow("10.0.0.1", now=now)
+            self.breaker.record_failure("10.0.0.1", "Sin respuesta", now=now)
+
+        assert self.breaker.retry_in("10.0.0.1", now=3300) == 1200
+
+    def test_success_closes_circuit(self):
+        """Test que un intento exitoso cierra el circuito y registra la transicion"""
+        self.trip()
+        self.breaker.allow("10.0.0.1", now=300)
+
+        observation = self.breaker.record_success("10.0.0.1")
+
+        assert observation.startswith("Circuito cerrado")
+        assert self.breaker.state("10.0.0.1").state == CLOSED
+        assert self.breaker.record_success("10.0.0.1") is None
+
+    def test_state_survives_restart(self, tmp_path):
+        """Test que el estado persiste entre ejecuciones"""
+        path = tmp_path / "circuits.json"
+        breaker = CircuitBreaker(JsonStateStore(path), failure_threshold=1)
+        breaker.record_failure("10.0.0.1", "Sin respuesta", now=0)
+
+        restarted = CircuitBreaker(JsonStateStore(path), failure_threshold=1)
+
+        assert not restarted.allow("10.0.0.1", now=10)
+        assert restarted.state("10.0.0.1").last_error == "Sin respuesta"
+
+    def test_healthy_clocks_are_not_stored(self, tmp_path):
+        """Test que los relojes sanos no ocupan el estado persistente"""
+        store = JsonStateStore(tmp_path / "circuits.json")
+        breaker = CircuitBreaker(store)
+        breaker.record_failure("10.0.0.1", "Sin respuesta", now=0)
+        breaker.record_success("10.0.0.1")
+
+        assert store.items() == {}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para el modulo de ejecucion concurrente
+"""
+import threading
+import time
+
+import pytest
+
+from clockcontrol.utils.concurrency import CancelToken, run_bounded
+
+
+class TestRunBounded:
+    """Tests para run_bounded"""
+
+    def test_empty_items(self):
+        """Test con lista vacia"""
+        assert run_bounded(lambda x: x, [], max_workers=4) == []
+
+    def test_preserves_order(self):
+        """Test que los resultados respetan el orden de entrada"""
+        def slow_first(n):
+            time.sleep(0.05 if n == 0 else 0)
+            return n * 2
+
+        result = run_bounded(slow_first, [0, 1, 2, 3], max_workers=4)
+        assert result == [0, 2, 4, 6]
+
+    def test_runs_concurrently(self):
+        """Test que el tiempo total escala con la tarea mas lenta"""
+        start = time.monotonic()
+        run_bounded(lambda _: time.sleep(0.2), range(5), max_workers=5)
+        assert time.monotonic() - start < 0.6
+
+    def test_deadline_uses_on_timeout(self):
+        """Test que una tarea lenta se reemplaza por on_timeout"""
+        def work(n):
+            if n == 1:
+                time.sleep(1.0)
+            return f"ok-{n}"
+
+        start = time.monotonic()
+        result = run_bounded(
+            work,
+            [0, 1, 2],
+            max_workers=3,
+            deadline=0.2,
+            on_timeout=lambda n: f"timeout-{n}",
+        )
+        assert result == ["ok-0", "timeout-1", "ok-2"]
+        assert time.monotonic() - start < 0.9
+
+    def test_deadline_without_handler_raises(self):
+        """Test que sin on_timeout se lanza TimeoutError"""
+        with pytest.raises(TimeoutError):
+            run_bounded(lambda _: time.sleep(0.5), [1], max_workers=1, deadline=0.1)
+
+    def test_cancel_token_suppresses_late_effects(self):
+        """Test que una tarea abandonada no produce efectos al terminar tarde"""
+        tokens = {item: CancelToken() for item in ("rapido", "lento")}
+        released = threading.Event()
+        finished = threading.Event()
+        effects = []
+
+        def work(item):
+            if item == "lento":
+                released.wait(5)
+            if not tokens[item].cancelled:
+                effects.append(item)
+            if item == "lento":
+                finished.set()
+            return item
+
+        def timed_out(item):
+            tokens[item].cancel()
+            released.set()
+            return "vencido"
+
+        results = run_bounded(work, ["rapido", "lento"], max_workers=2,
+                              deadline=0.2, on_timeout=timed_out)
+
+        assert results == ["rapido", "vencido"]
+        assert finished.wait(5)
+        assert effects == ["rapido"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para el pool de conexiones a base de datos
+"""
+import threading
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+from clockcontrol.core.exceptions import DatabaseError
+from clockcontrol.database import connection
+from clockcontrol.database.connection import ConnectionPool, DatabaseConnection
+
+
+class FakeInfo:
+    """Mock de conn.info"""
+    transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeCursor:
+    """Mock de cursor psycopg2"""
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=None):
+        if self.conn.dead:
+            raise psycopg2.OperationalError("server closed the connection")
+        self.conn.queries.append(query)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class FakeConnection:
+    """Mock de conexion psycopg2"""
+    def __init__(self):
+        self.closed = 0
+        self.dead = False
+        self.info = FakeInfo()
+        self.queries = []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        if self.dead:
+            raise psycopg2.OperationalError("server closed the connection")
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """Reemplaza psycopg2.connect y registra las conexiones abiertas"""
+    conns = []
+
+    def fake_connect(**params):
+        conn = FakeConnection()
+        conns.append(conn)
+        return conn
+
+    monkeypatch.setattr(connection.psycopg2, "connect", fake_connect)
+    return conns
+
+
+class TestConnectionPool:
+    """Tests para ConnectionPool"""
+
+    def test_reuses_connections(self, opened):
+        """Test que varias operaciones comparten una conexion"""
+        db = DatabaseConnection({}, pool_min=1, pool_max=4)
+
+        for _ in range(5):
+            with db.get_cursor() as cur:
+                cur.execute("SELECT 1")
+
+        assert len(opened) == 1
+        assert opened[0].commits == 5
+
+    def test_without_pool_opens_per_operation(self, opened):
+        """Test que sin pool se abre una conexion por operacion"""
+        db = DatabaseConnection({})
+
+        for _ in range(3):
+            with db.get_cursor() as cur:
+                cur.execute("SELECT 1")
+
+        assert len(opened) == 3
+        assert all(conn.closed for conn in opened)
+
+    def test_broken_connection_is_replaced(self, opened):
+        """Test que una conexion rota se descarta y se reconecta"""
+        db = DatabaseConnection({}, pool_min=1, pool_max=2)
+        with db.get_cursor() as cur:
+            cur.execute("SELECT 1")
+        opened[0].dead = True
+
+        with pytest.raises(DatabaseError):
+            with db.get_cursor() as cur:
+                cur.execute("SELECT 1")
+        with db.get_cursor() as cur:
+            cur.execute("SELECT 1")
+
+        assert opened[0].closed
+        assert len(opened) == 2
+
+    def test_health_check_discards_dead_idle_connection(self, opened):
+        """Test que la verificacion descarta conexiones inactivas muertas"""
+        pool = ConnectionPool({}, min_size=1, max_size=2, health_check_interval=0)
+        conn = pool.acquire()
+        pool.release(conn)
+        conn.dead = True
+
+        fresh = pool.acquire()
+
+        assert fresh is not conn
+        assert conn.closed
+
+    def test_blocks_until_connection_is_free(self, opened):
+        """Test que el pool espera cuando todas las conexiones estan en uso"""
+        pool = ConnectionPool({}, min_size=0, max_size=1, acquire_timeout=2)
+        conn = pool.acquire()
+        timer = threading.Timer(0.1, pool.release, args=(conn,))
+        timer.start()
+
+        assert pool.acquire() is conn
+        timer.join()
+
+    def test_exhausted_pool_times_out(self, opened):
+        """Test que el pool agotado lanza DatabaseError"""
+        pool = ConnectionPool({}, min_size=0, max_size=1, acquire_timeout=0.05)
+        pool.acquire()
+
+        with pytest.raises(DatabaseError):
+            pool.acquire()
+
+    def test_close(self, opened):
+        """Test que close cierra las conexiones inactivas"""
+        db = DatabaseConnection({}, pool_min=2, pool_max=2)
+        with db.get_cursor() as cur:
+            cur.execute("SELECT 1")
+
+        db.close()
+
+        assert len(opened) == 2
+        assert all(conn.closed for conn in opened)
+        with pytest.raises(DatabaseError):
+            with db.get_cursor():
+                pass
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para el cache de marcajes ya guardados
+"""
+from datetime import date
+
+import pytest
+
+from clockcontrol.core.attendance import AttendanceMark, MarkBatch
+from clockcontrol.core.dedup import RecentMarksCache
+from clockcontrol.utils.state import JsonStateStore
+
+
+def mark(carnet, date_mark="2026-10-18", time_mark="08:00:00", ip="10.0.0.1"):
+    return AttendanceMark(carnet, date_mark, time_mark, ip, 1)
+
+
+TODAY = date(2026, 10, 18)
+
+
+class TestRecentMarksCache:
+    """Tests para RecentMarksCache"""
+
+    def test_filters_saved_marks(self):
+        """Test que solo pasan los marcajes no confirmados"""
+        cache = RecentMarksCache()
+        cache.add([mark("a"), mark("b")], today=TODAY)
+
+        unseen = cache.filter([mark("a"), mark("b"), mark("c")])
+
+        assert [m.carnet for m in unseen] == ["c"]
+
+    def test_key_includes_clock_and_time(self):
+        """Test que el mismo carnet en otra hora u otro reloj no se filtra"""
+        cache = RecentMarksCache()
+        cache.add([mark("a")], today=TODAY)
+
+        unseen = cache.filter([mark("a", time_mark="17:00:00"), mark("a", ip="10.0.0.2")])
+
+        assert len(unseen) == 2
+
+    def test_filters_mark_batch(self):
+        """Test que un MarkBatch se filtra y sigue siendo MarkBatch"""
+        cache = RecentMarksCache()
+        cache.add([mark("a")], today=TODAY)
+        batch = MarkBatch.from_marks([mark("a"), mark("b")], "10.0.0.1", 1)
+
+        unseen = cache.filter(batch)
+
+        assert isinstance(unseen, MarkBatch)
+        assert unseen.carnets == ["b"]
+        assert unseen.id_reloj_bio == 1
+
+    def test_evicts_dates_outside_window(self):
+        """Test que las fechas fuera de days_back se descartan"""
+        cache = RecentMarksCache(days_back=1)
+        cache.add([mark("a", date_mark="2026-10-16"), mark("b")], today=TODAY)
+
+        assert len(cache) == 1
+        assert len(cache.filter([mark("a", date_mark="2026-10-16")])) == 1
+
+    def test_max_entries_drops_oldest_date(self):
+        """Test que al superar max_entries se descarta la fecha mas antigua"""
+        cache = RecentMarksCache(days_back=1, max_entries=2)
+        cache.add([mark("a", date_mark="2026-10-17"), mark("b")], today=TODAY)
+        cache.add([mark("c")], today=TODAY)
+
+        assert len(cache) == 2
+        assert len(cache.filter([mark("a", date_mark="2026-10-17")])) == 1
+
+    def test_persists_between_runs(self, tmp_path):
+        """Test que el cache sobrevive entre ejecuciones"""
+        path = tmp_path / "recent_marks.json"
+        today = date.today().isoformat()
+        cache = RecentMarksCache(store=JsonStateStore(path))
+        cache.add([mark("a", date_mark=today)])
+        cache.flush()
+
+        restarted = RecentMarksCache(store=JsonStateStore(path))
+
+        assert restarted.filter([mark("a", date_mark=today)]) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para el buffer de logs de conexion
+"""
+import pytest
+
+from clockcontrol.core.exceptions import DatabaseError
+from clockcontrol.database.log_buffer import ConnectionLogBuffer
+
+
+class FakeAttendanceRepository:
+    """Mock de AttendanceRepository que registra los INSERT multi-fila"""
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+
+    def log_connections(self, entries):
+        if self.fail:
+            raise DatabaseError("conexion rechazada")
+        self.batches.append(list(entries))
+        return len(entries)
+
+
+class TestConnectionLogBuffer:
+    """Tests para ConnectionLogBuffer"""
+
+    def setup_method(self):
+        """Setup para cada test"""
+        self.repo = FakeAttendanceRepository()
+
+    def test_flush_single_insert(self, tmp_path):
+        """Test que todos los logs se insertan en un solo lote"""
+        buffer = ConnectionLogBuffer(self.repo, tmp_path / "conn.journal")
+        for i in range(5):
+            buffer.log_connection(f"10.0.0.{i}", i % 2 == 0, "obs")
+
+        assert self.repo.batches == []
+        assert buffer.flush() == 5
+        assert len(self.repo.batches) == 1
+        assert [e.ip_clock for e in self.repo.batches[0]] == [f"10.0.0.{i}" for i in range(5)]
+        assert buffer.pending == 0
+
+    def test_flush_on_max_entries(self):
+        """Test que se hace flush al alcanzar el limite de entradas"""
+        buffer = ConnectionLogBuffer(self.repo, max_entries=3)
+        for i in range(7):
+            buffer.log_connection("10.0.0.1", True, "obs")
+
+        assert [len(b) for b in self.repo.batches] == [3, 3]
+        assert buffer.pending == 1
+
+    def test_flush_due_respects_max_age(self):
+        """Test que flush_due solo inserta cuando las entradas son viejas"""
+        buffer = ConnectionLogBuffer(self.repo, max_age=3600)
+        buffer.log_connection("10.0.0.1", True, "obs")
+
+        assert buffer.flush_due() == 0
+        buffer.max_age = 0
+        assert buffer.flush_due() == 1
+        assert buffer.flush_due() == 0
+
+    def test_failed_flush_keeps_entries(self, tmp_path):
+        """Test que un fallo de DB no pierde entradas"""
+        buffer = ConnectionLogBuffer(self.repo, tmp_path / "conn.journal")
+        buffer.log_connection("10.0.0.1", False, "Sin respuesta")
+        self.repo.fail = True
+
+        assert buffer.flush() == 0
+        assert buffer.pending == 1
+
+        self.repo.fail = False
+        assert buffer.flush() == 1
+
+    def test_crash_recovery_from_journal(self, tmp_path):
+        """Test que las entradas de un proceso caido se recuperan"""
+        journal = tmp_path / "conn.journal"
+        crashed = ConnectionLogBuffer(self.repo, journal)
+        crashed.log_connection("10.0.0.1", True, "Reloj accesible")
+        crashed.log_connection("10.0.0.2", False, "Sin respuesta")
+        # Simula caida: sin flush ni close
+
+        recovered = ConnectionLogBuffer(self.repo, journal)
+
+        assert recovered.pending == 2
+        assert recovered.flush() == 2
+        assert self.repo.batches[0][1].observation == "Sin respuesta"
+        assert journal.read_text() == ""
+
+    def test_truncated_journal_line_is_ignored(self, tmp_path):
+        """Test que una linea truncada del journal se ignora"""
+        journal = tmp_path / "conn.journal"
+        buffer = ConnectionLogBuffer(self.repo, journal)
+        buffer.log_connection("10.0.0.1", True, "ok")
+        with open(journal, "a") as f:
+            f.write('{"ip": "10.0.0.2", "avail')
+
+        assert ConnectionLogBuffer(self.repo, journal).pending == 1
+
+    def test_observation_truncated(self):
+        """Test que la observacion se limita a 255 caracteres"""
+        buffer = ConnectionLogBuffer(self.repo)
+        buffer.log_connection("10.0.0.1", False, "x" * 300)
+        buffer.flush()
+
+        assert len(self.repo.batches[0][0].observation) == 255
+
+    def test_timestamps_are_timezone_aware(self, tmp_path):
+        """Test que los logs llevan zona horaria, tambien al recuperarse del journal"""
+        journal = tmp_path / "conn.journal"
+        ConnectionLogBuffer(self.repo, journal).log_connection("10.0.0.1", True, "obs")
+
+        recovered = ConnectionLogBuffer(self.repo, journal)
+        recovered.flush()
+
+        assert self.repo.batches[0][0].timestamp.utcoffset() is not None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para los tiempos por etapa y la exportación de métricas
+"""
+import json
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from typing import Optional
+
+import pytest
+
+from clockcontrol.utils import metrics
+from clockcontrol.utils.metrics import CollectorMetrics, MetricsServer, Spans, SweepReport
+
+
+@dataclass
+class Result:
+    """Resultado con los campos de ProcessResult que usan las métricas"""
+    clock_ip: str
+    success: bool = True
+    marks_processed: int = 0
+    marks_saved: int = 0
+    error: Optional[str] = None
+    elapsed_time: float = 0.0
+    spans: Spans = field(default_factory=Spans)
+
+
+class TestSpans:
+    """Tests para span, count y recording"""
+
+    def test_records_in_active_spans(self):
+        """Test que las etapas y contadores se registran en la medición activa"""
+        spans = Spans()
+        with metrics.recording(spans):
+            with metrics.span("download"):
+                time.sleep(0.01)
+            metrics.count("records", 10)
+            metrics.count("records", 5)
+
+        assert spans.seconds["download"] >= 0.01
+        assert spans.counts == {"records": 15}
+
+    def test_nested_stage_is_not_counted_twice(self):
+        """Test que la etapa contenedora registra solo su tiempo propio"""
+        spans = Spans()
+        with metrics.recording(spans):
+            with metrics.span("save"):
+                with metrics.span("serialize"):
+                    time.sleep(0.05)
+
+        assert spans.seconds["serialize"] >= 0.05
+        assert spans.seconds["save"] < 0.04
+
+    def test_without_recording_is_noop(self):
+        """Test que sin medición activa no se registra nada"""
+        with metrics.span("parse"):
+            metrics.count("bytes", 1)
+
+    def test_merge_share(self):
+        """Test que una escritura agrupada se reparte entre relojes"""
+        group = Spans({"save": 1.0}, {"bytes": 100})
+        spans = Spans()
+
+        spans.merge(group, share=0.25)
+
+        assert spans.seconds == {"save": 0.25}
+        assert spans.counts == {"bytes": 25}
+
+
+class TestReportAndExport:
+    """Tests para SweepReport y CollectorMetrics"""
+
+    def make_report(self):
+        results = [
+            Result("10.0.0.1", marks_processed=3, marks_saved=2, elapsed_time=1.0,
+                   spans=Spans({"download": 0.8, "save": 0.1}, {"records": 30})),
+            Result("10.0.0.2", success=False, error="timeout", elapsed_time=1.0,
+                   spans=Spans({"connect": 1.0})),
+        ]
+        return SweepReport(results, wall_time=1.2, spans=Spans({"probe": 0.2}))
+
+    def test_report_uses_wall_time_and_stage_totals(self, tmp_path):
+        """Test que el reporte JSON tiene tiempo real y totales por etapa"""
+        path = tmp_path / "report.json"
+
+        self.make_report().write_json(path)
+        data = json.loads(path.read_text())
+
+        assert data["wall_time"] == 1.2
+        assert data["successful"] == 1
+        assert list(data["stage_totals"]) == ["probe", "connect", "download", "save"]
+        assert data["results"][0]["counts"] == {"records": 30}
+
+    def test_render_prometheus(self, tmp_path):
+        """Test del formato de texto de Prometheus"""
+        collector = CollectorMetrics()
+        collector.observe_sweep(self.make_report())
+        path = tmp_path / "clockcontrol.prom"
+
+        collector.write_textfile(path)
+        text = path.read_text()
+
+        assert 'clockcontrol_clocks_processed_total{status="error"} 1' in text
+        assert 'clockcontrol_stage_seconds_total{stage="download"} 0.800000' in text
+        assert 'clockcontrol_clock_stage_seconds{clock="10.0.0.2",stage="connect"} 1.000000' in text
+        assert "clockcontrol_records_downloaded_total 30" in text
+        assert "clockcontrol_sweep_duration_seconds 1.200000" in text
+
+    def test_metrics_endpoint(self):
+        """Test del endpoint /metrics"""
+        collector = CollectorMetrics()
+        collector.observe(Result("10.0.0.1"))
+        server = MetricsServer(collector, port=0)
+        server.start()
+        try:
+            url = f"http://127.0.0.1:{server.port}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                body = response.read().decode()
+        finally:
+            server.close()
+
+        assert 'clockcontrol_clock_success{clock="10.0.0.1"} 1' in body
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para el pipeline por etapas del barrido
+"""
+import threading
+import time
+
+import pytest
+
+from clockcontrol.utils.pipeline import StagedPipeline
+
+
+class TestStagedPipeline:
+    """Tests para StagedPipeline"""
+
+    def test_all_items_reach_persist(self):
+        """Test que cada elemento pasa por las tres etapas"""
+        persisted = []
+
+        pipeline = StagedPipeline(
+            fetch=lambda n: n,
+            parse=lambda n: n * 10,
+            persist=persisted.extend,
+            max_workers=4,
+        )
+        pipeline.run(range(20))
+
+        assert sorted(persisted) == [n * 10 for n in range(20)]
+
+    def test_none_stops_item(self):
+        """Test que fetch o parse devolviendo None descartan el elemento"""
+        persisted = []
+
+        pipeline = StagedPipeline(
+            fetch=lambda n: None if n == 1 else n,
+            parse=lambda n: None if n == 2 else n,
+            persist=persisted.extend,
+        )
+        pipeline.run([1, 2, 3])
+
+        assert persisted == [3]
+
+    def test_persist_merges_waiting_items(self):
+        """Test que persist agrupa lo acumulado hasta merge_size unidades"""
+        groups = []
+        release = threading.Event()
+
+        def persist(group):
+            release.wait(5)
+            groups.append(list(group))
+
+        pipeline = StagedPipeline(
+            fetch=lambda n: n,
+            parse=lambda n: n,
+            persist=persist,
+            queue_size=100,
+            merge_size=4,
+        )
+        thread = threading.Thread(target=pipeline.run, args=(range(9),))
+        thread.start()
+        time.sleep(0.2)
+        release.set()
+        thread.join(timeout=5)
+
+        assert sorted(n for group in groups for n in group) == list(range(9))
+        assert all(len(group) <= 4 for group in groups)
+        # Mientras el primer guardado esperaba, el resto se acumuló
+        assert len(groups) <= 4
+
+    def test_linger_none_writes_once(self):
+        """Test que sin limite de linger todo el barrido se guarda en una llamada"""
+        groups = []
+
+        def fetch(n):
+            time.sleep(0.01 * n)
+            return n
+
+        pipeline = StagedPipeline(
+            fetch=fetch,
+            parse=lambda n: n,
+            persist=lambda group: groups.append(sorted(group)),
+            max_workers=2,
+            linger=None,
+        )
+        pipeline.run(range(6))
+
+        assert groups == [list(range(6))]
+
+    def test_backpressure_limits_fetched_items(self):
+        """Test que con persist lento fetch espera en lugar de acumular"""
+        fetched = []
+        release = threading.Event()
+
+        pipeline = StagedPipeline(
+            fetch=lambda n: fetched.append(n) or n,
+            parse=lambda n: n,
+            persist=lambda group: release.wait(5),
+            max_workers=2,
+            queue_size=2,
+            merge_size=1,
+        )
+        thread = threading.Thread(target=pipeline.run, args=(range(50),))
+        thread.start()
+        time.sleep(0.3)
+        in_flight = len(fetched)
+        release.set()
+        thread.join(timeout=5)
+
+        # Un lote en persist, colas de 2, uno por hilo de parse y fetch
+        assert in_flight <= 1 + 2 + 1 + 2 + 2
+        assert len(fetched) == 50
+
+    def test_slow_fetch_times_out(self):
+        """Test que una descarga que excede el límite se reporta y no se guarda"""
+        persisted = []
+        expired = []
+
+        def fetch(n):
+            if n == "slow":
+                time.sleep(1.5)
+            return n
+
+        pipeline = StagedPipeline(
+            fetch=fetch,
+            parse=lambda n: n,
+            persist=persisted.extend,
+            deadline=0.2,
+            on_timeout=expired.append,
+        )
+        pipeline.run(["fast", "slow"])
+        time.sleep(1.5)
+
+        assert expired == ["slow"]
+        assert persisted == ["fast"]
+
+    def test_queue_wait_does_not_count_as_timeout(self):
+        """Test que esperar lugar en la cola no vence el límite de descarga"""
+        persisted = []
+        expired = []
+
+        def persist(group):
+            time.sleep(0.1)
+            persisted.extend(group)
+
+        pipeline = StagedPipeline(
+            fetch=lambda n: n,
+            parse=lambda n: n,
+            persist=persist,
+            max_workers=4,
+            queue_size=1,
+            merge_size=1,
+            deadline=0.15,
+            on_timeout=expired.append,
+        )
+        pipeline.run(range(6))
+
+        assert expired == []
+        assert sorted(persisted) == list(range(6))
+
+    def test_stage_errors_do_not_stop_pipeline(self):
+        """Test que un error en parse o persist no detiene al resto"""
+        persisted = []
+
+        def parse(n):
+            if n == 0:
+                raise ValueError("dato inválido")
+            return n
+
+        def persist(group):
+            if 1 in group:
+                raise RuntimeError("fallo de escritura")
+            persisted.extend(group)
+
+        pipeline = StagedPipeline(
+            fetch=lambda n: n,
+            parse=parse,
+            persist=persist,
+            merge_size=1,
+        )
+        pipeline.run([0, 1, 2])
+
+        assert persisted == [2]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
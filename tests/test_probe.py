@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para el sondeo de accesibilidad de relojes
+"""
+import socket
+import struct
+import threading
+
+import pytest
+
+from clockcontrol.core.probe import CMD_ACK_OK, CMD_CONNECT, CMD_EXIT, _zk_packet, probe_many
+
+
+def closed_port() -> int:
+    """Obtiene un puerto local sin servicio escuchando"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class FakeUdpClock:
+    """Reloj ZK falso que responde CMD_CONNECT por UDP"""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(2)
+        self.port = self.sock.getsockname()[1]
+        self.commands = []
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        try:
+            data, addr = self.sock.recvfrom(1024)
+            self.commands.append(struct.unpack("<4H", data[:8])[0])
+            self.sock.sendto(struct.pack("<4H", CMD_ACK_OK, 0, 42, 0), addr)
+            data, _ = self.sock.recvfrom(1024)
+            self.commands.append(struct.unpack("<4H", data[:8])[0])
+        except socket.timeout:
+            pass
+        finally:
+            self.sock.close()
+
+
+class TestZkPacket:
+    """Tests para el armado de paquetes ZK"""
+
+    def test_connect_packet_matches_pyzk(self):
+        """Test que CMD_CONNECT coincide con el header que arma pyzk"""
+        assert _zk_packet(CMD_CONNECT).hex() == "e80317fc00000000"
+
+    def test_exit_packet_matches_pyzk(self):
+        """Test que CMD_EXIT con sesion coincide con pyzk"""
+        assert _zk_packet(CMD_EXIT, 1234, 5).hex() == "e9033ef7d2040600"
+
+
+class TestProbeMany:
+    """Tests para probe_many"""
+
+    def test_empty_targets(self):
+        """Test sin relojes"""
+        assert probe_many([]) == {}
+
+    def test_tcp_open_port(self):
+        """Test que un puerto TCP abierto es accesible"""
+        with socket.socket() as server:
+            server.bind(("127.0.0.1", 0))
+            server.listen()
+            port = server.getsockname()[1]
+
+            result = probe_many([("127.0.0.1", port)], timeout=1.0, protocol="tcp")
+
+        assert result == {"127.0.0.1": True}
+
+    def test_closed_port_is_unreachable(self):
+        """Test que un puerto cerrado no es accesible"""
+        result = probe_many([("127.0.0.1", closed_port())], timeout=1.0)
+        assert result == {"127.0.0.1": False}
+
+    def test_udp_clock_opens_and_closes_session(self):
+        """Test que el sondeo UDP cierra la sesion que abre"""
+        clock = FakeUdpClock()
+
+        result = probe_many([("127.0.0.1", clock.port)], timeout=1.0, protocol="udp")
+        clock.thread.join(timeout=3)
+
+        assert result == {"127.0.0.1": True}
+        assert clock.commands == [CMD_CONNECT, CMD_EXIT]
+
+    def test_invalid_protocol(self):
+        """Test con protocolo invalido"""
+        with pytest.raises(ValueError):
+            probe_many([("127.0.0.1", 4370)], protocol="icmp")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para el perfilado de barridos (--profile)
+"""
+import pstats
+import threading
+import time
+
+import pytest
+
+from clockcontrol.utils.profiling import Profiler
+
+
+def busy_worker(seconds=0.05):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+
+class TestProfiler:
+    """Tests para Profiler"""
+
+    def test_profiles_worker_threads(self, tmp_path):
+        """Test que el perfil incluye las funciones de los hilos creados durante el bloque"""
+        profiler = Profiler(tmp_path, "test")
+        with profiler:
+            threads = [threading.Thread(target=busy_worker) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        stats = pstats.Stats(str(profiler.pstats_path))
+        calls = {
+            func[2]: values[1] for func, values in stats.stats.items()
+        }
+        assert calls["busy_worker"] == 3
+
+    def test_writes_collapsed_stacks(self, tmp_path):
+        """Test del archivo de pilas para flamegraph (una pila por línea y su cuenta)"""
+        profiler = Profiler(tmp_path, "test", interval=0.001)
+        with profiler:
+            busy_worker(0.1)
+
+        lines = profiler.collapsed_path.read_text().splitlines()
+        assert lines
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) >= 1
+        assert any(line.startswith("MainThread;") and "busy_worker" in line for line in lines)
+
+    def test_report_lists_top_functions(self, tmp_path):
+        """Test que el reporte muestra las funciones por tiempo acumulado"""
+        profiler = Profiler(tmp_path, "test")
+        with profiler:
+            busy_worker()
+
+        report = profiler.report(top=5)
+
+        assert "cumulative" in report
+        assert "busy_worker" in report
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
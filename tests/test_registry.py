@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para el registro de relojes en memoria
+"""
+from contextlib import contextmanager
+
+import pytest
+
+from clockcontrol.database.models import Clock
+from clockcontrol.database.registry import ClockRegistry
+from clockcontrol.database.repositories import ClockRepository
+
+
+class FakeClockRepository:
+    """Mock de ClockRepository que cuenta consultas"""
+    def __init__(self, clocks):
+        self.clocks = clocks
+        self.extra = {}
+        self.calls = {"get_all_active": 0, "get_by_ip": 0}
+
+    def get_all_active(self):
+        self.calls["get_all_active"] += 1
+        return list(self.clocks)
+
+    def get_by_ip(self, ip):
+        self.calls["get_by_ip"] += 1
+        return self.extra.get(ip)
+
+
+def make_clock(clock_id: int, ip: str) -> Clock:
+    """Crea un reloj de prueba"""
+    return Clock(id=clock_id, ip=ip, port=4370, password="0")
+
+
+class TestClockRegistry:
+    """Tests para ClockRegistry"""
+
+    def setup_method(self):
+        """Setup para cada test"""
+        self.repo = FakeClockRepository(
+            [make_clock(1, "10.0.0.1"), make_clock(2, "10.0.0.2")]
+        )
+
+    def test_single_query_per_sweep(self):
+        """Test que un barrido hace una sola consulta al registro"""
+        registry = ClockRegistry(self.repo, ttl=300)
+
+        clocks = registry.all_active(refresh=True)
+        for clock in clocks:
+            assert registry.get(clock.ip) == clock
+
+        assert self.repo.calls == {"get_all_active": 1, "get_by_ip": 0}
+
+    def test_ttl_expiry_reloads(self):
+        """Test que la cache expirada se recarga"""
+        registry = ClockRegistry(self.repo, ttl=0)
+
+        registry.get("10.0.0.1")
+        registry.get("10.0.0.1")
+
+        assert self.repo.calls["get_all_active"] == 2
+
+    def test_unknown_ip_falls_back_to_query(self):
+        """Test que una IP nueva se consulta directamente y se cachea"""
+        registry = ClockRegistry(self.repo, ttl=300)
+        registry.all_active()
+        self.repo.extra["10.0.0.3"] = make_clock(3, "10.0.0.3")
+
+        assert registry.get("10.0.0.3").id == 3
+        assert registry.get("10.0.0.3").id == 3
+        assert self.repo.calls["get_by_ip"] == 1
+
+    def test_unknown_inactive_ip(self):
+        """Test que una IP inexistente devuelve None"""
+        registry = ClockRegistry(self.repo, ttl=300)
+        assert registry.get("10.9.9.9") is None
+
+    def test_invalidate(self):
+        """Test que invalidate fuerza la recarga"""
+        registry = ClockRegistry(self.repo, ttl=300)
+        registry.all_active()
+        registry.invalidate()
+        registry.all_active()
+
+        assert self.repo.calls["get_all_active"] == 2
+
+
+class TestClockFromRecord:
+    """Tests para Clock.from_record"""
+
+    def test_explicit_columns(self):
+        """Test de creacion desde columnas explicitas"""
+        clock = Clock.from_record((7, "10.0.0.7", 1234, 4371))
+
+        assert clock == Clock(id=7, ip="10.0.0.7", port=4371, password="1234")
+
+    def test_null_defaults(self):
+        """Test de valores por defecto con columnas nulas"""
+        clock = Clock.from_record((7, "10.0.0.7", None, None))
+
+        assert clock.port == 4370
+        assert clock.password == "0"
+
+
+class RecordingDB:
+    """Mock de DatabaseConnection que guarda las consultas"""
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    @contextmanager
+    def get_cursor(self):
+        db = self
+
+        class Cursor:
+            def execute(self, query, params=None):
+                db.queries.append(" ".join(query.split()))
+
+            def fetchall(self):
+                return db.rows
+
+            def fetchone(self):
+                return db.rows[0] if db.rows else None
+
+        yield Cursor()
+
+
+class TestClockRepository:
+    """Tests para las consultas de ClockRepository"""
+
+    def test_select_uses_table_columns(self):
+        """Test que se leen las columnas reales de rrhh.reloj_biometrico"""
+        db = RecordingDB([(89, "172.16.21.150", 0, 4370)])
+
+        clocks = ClockRepository(db).get_all_active()
+        ClockRepository(db).get_by_ip("172.16.21.150")
+
+        assert clocks == [Clock(id=89, ip="172.16.21.150", port=4370, password="0")]
+        for query in db.queries:
+            assert query.startswith(
+                "SELECT id_reloj_bio, ip_reloj, clave, puerto FROM rrhh.reloj_biometrico"
+            )
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
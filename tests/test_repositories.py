@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para el guardado de marcajes
+"""
+from contextlib import contextmanager
+
+import pytest
+
+from clockcontrol.core.attendance import AttendanceMark, MarkBatch
+from clockcontrol.core.exceptions import DatabaseError
+from clockcontrol.database.repositories import AttendanceRepository
+from clockcontrol.utils import metrics
+from clockcontrol.utils.metrics import Spans
+
+
+class FakeCursor:
+    """Mock de cursor psycopg2 que registra el COPY y devuelve insertados por reloj"""
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = db.rowcount
+
+    def execute(self, query, params=None):
+        self.db.queries.append(query)
+
+    def callproc(self, name, args):
+        self.db.queries.append(name)
+
+    def copy_expert(self, sql, buffer):
+        self.db.copied.append(buffer.read())
+
+    def fetchone(self):
+        return self.db.rows[0] if self.db.rows else None
+
+    def fetchall(self):
+        return self.db.rows
+
+
+class FakeDB:
+    """Mock de DatabaseConnection"""
+    def __init__(self, rows=(), rowcount=0):
+        self.rows = list(rows)
+        self.rowcount = rowcount
+        self.queries = []
+        self.copied = []
+        self.cursors = 0
+
+    @contextmanager
+    def get_cursor(self):
+        self.cursors += 1
+        yield FakeCursor(self)
+
+
+class TestSaveMarks:
+    """Tests para AttendanceRepository.save_marks (stored procedure)"""
+
+    def test_returns_inserted(self):
+        """Test que devuelve los insertados informados por el stored procedure"""
+        db = FakeDB(rows=[(1, "ok", 3)])
+
+        assert AttendanceRepository(db).save_marks(1, "[]") == 3
+        assert db.queries == ["rrhh.set_attendance_info_clock"]
+
+    def test_all_duplicates_returns_zero(self):
+        """Test que -100 'NO SE INSERTARON REGISTROS' (ya existían todos) no es un error"""
+        db = FakeDB(rows=[(-100, "NO SE INSERTARON REGISTROS", 0)])
+
+        assert AttendanceRepository(db).save_marks(1, "[]") == 0
+
+    def test_procedure_error_raises(self):
+        """Test que un error del stored procedure no se confunde con 0 nuevos"""
+        db = FakeDB(rows=[(
+            -100,
+            'NULL VALUE IN COLUMN "CARNET" VIOLATES NOT-NULL CONSTRAINT. CÓDIGO ESTADO:23502',
+            0,
+        )])
+
+        with pytest.raises(DatabaseError, match="-100"):
+            AttendanceRepository(db).save_marks(1, "[]")
+
+    def test_missing_result_raises(self):
+        """Test que un stored procedure sin respuesta no se toma como guardado"""
+        db = FakeDB()
+
+        with pytest.raises(DatabaseError):
+            AttendanceRepository(db).save_marks(1, "[]")
+
+    def test_invalid_json_raises(self):
+        """Test que un JSON invalido no llega a la base de datos"""
+        db = FakeDB()
+
+        with pytest.raises(DatabaseError):
+            AttendanceRepository(db).save_marks(1, "[{")
+        assert db.cursors == 0
+
+
+class TestSaveMarksCopy:
+    """Tests para AttendanceRepository.save_marks_copy"""
+
+    def test_copy_and_insert(self):
+        """Test que los marcajes van por COPY a staging y un INSERT con ON CONFLICT"""
+        db = FakeDB(rowcount=1)
+        batch = MarkBatch("10.0.0.1", 1)
+        batch.append("a", "2026-10-18", "08:00:00")
+        batch.append("a", "2026-10-18", "08:00:00")
+
+        inserted = AttendanceRepository(db).save_marks_copy(batch)
+
+        assert inserted == 1
+        assert db.copied == ["a,2026-10-18,08:00:00,10.0.0.1,1\n" * 2]
+        insert = " ".join(db.queries[-1].split())
+        assert insert.startswith("INSERT INTO rrhh.person_marks")
+        assert insert.endswith(
+            "ON CONFLICT (date_mark, time_mark, ip_clock, carnet) DO NOTHING"
+        )
+        assert "NOT EXISTS" not in insert
+
+    def test_counts_utf8_bytes(self):
+        """Test que los bytes enviados se cuentan en UTF-8, no en caracteres"""
+        db = FakeDB(rowcount=1)
+        marks = [AttendanceMark("Ñuñez", "2026-10-18", "08:00:00", "10.0.0.1", 1)]
+        spans = Spans()
+
+        with metrics.recording(spans):
+            AttendanceRepository(db).save_marks_copy(marks)
+
+        assert spans.counts["bytes"] == len(db.copied[0].encode("utf-8"))
+        assert spans.counts["bytes"] > len(db.copied[0])
+
+    def test_empty_skips_database(self):
+        """Test que sin marcajes no se abre conexion"""
+        db = FakeDB()
+
+        assert AttendanceRepository(db).save_marks_copy([]) == 0
+        assert db.cursors == 0
+
+
+class TestSaveMarksMany:
+    """Tests para AttendanceRepository.save_marks_many"""
+
+    def test_one_round_trip_for_all_clocks(self):
+        """Test que todos los relojes van en un COPY y un INSERT"""
+        db = FakeDB(rows=[(1, 2), (2, 1)])
+        first = MarkBatch("10.0.0.1", 1)
+        first.append("a", "2026-10-18", "08:00:00")
+        first.append("b", "2026-10-18", "08:01:00")
+        second = [AttendanceMark("c", "2026-10-18", "08:02:00", "10.0.0.2", 2)]
+
+        inserted = AttendanceRepository(db).save_marks_many([first, second])
+
+        assert inserted == {1: 2, 2: 1}
+        assert db.cursors == 1
+        assert db.copied == [
+            "a,2026-10-18,08:00:00,10.0.0.1,1\n"
+            "b,2026-10-18,08:01:00,10.0.0.1,1\n"
+            "c,2026-10-18,08:02:00,10.0.0.2,2\n"
+        ]
+        assert "GROUP BY id_reloj_bio" in db.queries[-1]
+
+    def test_empty_batches_skip_database(self):
+        """Test que sin marcajes no se abre conexion"""
+        db = FakeDB()
+
+        assert AttendanceRepository(db).save_marks_many([[], MarkBatch("10.0.0.1", 1)]) == {}
+        assert db.cursors == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para el planificador del modo serve
+"""
+import threading
+import time
+from collections import namedtuple
+
+import pytest
+
+from clockcontrol.core.scheduler import PollScheduler
+
+
+FakeClock = namedtuple("FakeClock", ["ip"])
+
+
+def submit_all(clocks, submit, work):
+    """poll_batch que encola work(clock) para cada reloj"""
+    for clock in clocks:
+        submit(clock, lambda clock=clock: work(clock))
+
+
+def run_for(scheduler, seconds):
+    """Ejecuta el planificador en un hilo y lo detiene tras unos segundos"""
+    thread = threading.Thread(target=scheduler.run)
+    thread.start()
+    time.sleep(seconds)
+    scheduler.stop()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+
+class TestPollScheduler:
+    """Tests para PollScheduler"""
+
+    def test_per_clock_interval(self):
+        """Test que cada reloj se sondea segun su propio intervalo"""
+        calls = {"fast": 0, "slow": 0}
+        lock = threading.Lock()
+
+        def work(clock):
+            with lock:
+                calls[clock.ip] += 1
+
+        intervals = {"fast": 0.05, "slow": 10.0}
+        scheduler = PollScheduler(
+            list_clocks=lambda: [FakeClock("fast"), FakeClock("slow")],
+            poll_batch=lambda clocks, submit: submit_all(clocks, submit, work),
+            interval_for=lambda clock: intervals[clock.ip],
+            max_sleep=0.01,
+        )
+        run_for(scheduler, 0.5)
+
+        assert calls["slow"] == 1
+        assert calls["fast"] >= 4
+
+    def test_same_clock_never_overlaps(self):
+        """Test que un sondeo lento no se superpone con el siguiente"""
+        running = []
+        overlaps = []
+
+        def work(clock):
+            if running:
+                overlaps.append(clock.ip)
+            running.append(clock.ip)
+            time.sleep(0.1)
+            running.pop()
+
+        scheduler = PollScheduler(
+            list_clocks=lambda: [FakeClock("10.0.0.1")],
+            poll_batch=lambda clocks, submit: submit_all(clocks, submit, work),
+            interval_for=lambda clock: 0,
+            max_workers=4,
+            max_sleep=0.01,
+        )
+        run_for(scheduler, 0.5)
+
+        assert overlaps == []
+
+    def test_stop_waits_for_in_flight(self):
+        """Test que stop espera a que terminen los sondeos en curso"""
+        finished = []
+
+        def work(clock):
+            time.sleep(0.2)
+            finished.append(clock.ip)
+
+        scheduler = PollScheduler(
+            list_clocks=lambda: [FakeClock("10.0.0.1")],
+            poll_batch=lambda clocks, submit: submit_all(clocks, submit, work),
+            interval_for=lambda clock: 60,
+            max_sleep=0.01,
+        )
+        run_for(scheduler, 0.05)
+
+        assert finished == ["10.0.0.1"]
+
+    def test_failing_poll_is_rescheduled(self):
+        """Test que un error no controlado no saca al reloj de la planificacion"""
+        attempts = []
+
+        def work(clock):
+            attempts.append(clock.ip)
+            raise RuntimeError("fallo")
+
+        scheduler = PollScheduler(
+            list_clocks=lambda: [FakeClock("10.0.0.1")],
+            poll_batch=lambda clocks, submit: submit_all(clocks, submit, work),
+            interval_for=lambda clock: 0.02,
+            max_sleep=0.01,
+        )
+        run_for(scheduler, 0.3)
+
+        assert len(attempts) >= 3
+        assert scheduler.in_flight == set()
+
+    def test_removed_clock_is_not_polled(self):
+        """Test que un reloj dado de baja deja de sondearse al recargar"""
+        active = [FakeClock("10.0.0.1"), FakeClock("10.0.0.2")]
+        polled = []
+
+        scheduler = PollScheduler(
+            list_clocks=lambda: list(active),
+            poll_batch=lambda clocks, submit: submit_all(clocks, submit, lambda c: polled.append(c.ip)),
+            interval_for=lambda clock: 0.02,
+            refresh_interval=0.05,
+            max_sleep=0.01,
+        )
+        thread = threading.Thread(target=scheduler.run)
+        thread.start()
+        time.sleep(0.1)
+        active.pop()
+        time.sleep(0.1)
+        polled.clear()
+        time.sleep(0.2)
+        scheduler.stop()
+        thread.join(timeout=5)
+
+        assert "10.0.0.1" in polled
+        assert "10.0.0.2" not in polled
+
+    def test_initial_delay(self):
+        """Test que initial_delay posterga el primer sondeo de un reloj"""
+        polled = []
+
+        scheduler = PollScheduler(
+            list_clocks=lambda: [FakeClock("dead"), FakeClock("alive")],
+            poll_batch=lambda clocks, submit: submit_all(clocks, submit, lambda c: polled.append(c.ip)),
+            interval_for=lambda clock: 60,
+            initial_delay=lambda clock: 60 if clock.ip == "dead" else 0,
+            max_sleep=0.01,
+        )
+        run_for(scheduler, 0.2)
+
+        assert polled == ["alive"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para las sesiones persistentes con relojes
+"""
+import threading
+
+import pytest
+
+from clockcontrol.core.exceptions import DatabaseError, DeviceConnectionError
+from clockcontrol.core.sessions import DeviceSessionManager
+
+
+class FakeConn:
+    """Mock de conexion pyzk"""
+    def __init__(self):
+        self.alive = True
+        self.disconnected = False
+
+    def get_time(self):
+        if not self.alive:
+            raise OSError("timed out")
+
+
+class FakeDevice:
+    """Mock de ZKDeviceManager que cuenta los handshakes"""
+    def __init__(self, ip, port=4370):
+        self.ip = ip
+        self.port = port
+        self.opened = []
+        self.fail = False
+
+    def open(self, retries=2, delay=2.0):
+        if self.fail:
+            raise DeviceConnectionError(f"No se pudo conectar a {self.ip}")
+        conn = FakeConn()
+        self.opened.append(conn)
+        return conn
+
+    def disconnect(self, conn):
+        conn.disconnected = True
+
+    def is_alive(self, conn):
+        try:
+            conn.get_time()
+            return True
+        except Exception:
+            return False
+
+
+class TestDeviceSessionManager:
+    """Tests para DeviceSessionManager"""
+
+    def test_session_is_reused(self):
+        """Test que varios sondeos comparten un solo handshake"""
+        sessions = DeviceSessionManager()
+        device = FakeDevice("10.0.0.1")
+
+        for _ in range(3):
+            with sessions.session(device) as conn:
+                assert conn is device.opened[0]
+
+        assert len(device.opened) == 1
+        assert sessions.open_count == 1
+
+    def test_dead_session_reconnects(self):
+        """Test que una sesion caida se reconecta de forma transparente"""
+        sessions = DeviceSessionManager()
+        device = FakeDevice("10.0.0.1")
+        with sessions.session(device):
+            pass
+        device.opened[0].alive = False
+
+        with sessions.session(device) as conn:
+            assert conn is device.opened[1]
+
+        assert device.opened[0].disconnected
+
+    def test_device_error_drops_session(self):
+        """Test que un error del dispositivo cierra la sesion"""
+        sessions = DeviceSessionManager()
+        device = FakeDevice("10.0.0.1")
+
+        with pytest.raises(OSError):
+            with sessions.session(device):
+                raise OSError("connection reset")
+
+        assert device.opened[0].disconnected
+        assert sessions.open_count == 0
+
+    def test_application_error_keeps_session(self):
+        """Test que un error de base de datos no cierra la sesion"""
+        sessions = DeviceSessionManager()
+        device = FakeDevice("10.0.0.1")
+
+        with pytest.raises(DatabaseError):
+            with sessions.session(device):
+                raise DatabaseError("timeout")
+
+        assert sessions.open_count == 1
+
+    def test_backoff_after_failure(self):
+        """Test que tras un fallo no se reintenta hasta cumplir la espera"""
+        sessions = DeviceSessionManager(backoff_base=60)
+        device = FakeDevice("10.0.0.1")
+        device.fail = True
+
+        with pytest.raises(DeviceConnectionError):
+            with sessions.session(device):
+                pass
+        device.fail = False
+        with pytest.raises(DeviceConnectionError, match="en espera"):
+            with sessions.session(device):
+                pass
+
+        assert device.opened == []
+
+    def test_lru_eviction_at_limit(self):
+        """Test que al llegar al limite se cierra la sesion menos reciente"""
+        sessions = DeviceSessionManager(max_sessions=2)
+        devices = [FakeDevice(f"10.0.0.{i}") for i in range(3)]
+
+        for device in devices:
+            with sessions.session(device):
+                pass
+
+        assert sessions.open_count == 2
+        assert devices[0].opened[0].disconnected
+        assert not devices[2].opened[0].disconnected
+
+    def test_prune_and_close(self):
+        """Test que prune cierra sesiones inactivas y close las restantes"""
+        sessions = DeviceSessionManager(idle_timeout=0)
+        device = FakeDevice("10.0.0.1")
+        with sessions.session(device):
+            pass
+
+        assert sessions.prune() == 1
+        with sessions.session(device):
+            pass
+        sessions.close()
+
+        assert all(conn.disconnected for conn in device.opened)
+        with pytest.raises(DeviceConnectionError):
+            with sessions.session(device):
+                pass
+
+
+    def test_hung_disconnect_does_not_block_others(self):
+        """Test que un reloj colgado al desconectar no bloquea las sesiones de los demas"""
+        sessions = DeviceSessionManager(idle_timeout=0)
+        hung = FakeDevice("10.0.0.1")
+        release = threading.Event()
+        hung.disconnect = lambda conn: release.wait(5)
+        with sessions.session(hung):
+            pass
+
+        pruning = threading.Thread(target=sessions.prune)
+        pruning.start()
+        try:
+            other = FakeDevice("10.0.0.2")
+            done = threading.Event()
+
+            def use_other():
+                with sessions.session(other):
+                    done.set()
+
+            threading.Thread(target=use_other, daemon=True).start()
+            assert done.wait(1)
+            assert pruning.is_alive()
+        finally:
+            release.set()
+            pruning.join()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para el reparto de relojes entre recolectores (sharding)
+"""
+import math
+from contextlib import contextmanager
+
+import pytest
+
+from clockcontrol.config.settings import Settings
+from clockcontrol.core.exceptions import ConfigurationError, DatabaseError
+from clockcontrol.database.models import Clock, LeaseAssignment
+from clockcontrol.database.repositories import LeaseRepository
+from clockcontrol.database.sharding import ShardCoordinator
+
+
+CLOCKS = [Clock(id=i, ip=f"10.0.0.{i}", port=4370, password="0") for i in range(1, 11)]
+
+
+class FakeLeases:
+    """
+    rrhh.clock_lease y rrhh.collector_heartbeat en memoria, con la misma
+    lógica que LeaseRepository y un reloj manual
+    """
+    def __init__(self, clock_ids):
+        self.clock_ids = list(clock_ids)
+        self.now = 0.0
+        self.heartbeats = {}
+        self.leases = {}
+        self.fail = False
+
+    def claim_share(self, collector_id, ttl):
+        if self.fail:
+            raise DatabaseError("sin conexion")
+        self.heartbeats[collector_id] = self.now
+        collectors = sum(1 for seen in self.heartbeats.values() if seen > self.now - ttl)
+        share = math.ceil(len(self.clock_ids) / collectors)
+        owned = sorted(c for c, (owner, _) in self.leases.items() if owner == collector_id)
+        for clock_id in owned[share:]:
+            del self.leases[clock_id]
+        owned = owned[:share]
+        free = [
+            c for c in self.clock_ids
+            if c not in self.leases or self.leases[c][1] < self.now
+        ]
+        owned += free[:share - len(owned)]
+        for clock_id in owned:
+            self.leases[clock_id] = (collector_id, self.now + ttl)
+        return LeaseAssignment(frozenset(owned), collectors, share)
+
+    def release(self, collector_id):
+        self.heartbeats.pop(collector_id, None)
+        self.leases = {c: v for c, v in self.leases.items() if v[0] != collector_id}
+
+
+def ids(clocks):
+    return {clock.id for clock in clocks}
+
+
+class TestShardCoordinator:
+    """Tests para ShardCoordinator"""
+
+    def test_single_collector_takes_all(self):
+        """Test que un solo recolector procesa toda la flota"""
+        shard = ShardCoordinator(FakeLeases(ids(CLOCKS)), "a", lease_ttl=180)
+
+        assert shard.assign(CLOCKS) == CLOCKS
+
+    def test_new_collector_gets_its_share(self):
+        """Test que al sumar un recolector la flota se reparte sin solaparse"""
+        leases = FakeLeases(ids(CLOCKS))
+        a = ShardCoordinator(leases, "a", lease_ttl=180)
+        b = ShardCoordinator(leases, "b", lease_ttl=180)
+        a.assign(CLOCKS)
+
+        b.assign(CLOCKS)     # todo arrendado por a: b todavía no recibe nada
+        first = a.assign(CLOCKS)   # a libera el excedente
+        second = b.assign(CLOCKS)
+
+        assert len(first) == len(second) == 5
+        assert ids(first) | ids(second) == ids(CLOCKS)
+        assert not ids(first) & ids(second)
+
+    def test_dead_collector_is_rebalanced(self):
+        """Test que los relojes de un recolector caído pasan a los demás al vencer"""
+        leases = FakeLeases(ids(CLOCKS))
+        a = ShardCoordinator(leases, "a", lease_ttl=180)
+        b = ShardCoordinator(leases, "b", lease_ttl=180)
+        a.assign(CLOCKS)
+        b.assign(CLOCKS)
+        a.assign(CLOCKS)
+        b.assign(CLOCKS)
+
+        # a deja de latir
+        leases.now = 200
+        assert b.assign(CLOCKS) == CLOCKS
+
+    def test_release_frees_clocks_immediately(self):
+        """Test que una detención normal libera los relojes sin esperar el vencimiento"""
+        leases = FakeLeases(ids(CLOCKS))
+        a = ShardCoordinator(leases, "a", lease_ttl=180)
+        b = ShardCoordinator(leases, "b", lease_ttl=180)
+        a.assign(CLOCKS)
+
+        a.release()
+
+        assert b.assign(CLOCKS) == CLOCKS
+        assert not a.owns(1)
+
+    def test_database_error_keeps_leases_until_expiry(self, monkeypatch):
+        """Test que sin base de datos se conservan los relojes mientras dure el arriendo"""
+        leases = FakeLeases(ids(CLOCKS))
+        shard = ShardCoordinator(leases, "a", lease_ttl=180)
+        now = [1000.0]
+        monkeypatch.setattr("clockcontrol.database.sharding.time.monotonic", lambda: now[0])
+        shard.assign(CLOCKS)
+        leases.fail = True
+
+        now[0] += 60
+        assert shard.assign(CLOCKS) == CLOCKS
+        now[0] += 180
+        assert shard.assign(CLOCKS) == []
+
+
+class ScriptedCursor:
+    """Mock de cursor psycopg2 que responde en orden las filas de cada consulta"""
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        self.db.queries.append((" ".join(query.split()), params))
+
+    def fetchone(self):
+        return self.db.results.pop(0)[0]
+
+    def fetchall(self):
+        return self.db.results.pop(0)
+
+
+class ScriptedDB:
+    """Mock de DatabaseConnection"""
+    def __init__(self, *results):
+        self.results = list(results)
+        self.queries = []
+
+    @contextmanager
+    def get_cursor(self):
+        yield ScriptedCursor(self)
+
+
+class TestLeaseRepository:
+    """Tests para LeaseRepository.claim_share"""
+
+    def test_releases_excess(self):
+        """Test que con un recolector nuevo se liberan los arriendos que sobran"""
+        # 2 recolectores vivos, 10 relojes, 8 arrendados por este
+        db = ScriptedDB([(2,)], [(10,)], [(i,) for i in range(1, 9)])
+
+        assignment = LeaseRepository(db).claim_share("a", ttl=180)
+
+        assert assignment == LeaseAssignment(frozenset(range(1, 6)), 2, 5)
+        query, params = db.queries[-1]
+        assert query.startswith("DELETE FROM rrhh.clock_lease")
+        assert params == ("a", [6, 7, 8])
+
+    def test_claims_missing_share(self):
+        """Test que se toman relojes libres hasta completar la parte"""
+        db = ScriptedDB([(3,)], [(10,)], [(1,)], [(5,), (9,)])
+
+        assignment = LeaseRepository(db).claim_share("a", ttl=180)
+
+        assert assignment.clock_ids == {1, 5, 9}
+        query, params = db.queries[-1]
+        assert query.startswith("INSERT INTO rrhh.clock_lease")
+        assert "SELECT r.id_reloj_bio," in query
+        assert "r.id " not in query
+        assert params[-1] == 3
+
+
+class TestLeaseSettings:
+    """Tests para lease_ttl frente al intervalo entre ejecuciones"""
+
+    def load(self, tmp_path, monkeypatch, body, run_interval=None):
+        monkeypatch.chdir(tmp_path)
+        if run_interval is None:
+            monkeypatch.delenv("CLOCKCONTROL_RUN_INTERVAL", raising=False)
+        else:
+            monkeypatch.setenv("CLOCKCONTROL_RUN_INTERVAL", str(run_interval))
+        path = tmp_path / "database.ini"
+        path.write_text("[clockcontrol]\nsharding=true\n" + body)
+        return Settings(str(path)).collector
+
+    def test_default_covers_run_interval(self, tmp_path, monkeypatch):
+        """Test que sin lease_ttl los arriendos cubren tres ejecuciones del cron"""
+        collector = self.load(tmp_path, monkeypatch, "", run_interval=300)
+
+        assert collector.lease_ttl == 900
+
+    def test_short_lease_is_rejected(self, tmp_path, monkeypatch):
+        """Test que un arriendo que vence entre ejecuciones es un error de configuracion"""
+        with pytest.raises(ConfigurationError, match="lease_ttl"):
+            self.load(tmp_path, monkeypatch, "lease_ttl=180\n", run_interval=300)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para el spool local de marcajes
+"""
+import json
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from clockcontrol.core.attendance import AttendanceMark, AttendanceProcessor
+from clockcontrol.core.exceptions import DatabaseError
+from clockcontrol.database.repositories import AttendanceRepository
+from clockcontrol.database.spool import MarkSpool, SpoolDrainer
+
+
+def marks(clock_id, *carnets):
+    return [
+        AttendanceMark(c, "2026-10-18", "08:00:00", f"10.0.0.{clock_id}", clock_id)
+        for c in carnets
+    ]
+
+
+class FakeTarget:
+    """Mock de save_marks_many que puede simular una base de datos caida"""
+    def __init__(self):
+        self.saved = []
+        self.calls = 0
+        self.down = False
+
+    def save(self, batches):
+        if self.down:
+            raise DatabaseError("could not connect to server")
+        self.calls += 1
+        for clock_id, batch in batches:
+            self.saved.append((clock_id, [m.carnet for m in batch]))
+        return [len(batch) for _, batch in batches]
+
+
+class ProcedureDB:
+    """Mock de DatabaseConnection cuyo stored procedure responde result"""
+    def __init__(self, result):
+        self.result = result
+
+    @contextmanager
+    def get_cursor(self):
+        db = self
+
+        class Cursor:
+            def callproc(self, name, args):
+                pass
+
+            def fetchone(self):
+                return db.result
+
+        yield Cursor()
+
+
+class StoredProcedureDB:
+    """Mock de DatabaseConnection que deduplica como rrhh.set_attendance_info_clock"""
+    def __init__(self):
+        self.stored = set()
+
+    @contextmanager
+    def get_cursor(self):
+        db = self
+
+        class Cursor:
+            def callproc(self, name, args):
+                before = len(db.stored)
+                db.stored.update(
+                    (m["incarnet"], m["indate_mark"], m["intime_mark"], m["inip_clock"])
+                    for m in json.loads(args[1])
+                )
+                self.inserted = len(db.stored) - before
+
+            def fetchone(self):
+                if self.inserted:
+                    return (100, "CARGA INFORMACION DEL FUNCIONARIO - RELOJ", self.inserted)
+                return (-100, "NO SE INSERTARON REGISTROS", 0)
+
+        yield Cursor()
+
+
+def procedure_save(repo):
+    """Igual que save_marks_many con ingest_mode=procedure"""
+    def save(batches):
+        return [
+            repo.save_marks(clock_id, AttendanceProcessor.to_json(batch))
+            for clock_id, batch in batches
+        ]
+    return save
+
+
+class TestMarkSpool:
+    """Tests para MarkSpool"""
+
+    def setup_method(self):
+        """Setup para cada test"""
+        self.target = FakeTarget()
+
+    def test_drain_groups_by_clock(self, tmp_path):
+        """Test que el vaciado guarda todos los relojes en una llamada y devuelve insertados por IP"""
+        spool = MarkSpool(tmp_path / "marks.spool")
+        spool.append(marks(1, "a", "b"))
+        spool.append(marks(2, "c"))
+
+        saved = spool.drain(self.target.save)
+
+        assert saved == {"10.0.0.1": 2, "10.0.0.2": 1}
+        assert self.target.saved == [(1, ["a", "b"]), (2, ["c"])]
+        assert self.target.calls == 1
+        assert spool.pending == 0
+
+    def test_failed_drain_keeps_marks(self, tmp_path):
+        """Test que un error de base de datos no elimina marcajes del spool"""
+        spool = MarkSpool(tmp_path / "marks.spool")
+        spool.append(marks(1, "a"))
+        self.target.down = True
+
+        with pytest.raises(DatabaseError):
+            spool.drain(self.target.save)
+        assert spool.pending == 1
+
+    def test_procedure_error_keeps_marks(self, tmp_path):
+        """Test que un error informado por el stored procedure no elimina marcajes"""
+        repo = AttendanceRepository(
+            ProcedureDB((-100, "COULD NOT SERIALIZE ACCESS. CÓDIGO ESTADO:40001", 0))
+        )
+        spool = MarkSpool(tmp_path / "marks.spool")
+        spool.append(marks(1, "a", "b"))
+
+        with pytest.raises(DatabaseError):
+            spool.drain(procedure_save(repo))
+        assert spool.pending == 2
+
+    def test_replayed_batch_is_drained(self, tmp_path):
+        """Test que un lote ya guardado (caída antes de borrarlo) se elimina y no bloquea a los siguientes"""
+        repo = AttendanceRepository(StoredProcedureDB())
+        spool = MarkSpool(tmp_path / "marks.spool")
+        spool.append(marks(1, "a", "b"))
+        # Confirmado en la base de datos pero no borrado del spool
+        repo.save_marks(1, AttendanceProcessor.to_json(marks(1, "a", "b")))
+        spool.append(marks(2, "c"))
+
+        saved = spool.drain(procedure_save(repo))
+
+        assert saved == {"10.0.0.1": 0, "10.0.0.2": 1}
+        assert spool.pending == 0
+
+    def test_survives_restart(self, tmp_path):
+        """Test que los marcajes pendientes sobreviven al cierre del proceso"""
+        path = tmp_path / "marks.spool"
+        MarkSpool(path).append(marks(1, "a", "b"))
+
+        restarted = MarkSpool(path)
+
+        assert restarted.pending == 2
+        assert restarted.drain(self.target.save) == {"10.0.0.1": 2}
+
+    def test_drain_respects_limit(self, tmp_path):
+        """Test que cada vuelta envia como maximo limit marcajes, los mas antiguos"""
+        spool = MarkSpool(tmp_path / "marks.spool")
+        spool.append(marks(1, "a", "b", "c"))
+
+        spool.drain(self.target.save, limit=2)
+
+        assert self.target.saved == [(1, ["a", "b"])]
+        assert spool.pending == 1
+
+
+class TestSpoolDrainer:
+    """Tests para SpoolDrainer"""
+
+    def test_background_drain_after_outage(self, tmp_path):
+        """Test que el hilo de fondo envia lo acumulado cuando la base vuelve"""
+        target = FakeTarget()
+        target.down = True
+        spool = MarkSpool(tmp_path / "marks.spool")
+        drainer = SpoolDrainer(spool, target.save, interval=0.01, max_backoff=0.05)
+        drainer.start()
+
+        spool.append(marks(1, "a"))
+        drainer.wake()
+        time.sleep(0.1)
+        assert spool.pending == 1
+
+        target.down = False
+        time.sleep(0.3)
+        drainer.close()
+
+        assert spool.pending == 0
+        assert drainer.take_saved() == {"10.0.0.1": 1}
+
+    def test_flush_reports_pending_on_failure(self, tmp_path):
+        """Test que flush devuelve False si la base de datos sigue caida"""
+        target = FakeTarget()
+        target.down = True
+        spool = MarkSpool(tmp_path / "marks.spool")
+        spool.append(marks(1, "a"))
+
+        assert not SpoolDrainer(spool, target.save).flush()
+        assert spool.pending == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
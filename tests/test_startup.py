@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para el arranque con carga diferida del paquete y del CLI
+"""
+import subprocess
+import sys
+
+import pytest
+
+import clockcontrol
+from clockcontrol import cli
+
+
+def loaded_modules(statement):
+    """Módulos cargados por statement en un intérprete nuevo"""
+    output = subprocess.run(
+        [sys.executable, "-c", f"{statement}; import sys; print('\\n'.join(sys.modules))"],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return set(output.split())
+
+
+class TestLazyStartup:
+    """Tests para las importaciones diferidas"""
+
+    @pytest.mark.parametrize("module", ["clockcontrol", "clockcontrol.cli"])
+    def test_import_skips_heavy_modules(self, module):
+        """Test que importar el paquete o el CLI no carga psycopg2, pyzk ni asyncio"""
+        modules = loaded_modules(f"import {module}")
+
+        assert not {"psycopg2", "zk", "asyncio", "clockcontrol.app"} & modules
+
+    def test_public_names_resolve(self):
+        """Test que la API publica se resuelve al usarse"""
+        from clockcontrol.app import ClockControlApp
+
+        assert clockcontrol.ClockControlApp is ClockControlApp
+        assert cli.ClockControlApp is ClockControlApp
+        assert "ClockControlApp" in dir(clockcontrol)
+
+    def test_unknown_name_raises(self):
+        """Test que un nombre inexistente sigue dando AttributeError"""
+        with pytest.raises(AttributeError):
+            clockcontrol.NoExiste
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
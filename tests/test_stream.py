@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para la captura en tiempo real
+"""
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from clockcontrol.core.attendance import AttendanceMark, AttendanceProcessor
+from clockcontrol.core.exceptions import DatabaseError
+from clockcontrol.core.stream import LiveCaptureWorker, MicroBatchWriter
+
+
+class MockAttendance:
+    """Mock de objeto Attendance de pyzk"""
+    def __init__(self, user_id: str, timestamp: datetime):
+        self.user_id = user_id
+        self.timestamp = timestamp
+
+
+class FakeLiveConn:
+    """Mock de conexion pyzk con live_capture"""
+    def __init__(self, events):
+        self.events = list(events)
+        self.end_live_capture = False
+        self.timeouts = 0
+
+    def live_capture(self, new_timeout=10):
+        while not self.end_live_capture:
+            if self.events:
+                yield self.events.pop(0)
+            else:
+                self.timeouts += 1
+                yield None
+
+
+def mark(carnet, clock_id=1):
+    return AttendanceMark(carnet, "2026-10-18", "08:00:00", f"10.0.0.{clock_id}", clock_id)
+
+
+class TestMicroBatchWriter:
+    """Tests para MicroBatchWriter"""
+
+    def setup_method(self):
+        """Setup para cada test"""
+        self.saved = []
+        self.fail = False
+
+    def save(self, clock_id, batch):
+        if self.fail:
+            raise DatabaseError("sin conexion")
+        self.saved.append((clock_id, [m.carnet for m in batch]))
+        return len(batch)
+
+    def test_flush_groups_by_clock(self):
+        """Test que se hace un guardado por reloj"""
+        writer = MicroBatchWriter(self.save)
+        writer.add([mark("1", 1), mark("2", 2), mark("3", 1)])
+
+        assert writer.flush() == 3
+        assert sorted(self.saved) == [(1, ["1", "3"]), (2, ["2"])]
+        assert writer.pending == 0
+
+    def test_failed_save_is_retried(self):
+        """Test que un lote fallido se conserva en orden para el siguiente intento"""
+        writer = MicroBatchWriter(self.save)
+        writer.add([mark("1")])
+        self.fail = True
+        assert writer.flush() == 0
+
+        writer.add([mark("2")])
+        self.fail = False
+        assert writer.flush() == 2
+        assert self.saved == [(1, ["1", "2"])]
+
+    def test_background_thread_flushes_by_time(self):
+        """Test que el hilo de fondo guarda sin esperar un lote completo"""
+        writer = MicroBatchWriter(self.save, max_delay=0.05)
+        writer.start()
+        writer.add([mark("1")])
+        time.sleep(0.3)
+
+        assert self.saved == [(1, ["1"])]
+        writer.close()
+
+    def test_close_flushes_pending(self):
+        """Test que close guarda lo pendiente"""
+        writer = MicroBatchWriter(self.save, max_delay=60)
+        writer.start()
+        writer.add([mark("1")])
+        writer.close()
+
+        assert self.saved == [(1, ["1"])]
+
+
+class TestLiveCaptureWorker:
+    """Tests para LiveCaptureWorker"""
+
+    def make_worker(self, writer, stop, interval=60):
+        return LiveCaptureWorker(
+            device=type("Device", (), {"ip": "10.0.0.1"})(),
+            clock_id=7,
+            processor=AttendanceProcessor(days_back=1),
+            writer=writer,
+            reconcile=lambda: None,
+            stop=stop,
+            reconcile_interval=interval,
+        )
+
+    def test_capture_sends_events_to_writer(self):
+        """Test que cada evento llega al writer como AttendanceMark"""
+        writer = MicroBatchWriter(lambda clock_id, batch: len(batch))
+        stop = threading.Event()
+        worker = self.make_worker(writer, stop)
+        now = datetime.now().replace(microsecond=0)
+        conn = FakeLiveConn([MockAttendance("123", now), None, MockAttendance("456", now)])
+
+        events = worker.capture(conn, until=time.monotonic() + 0.1)
+
+        assert events == 2
+        assert writer.pending == 2
+        assert conn.end_live_capture
+
+    def test_capture_ends_on_stop(self):
+        """Test que la detencion termina el live capture de pyzk"""
+        writer = MicroBatchWriter(lambda clock_id, batch: len(batch))
+        stop = threading.Event()
+        stop.set()
+        worker = self.make_worker(writer, stop)
+        conn = FakeLiveConn([])
+
+        assert worker.capture(conn, until=time.monotonic() + 60) == 0
+        assert conn.timeouts == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests para la descarga incremental con marca de agua
+"""
+import time
+
+import pytest
+
+from clockcontrol.core.watermark import Watermark, WatermarkStore
+from clockcontrol.utils.state import JsonStateStore
+
+
+class MockAttendance:
+    """Mock de objeto de asistencia ZK"""
+    def __init__(self, user_id: str, timestamp: str):
+        self.user_id = user_id
+        self.timestamp = timestamp
+
+
+def make_log(count: int, day: str = "2026-02-07"):
+    """Genera un log de dispositivo con marcajes consecutivos"""
+    return [
+        MockAttendance(str(1000 + i), f"{day} 08:{i // 60:02d}:{i % 60:02d}")
+        for i in range(count)
+    ]
+
+
+class TestWatermarkStore:
+    """Tests para WatermarkStore"""
+
+    def setup_method(self):
+        """Setup para cada test"""
+        self.ip = "192.168.1.100"
+
+    def test_first_read_returns_everything(self):
+        """Test que sin marca de agua se procesa el log completo"""
+        log = make_log(5)
+        assert WatermarkStore.select_new(self.ip, log, None) == log
+
+    def test_returns_only_new_records(self):
+        """Test que solo se devuelven registros posteriores a la marca"""
+        log = make_log(10)
+        previous = Watermark.from_records(log[:7])
+
+        result = WatermarkStore.select_new(self.ip, log, previous)
+
+        assert result == log[7:]
+
+    def test_shrunk_log_triggers_full_resync(self):
+        """Test que un log mas corto se procesa completo"""
+        previous = Watermark.from_records(make_log(10))
+        log = make_log(3)
+
+        assert WatermarkStore.select_new(self.ip, log, previous) == log
+
+    def test_rewritten_log_triggers_full_resync(self):
+        """Test que un log borrado y vuelto a llenar se procesa completo"""
+        previous = Watermark.from_records(make_log(5, day="2026-02-06"))
+        log = make_log(8, day="2026-02-07")
+
+        assert WatermarkStore.select_new(self.ip, log, previous) == log
+
+    def test_is_unchanged(self):
+        """Test de deteccion de log sin cambios"""
+        previous = Watermark(records=10)
+        assert WatermarkStore.is_unchanged(previous, 10)
+        assert not WatermarkStore.is_unchanged(previous, 11)
+        assert not WatermarkStore.is_unchanged(previous, None)
+        assert not WatermarkStore.is_unchanged(None, 10)
+
+    def test_is_unchanged_expires(self):
+        """Test que con max_age el log se vuelve a descargar completo periodicamente"""
+        recent = Watermark(records=10, read_at=time.time() - 60)
+        old = Watermark(records=10, read_at=time.time() - 7200)
+
+        assert WatermarkStore.is_unchanged(recent, 10, max_age=3600)
+        assert not WatermarkStore.is_unchanged(old, 10, max_age=3600)
+        assert not WatermarkStore.is_unchanged(Watermark(records=10), 10, max_age=3600)
+        assert WatermarkStore.is_unchanged(old, 10)
+
+    def test_persists_between_instances(self, tmp_path):
+        """Test que la marca de agua sobrevive entre ejecuciones"""
+        path = tmp_path / "watermarks.json"
+        WatermarkStore(JsonStateStore(path)).save(self.ip, Watermark.from_records(make_log(4)))
+
+        loaded = WatermarkStore(JsonStateStore(path)).get(self.ip)
+
+        assert loaded.records == 4
+        assert loaded.last_timestamp == "2026-02-07 08:00:03"
+        assert loaded.read_at is not None
+
+    def test_reset(self, tmp_path):
+        """Test que reset descarta la marca de agua"""
+        store = WatermarkStore(JsonStateStore(tmp_path / "watermarks.json"))
+        store.save(self.ip, Watermark(records=4))
+        store.reset(self.ip)
+        assert store.get(self.ip) is None
+
+    def test_without_store(self):
+        """Test que sin almacen no hay marca de agua"""
+        store = WatermarkStore(None)
+        store.save(self.ip, Watermark(records=4))
+        assert store.get(self.ip) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])